@@ -0,0 +1,72 @@
+import re
+import sys
+import timeit
+
+from http_client.headers import Headers
+
+HEAD = (b'Server: nginx/1.18.0\r\n'
+        b'Date: Sun, 18 Oct 2026 08:00:00 GMT\r\n'
+        b'Content-Type: text/html; charset=utf-8\r\n'
+        b'Content-Length: 51234\r\n'
+        b'Connection: keep-alive\r\n'
+        b'Vary: Accept-Encoding\r\n'
+        b'Vary: Cookie\r\n'
+        b'Cache-Control: private, max-age=0, must-revalidate\r\n'
+        b'Expires: Sun, 18 Oct 2026 08:00:00 GMT\r\n'
+        b'Last-Modified: Sat, 17 Oct 2026 21:13:54 GMT\r\n'
+        b'ETag: W/"c85f-1f1a2b3c4d"\r\n'
+        b'X-Frame-Options: SAMEORIGIN\r\n'
+        b'X-Content-Type-Options: nosniff\r\n'
+        b'X-XSS-Protection: 1; mode=block\r\n'
+        b'Referrer-Policy: strict-origin-when-cross-origin\r\n'
+        b'Strict-Transport-Security: max-age=63072000; includeSubDomains\r\n'
+        b'Content-Security-Policy: default-src \'self\'; img-src *\r\n'
+        b'Set-Cookie: session=8f14e45fceea167a5a36dedd4bea2543; Path=/; '
+        b'HttpOnly; Secure\r\n'
+        b'Set-Cookie: csrftoken=a87ff679a2f3e71d9181a67b7542122c; Path=/\r\n'
+        b'Set-Cookie: lang=en; Path=/; Max-Age=31536000\r\n'
+        b'Access-Control-Allow-Origin: *\r\n'
+        b'Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n'
+        b'Accept-Ranges: bytes\r\n'
+        b'Age: 0\r\n'
+        b'Via: 1.1 varnish\r\n'
+        b'X-Cache: MISS\r\n'
+        b'X-Cache-Hits: 0\r\n'
+        b'X-Served-By: cache-fra19120-FRA\r\n'
+        b'X-Request-Id: 7b5e4c52-3a5f-4a49-9df0-1c6c4e43bb12\r\n'
+        b'X-Runtime: 0.041281\r\n'
+        b'Server-Timing: db;dur=12.4, app;dur=30.1\r\n'
+        b'Alt-Svc: h3=":443"; ma=86400')
+
+# The parser used by Response before Headers existed, kept for comparison.
+re_header = r'(?P<header>[a-zA-Z-]*): (?P<value>[0-9\s\w,.;=/:-]*)'
+
+
+def legacy_parse(data: bytes):
+    headers = {}
+    for line in data.decode('ISO-8859-1').split('\r\n'):
+        header = re.search(re_header, line)
+        if header:
+            headers[header.group('header')] = header.group('value')
+    return headers
+
+
+def measure(function, number: int):
+    best = min(timeit.repeat(lambda: function(HEAD), number=number, repeat=5))
+    return number / best
+
+
+def main(number: int = 20000):
+    count = HEAD.count(b'\r\n') + 1
+    results = {'legacy regex': measure(legacy_parse, number),
+               'Headers.parse': measure(Headers.parse, number)}
+    for name, rate in results.items():
+        sys.stdout.write(f'{name:>14}: {rate:10.0f} heads/s '
+                         f'({rate * count / 1e6:.2f} M headers/s)\n')
+    speedup = results['Headers.parse'] / results['legacy regex']
+    sys.stdout.write(f'speedup: {speedup:.1f}x on {count} header lines\n')
+    return results
+
+
+if __name__ == '__main__':
+    main()
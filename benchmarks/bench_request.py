@@ -0,0 +1,34 @@
+import sys
+import timeit
+
+from http_client.request import Request, RequestTemplate
+
+URL = 'http://api.example.com:8080/v1/items?page=1'
+HEADERS = ['Accept: application/json',
+           'Authorization: Bearer 0123456789abcdef',
+           'X-Request-Id: 7b5e4c52-3a5f-4a49-9df0-1c6c4e43bb12']
+
+
+def build_request():
+    return Request(url=URL, method='POST', headers=HEADERS,
+                   agent='bench/1.0', protocol='HTTP/1.1',
+                   data='{"id": 1}', keep_alive=True)
+
+
+def main(number: int = 20000):
+    template = RequestTemplate(build_request())
+    results = {
+        'Request + bytes': lambda: bytes(build_request()),
+        'template buffers': lambda: template.request(
+            path='/v1/items/2', data='{"id": 2}').buffers(),
+        'template render': template.render,
+    }
+    for name, function in results.items():
+        best = min(timeit.repeat(function, number=number, repeat=5))
+        results[name] = number / best
+        sys.stdout.write(f'{name:>16}: {results[name]:10.0f} requests/s\n')
+    return results
+
+
+if __name__ == '__main__':
+    main()
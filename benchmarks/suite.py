@@ -0,0 +1,152 @@
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+
+from benchmarks.bench_headers import HEAD
+from benchmarks.bench_request import build_request
+from http_client.client import Client
+from http_client.headers import Headers
+from http_client.response import Response
+from http_client.tls import create_ssl_context
+from tests.server import LocalServer, CERT_FILE, get
+
+BASELINE = Path(__file__).parent / 'baseline.json'
+LARGE = 8 * 1024 * 1024
+
+ROUTES = {'/small': (200, {}, b'x' * 100),
+          '/chunked': (200, {}, [b'x' * 1024] * 64),
+          '/large': (200, {}, b'x' * LARGE)}
+
+RESPONSE = b'HTTP/1.1 200 OK\r\n' + HEAD + b'\r\n\r\n' + b'x' * 51234
+
+
+def peak_memory(function, number: int):
+    tracemalloc.start()
+    try:
+        for _ in range(number):
+            function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def micro(function, number: int):
+    # Best of five: the fastest run is the one least disturbed by the
+    # rest of the machine.
+    best = min(timeit.repeat(function, number=number, repeat=5))
+    return {'ops': number / best,
+            'p50': best / number,
+            'p99': None,
+            'peak_kib': peak_memory(function, 10) / 1024}
+
+
+def end_to_end(function, number: int):
+    function()
+    latencies = []
+    for _ in range(number):
+        started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return {'ops': number / sum(latencies),
+            'p50': latencies[len(latencies) // 2],
+            'p99': latencies[min(len(latencies) - 1,
+                                 int(len(latencies) * 0.99))],
+            'peak_kib': peak_memory(function, 3) / 1024}
+
+
+def run(scale: float = 1.0):
+    def times(number: int):
+        return max(1, int(number * scale))
+
+    request = build_request()
+    response_request = get('http://127.0.0.1/')
+    results = {
+        'Request.__bytes__': micro(lambda: bytes(build_request()),
+                                   times(20000)),
+        'Request (reused)': micro(request.__bytes__, times(20000)),
+        'Headers.parse': micro(lambda: Headers.parse(HEAD), times(20000)),
+        'Response.from_bytes': micro(
+            lambda: Response.from_bytes(RESPONSE, response_request),
+            times(20000)),
+    }
+
+    with LocalServer(ROUTES) as http, LocalServer(ROUTES, tls=True) as https:
+        context = create_ssl_context(ca_file=CERT_FILE)
+        with Client(10) as client, \
+                Client(10, ssl_context=context) as tls_client:
+            stages = {
+                'client keep-alive': (client, http.url('/small'), 2000),
+                'client chunked': (client, http.url('/chunked'), 1000),
+                'client large body': (client, http.url('/large'), 20),
+                'client https': (tls_client, https.url('/small'), 1000),
+            }
+            for name, (target, url, number) in stages.items():
+                results[name] = end_to_end(
+                    lambda: target.do_request(get(url, timeout=10)),
+                    times(number))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['ops'] < base['ops'] * (1 - tolerance):
+            regressions.append(f'{name}: {result["ops"]:.0f} ops/s, '
+                               f'baseline {base["ops"]:.0f}')
+        if result['peak_kib'] > base['peak_kib'] * (1 + tolerance) + 64:
+            regressions.append(f'{name}: peak {result["peak_kib"]:.0f} '
+                               f'KiB, baseline {base["peak_kib"]:.0f}')
+    return regressions
+
+
+def report(results: dict, baseline: dict):
+    for name, result in results.items():
+        change = ''
+        if name in baseline:
+            change = f' ({result["ops"] / baseline[name]["ops"] - 1:+.0%})'
+        p99 = f'{result["p99"] * 1e6:9.1f}' if result['p99'] else ' ' * 9
+        sys.stdout.write(f'{name:>20}: {result["ops"]:10.0f} ops/s'
+                         f'{change:>8}  p50 {result["p50"] * 1e6:9.1f} us'
+                         f'  p99 {p99} us'
+                         f'  peak {result["peak_kib"]:8.0f} KiB\n')
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='http_client benchmarks')
+    parser.add_argument('--save', action='store_true',
+                        help='Store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Set allowed slowdown against the baseline')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Scale the number of iterations')
+    args = parser.parse_args(argv)
+
+    stored = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    baseline = stored.get('results', {})
+    results = run(args.scale)
+    report(results, baseline)
+
+    if args.save:
+        BASELINE.write_text(json.dumps(
+            {'python': platform.python_version(),
+             'machine': platform.machine(),
+             'results': results}, indent=2) + '\n')
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        sys.stdout.write(f'REGRESSION {regression}\n')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,25 @@
+import json
+import os
+import re
 import sys
 from argparse import ArgumentParser
 from typing import List
 
+from http_client.bench import Bench
+from http_client.cache import HTTPCache
 from http_client.client import Client
-from http_client.exceptions import HTTPSClientException
+from http_client.cookies import CookieJar, is_cookie_file
+from http_client.disk_cache import DiskCacheBackend
+from http_client.download import SegmentedDownload
+from http_client.pool import ConnectionPool
+from http_client.exceptions import HTTPSClientException, \
+    UnreadableFileException
+from http_client.http2 import ALPN
 from http_client.request import Request
 from http_client.response import Response
+from http_client.retry import RetryPolicy, RetryBudget
+from http_client.timeouts import Timeouts
+from http_client.tls import create_ssl_context
 
 
 def get_response(args, response: Response):
@@ -21,17 +35,67 @@ def get_response(args, response: Response):
                                  f'{response.code} OK'])
     elif args.output:
         with open(args.output, 'bw+') as f:
-            f.write(response.message
-                    .encode(response.charset))
+            if response.raw is None and \
+                    (args.raw or not response.content_encoding):
+                # A buffered body (e.g. a memory-mapped cache entry) is
+                # written in one call straight from its buffer.
+                f.write(response.body)
+                return
+            for chunk in response.iter_content(
+                    decode_content=not args.raw):
+                f.write(chunk)
     else:
         format_answer(response, [f'HTTP/{response.protocol}'
                                  f' {response.code} OK'])
 
 
+def timing(phase: str):
+    def value(response: Response):
+        seconds = response.timings.get(phase)
+        if seconds is None:
+            return '0.000000'
+        # Like curl, times count from the start of the first request.
+        return f'{seconds + response.timings.redirect_time:.6f}'
+    return value
+
+
+def size_header(response: Response):
+    return len(response.head) + 4 if response.head is not None else 0
+
+
+WRITE_OUT = {
+    'http_code': lambda r: r.code,
+    'url_effective': lambda r: r.request.url,
+    'num_redirects': lambda r: r.timings.redirects,
+    'time_namelookup': timing('dns'),
+    'time_connect': timing('connect'),
+    'time_appconnect': timing('tls'),
+    'time_pretransfer': timing('sent'),
+    'time_starttransfer': timing('first_byte'),
+    'time_total': timing('total'),
+    'time_redirect': lambda r: f'{r.timings.redirect_time:.6f}',
+    'size_request': lambda r: r.timings.bytes_sent,
+    'size_header': size_header,
+    'size_download': lambda r: max(0, r.timings.bytes_received -
+                                   size_header(r)),
+}
+
+
+def write_out(template: str, response: Response):
+    def replace(match):
+        name = match.group(1)
+        if name not in WRITE_OUT:
+            return match.group(0)
+        return str(WRITE_OUT[name](response))
+
+    text = re.sub(r'%\{(\w+)\}', replace, template)
+    sys.stdout.write(text.replace('\\n', '\n').replace('\\t', '\t'))
+
+
 def format_answer(response: Response,
                   answer: List[str],
                   with_message=True):
-    for header, value in response.headers.items():
+    for header, value in response.headers.multi_items():
         answer.append(f'{header}: {value}')
 
     if with_message:
@@ -46,7 +110,7 @@ def get_parser():
     group_data.add_argument('-d', '--data', type=str,
                             help='Set data for request', default='')
     group_data.add_argument('-f', '--file', type=str,
-                            help='Set data from file')
+                            help='Set data from file (- streams stdin)')
 
     parser.add_argument('-x', '--request', type=str,
                         help='Set request method:'
@@ -54,9 +118,42 @@ def get_parser():
                              'PATCH | OPTIONS | DELETE | '
                              'HEAD | TRACE', default='GET')
 
-    parser.add_argument('url', type=str,
+    parser.add_argument('url', type=str, nargs='?',
                         help='Set URL (link to resource)')
 
+    parser.add_argument('-i', '--input', type=str,
+                        help='Read URLs or JSON request specs line by '
+                             'line from file (- for stdin) and print '
+                             'results as JSON Lines')
+
+    parser.add_argument('-j', '--concurrency', type=int,
+                        help='Set number of parallel requests for -i '
+                             'and --bench',
+                        default=8)
+
+    parser.add_argument('--pipeline', type=int, nargs='?', const=16,
+                        metavar='DEPTH',
+                        help='Pipeline GET/HEAD requests from -i on one '
+                             'connection per host, up to DEPTH at a time '
+                             '(not with --cache-dir or --retry)')
+
+    parser.add_argument('--bench', action='store_true',
+                        help='Load-test url and print throughput, '
+                             'latency percentiles and errors')
+
+    parser.add_argument('-n', '--requests', type=int,
+                        help='Set number of requests for --bench')
+
+    parser.add_argument('--duration', type=float,
+                        help='Set run time(sec) for --bench')
+
+    parser.add_argument('--rate', type=float,
+                        help='Send --bench requests at a fixed rate '
+                             '(req/sec) instead of back to back')
+
+    parser.add_argument('--json', action='store_true',
+                        help='Print --bench results as JSON')
+
     parser.add_argument('-l', '--reference', type=str,
                         help='Set previous URL')
 
@@ -75,7 +172,12 @@ def get_parser():
                         help='Set cookie')
 
     parser.add_argument('-C', '--cookie_file', type=str,
-                        help='Set cookie from file')
+                        help='Set cookie from file (a Cookie header or '
+                             'a Netscape cookie file)')
+
+    parser.add_argument('--cookie_jar', type=str,
+                        help='Load cookies from a Netscape cookie file '
+                             'and save the session\'s cookies back to it')
 
     parser.add_argument('-a', '--agent', type=str,
                         help='Set User Agent')
@@ -83,6 +185,18 @@ def get_parser():
     parser.add_argument('-O', '--output', type=str,
                         help='Send answer in file')
 
+    parser.add_argument('--segments', type=int,
+                        help='Download -O in this many byte ranges in '
+                             'parallel, resuming an interrupted download')
+
+    parser.add_argument('--compressed', action='store_true',
+                        help='Ask for a compressed response and '
+                             'decompress it')
+
+    parser.add_argument('--raw', action='store_true',
+                        help='Save the body with -O as sent by the '
+                             'server, without decompressing it')
+
     parser.add_argument('-H', '--headers', type=str, nargs='+',
                         help='Add headers in request')
 
@@ -91,33 +205,286 @@ def get_parser():
                              'connecting to the server',
                         default=1000)
 
+    parser.add_argument('--connect_timeout', type=float,
+                        help='Set timeout(sec) for connecting and the '
+                             'TLS handshake (default -t)')
+
+    parser.add_argument('--read_timeout', type=float,
+                        help='Set max time(sec) to wait for response data '
+                             '(default -t)')
+
+    parser.add_argument('-m', '--max_time', type=float,
+                        help='Set max time(sec) for the whole request, '
+                             'redirects included')
+
+    parser.add_argument('--retry', type=int,
+                        help='Retry failed idempotent requests and '
+                             '429/502/503/504 answers up to N times',
+                        default=0)
+
+    parser.add_argument('--retry_delay', type=float,
+                        help='Set base delay(sec) of the exponential '
+                             'backoff between retries',
+                        default=0.1)
+
+    parser.add_argument('--retry_budget', type=float,
+                        help='Set max share of retries in all requests',
+                        default=0.2)
+
+    parser.add_argument('-w', '--write-out', type=str,
+                        help='Print FORMAT after the answer, e.g. '
+                             '"%%{http_code} %%{time_total}\\n". '
+                             'Variables: ' + ', '.join(WRITE_OUT))
+
     parser.add_argument('-p', '--protocol', type=str,
-                        help='Set protocol', default='HTTP/1.1')
+                        help='Set protocol (HTTP/2 is negotiated over '
+                             'TLS and falls back to HTTP/1.1)',
+                        default='HTTP/1.1')
 
     parser.add_argument('-g', '--count_redirect', type=int,
                         help='Set max count redirect',
                         default=20)
 
+    parser.add_argument('--ca_file', type=str,
+                        help='Set CA bundle for server verification')
+
+    parser.add_argument('--cert_file', type=str,
+                        help='Set client certificate (PEM)')
+
+    parser.add_argument('--key_file', type=str,
+                        help='Set private key of client certificate')
+
+    parser.add_argument('--tls_version', type=str, choices=['1.2', '1.3'],
+                        help='Set minimum TLS version', default='1.2')
+
+    parser.add_argument('-k', '--insecure', action='store_true',
+                        help='Don`t verify server certificate')
+
+    parser.add_argument('--cache-dir', type=str,
+                        help='Cache responses in directory and reuse '
+                             'them while fresh')
+
+    parser.add_argument('--cache-size', type=int,
+                        help='Set max size(MiB) of the cache directory',
+                        default=256)
+
     return parser
 
 
-args = get_parser().parse_args()
+def get_cache(args):
+    if not args.cache_dir:
+        return None
+    try:
+        backend = DiskCacheBackend(args.cache_dir,
+                                   args.cache_size * 1024 * 1024)
+    except OSError:
+        raise UnreadableFileException(args.cache_dir)
+    return HTTPCache(backend)
+
+
+def get_cookies(args):
+    cookies = CookieJar()
+    if args.cookie_file and is_cookie_file(args.cookie_file):
+        cookies.load(args.cookie_file)
+        # Not a Cookie header for the request to read.
+        args.cookie_file = None
+    if args.cookie_jar and os.path.exists(args.cookie_jar):
+        cookies.load(args.cookie_jar)
+    return cookies
+
+
+def save_cookies(args, cookies: CookieJar):
+    if args.cookie_jar:
+        try:
+            cookies.save(args.cookie_jar)
+        except OSError:
+            raise UnreadableFileException(args.cookie_jar)
+
+
+def get_timeouts(args):
+    return Timeouts(connect=args.connect_timeout,
+                    tls=args.connect_timeout,
+                    read=args.read_timeout,
+                    total=args.max_time)
+
+
+def get_retry(args):
+    if args.retry <= 0:
+        return None
+    return RetryPolicy(total=args.retry, backoff=args.retry_delay,
+                       budget=RetryBudget(ratio=args.retry_budget))
+
+
+def get_data(args):
+    if args.file == '-':
+        return iter(lambda: sys.stdin.buffer.read(64 * 1024), b'')
+    return args.data or args.file
+
+
+SPEC_KEYS = ('url', 'method', 'headers', 'data', 'protocol', 'timeout',
+             'agent', 'cookie', 'reference', 'compressed')
+
+
+def build_request(args, url: str, **spec):
+    return Request(protocol=spec.get('protocol', args.protocol),
+                   timeout=spec.get('timeout', args.timeout),
+                   headers=spec.get('headers', args.headers),
+                   method=spec.get('method', args.request),
+                   agent=spec.get('agent', args.agent),
+                   cookie=spec.get('cookie', args.cookie),
+                   cookie_file=args.cookie_file,
+                   reference=spec.get('reference', args.reference),
+                   url=url,
+                   data=spec.get('data') or get_data(args),
+                   compress=spec.get('compressed', args.compressed))
+
+
+def parse_request(args, line: str):
+    if not line.startswith('{'):
+        return build_request(args, line)
+    try:
+        spec = json.loads(line)
+    except ValueError:
+        raise HTTPSClientException(f'bad request spec {line}')
+    if not isinstance(spec, dict) or not isinstance(spec.get('url'), str):
+        raise HTTPSClientException(f'request spec without url {line}')
+    unknown = set(spec) - set(SPEC_KEYS)
+    if unknown:
+        raise HTTPSClientException(f'unknown keys {", ".join(sorted(unknown))}'
+                                   f' in request spec {line}')
+    return build_request(args, **spec)
 
-request = Request(protocol=args.protocol,
-                  timeout=args.timeout,
-                  headers=args.headers,
-                  method=args.request,
-                  agent=args.agent,
-                  cookie=args.cookie,
-                  cookie_file=args.cookie_file,
-                  reference=args.reference,
-                  url=args.url,
-                  data=args.data or args.file)
+
+def read_requests(args, lines):
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            request = parse_request(args, line)
+        except HTTPSClientException as e:
+            error = e.message
+        except (TypeError, ValueError) as e:
+            error = f'bad request {line}: {e}'
+        else:
+            yield request
+            continue
+        # A bad line gets its own error record and the rest of the
+        # batch still runs.
+        write_record({'line': number, 'input': line, 'error': error})
+
+
+def write_record(record: dict):
+    sys.stdout.write(json.dumps(record) + '\n')
+
+
+def run_bench(args, client: Client):
+    result = Bench(client, build_request(args, args.url),
+                   requests=args.requests, duration=args.duration,
+                   concurrency=args.concurrency, rate=args.rate).run()
+    if args.json:
+        sys.stdout.write(json.dumps(result.as_dict()) + '\n')
+    else:
+        sys.stdout.write(result.report())
+
+
+def run_batch(args, client: Client):
+    try:
+        lines = sys.stdin if args.input == '-' else open(args.input)
+    except OSError:
+        raise UnreadableFileException(args.input)
+
+    with lines:
+        requests = read_requests(args, lines)
+        if args.pipeline:
+            results = client.pipeline(requests, args.pipeline)
+        else:
+            results = client.do_requests(requests, args.concurrency)
+        for request, result in results:
+            record = {'url': str(request.url),
+                      'method': request.request_method}
+            if isinstance(result, HTTPSClientException):
+                record['error'] = result.message
+            else:
+                record['code'] = result.code
+                record['length'] = len(result.content)
+                record['final_url'] = str(result.request.url)
+            write_record(record)
+
+
+parser = get_parser()
+args = parser.parse_args()
+if not args.url and not args.input:
+    parser.error('either url or -i/--input is required')
+if args.bench and not (args.url and (args.requests or args.duration)):
+    parser.error('--bench needs url and -n/--requests or --duration')
+if args.pipeline and (args.cache_dir or args.retry > 0):
+    # Pipelined batches bypass the cache and retries.
+    parser.error('--pipeline can not be used with --cache-dir or --retry')
+
+http2 = args.protocol.upper() in ('HTTP/2', 'HTTP/2.0')
+if http2:
+    # Used for the request line if the server can't do HTTP/2.
+    args.protocol = 'HTTP/1.1'
 
 try:
-    client = Client(int(args.count_redirect))
-    response = client.do_request(request)
-    get_response(args, response)
+    try:
+        ssl_context = create_ssl_context(ca_file=args.ca_file,
+                                         cert_file=args.cert_file,
+                                         key_file=args.key_file,
+                                         alpn=ALPN if http2 else None,
+                                         minimum_version=args.tls_version,
+                                         verify=not args.insecure)
+    except OSError as e:
+        raise UnreadableFileException(e.filename or str(e))
+
+    cache = get_cache(args)
+    cookies = get_cookies(args)
+    if args.bench:
+        pool = ConnectionPool(max_idle=args.concurrency * 4,
+                              max_per_host=args.concurrency)
+        with Client(int(args.count_redirect), pool=pool,
+                    ssl_context=ssl_context, cache=cache,
+                    timeouts=get_timeouts(args),
+                    retry=get_retry(args), http2=http2) as client:
+            run_bench(args, client)
+        sys.exit(0)
+
+    if args.input:
+        pool = ConnectionPool(max_idle=args.concurrency * 4,
+                              max_per_host=args.concurrency)
+        with Client(int(args.count_redirect), pool=pool,
+                    ssl_context=ssl_context, cache=cache,
+                    timeouts=get_timeouts(args),
+                    retry=get_retry(args), http2=http2,
+                    cookies=cookies) as client:
+            run_batch(args, client)
+        save_cookies(args, cookies)
+        sys.exit(0)
+
+    request = build_request(args, args.url)
+    if args.output and args.segments:
+        pool = ConnectionPool(max_idle=args.segments,
+                              max_per_host=args.segments)
+        with Client(int(args.count_redirect), pool=pool,
+                    ssl_context=ssl_context, timeouts=get_timeouts(args),
+                    retry=get_retry(args), http2=http2,
+                    cookies=cookies) as client:
+            if SegmentedDownload(client, request, args.output,
+                                 args.segments).run() is not None:
+                save_cookies(args, cookies)
+                sys.exit(0)
+
+    client = Client(int(args.count_redirect), ssl_context=ssl_context,
+                    cache=cache, timeouts=get_timeouts(args),
+                    retry=get_retry(args), http2=http2, cookies=cookies)
+    # Only fully read responses can be stored in the cache.
+    stream = args.output is not None and cache is None
+    with client.do_request(request, stream=stream) as response:
+        get_response(args, response)
+    save_cookies(args, cookies)
+    if args.write_out:
+        write_out(args.write_out, response)
 except HTTPSClientException as e:
     sys.stderr.write(f'Error: {e.message}')
     sys.exit(1)
@@ -0,0 +1,272 @@
+import asyncio
+import ssl
+import time
+from collections import defaultdict, deque
+
+from http_client.exceptions import ConnectException, PoolTimeoutException, \
+    ResponseException
+from http_client.reader import ResponseReader, body_framing, MAX_HEAD_SIZE, \
+    NO_BODY, LENGTH, CHUNKED
+from http_client.request import Request
+from http_client.response import Response
+from http_client.tls import create_ssl_context
+
+
+class AsyncConnection:
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter, key: tuple):
+        self._reader = reader
+        self._writer = writer
+        self._key = key
+        self._last_used = time.monotonic()
+        self._requests = 0
+
+    @property
+    def reader(self):
+        return self._reader
+
+    @property
+    def writer(self):
+        return self._writer
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def reused(self):
+        return self._requests > 0
+
+    @property
+    def last_used(self):
+        return self._last_used
+
+    def touch(self):
+        self._requests += 1
+        self._last_used = time.monotonic()
+
+    def idle_time(self, now: float = None):
+        return (now or time.monotonic()) - self._last_used
+
+    def is_alive(self):
+        return not (self._reader.at_eof() or
+                    self._writer.is_closing())
+
+    def close(self):
+        self._writer.close()
+
+
+class AsyncConnectionPool:
+    def __init__(self,
+                 max_idle: int = 32,
+                 max_per_host: int = 8,
+                 idle_timeout: float = 60.0):
+        self._max_idle = max_idle
+        self._max_per_host = max_per_host
+        self._idle_timeout = idle_timeout
+        self._idle = defaultdict(deque)
+        self._limits = defaultdict(
+            lambda: asyncio.Semaphore(self._max_per_host))
+
+    async def acquire(self, key: tuple, factory, timeout: float = None):
+        try:
+            await asyncio.wait_for(self._limits[key].acquire(), timeout)
+        except asyncio.TimeoutError:
+            scheme, host, port = key
+            raise PoolTimeoutException(f'{scheme}://{host}:{port}')
+
+        connection = self._pop_idle(key)
+        if connection is not None:
+            return connection
+
+        try:
+            reader, writer = await factory()
+        except BaseException:
+            self._limits[key].release()
+            raise
+        return AsyncConnection(reader, writer, key)
+
+    def release(self, connection: AsyncConnection, reusable: bool = True):
+        connection.touch()
+        if reusable and connection.is_alive():
+            self._idle[connection.key].append(connection)
+            self._evict_idle()
+        else:
+            connection.close()
+        self._limits[connection.key].release()
+
+    def close(self):
+        for connections in self._idle.values():
+            while connections:
+                connections.pop().close()
+
+    @property
+    def idle_count(self):
+        return sum(len(i) for i in self._idle.values())
+
+    def _pop_idle(self, key: tuple):
+        connections = self._idle[key]
+        now = time.monotonic()
+        while connections:
+            connection = connections.pop()
+            if (connection.idle_time(now) < self._idle_timeout and
+                    connection.is_alive()):
+                return connection
+            connection.close()
+        return None
+
+    def _evict_idle(self):
+        while self.idle_count > self._max_idle:
+            oldest = min((i for i in self._idle.values() if i),
+                         key=lambda i: i[0].last_used)
+            oldest.popleft().close()
+
+
+class AsyncClient:
+    def __init__(self, max_hops: int,
+                 ssl_context: ssl.SSLContext = None,
+                 keep_alive: bool = True,
+                 pool: AsyncConnectionPool = None):
+        self._max_hops = max_hops
+        self._ssl_context = ssl_context or create_ssl_context()
+        self._pool = (pool or AsyncConnectionPool()) if keep_alive \
+            else None
+
+    async def get_response(self, request: Request):
+        request.keep_alive = self._pool is not None
+        connection = await self._acquire(request)
+        try:
+            head, headers, body, reusable = await self._exchange(
+                connection, request)
+        except ConnectException:
+            self._release(connection, False)
+            if not connection.reused or not request.idempotent or \
+                    not request.body.replayable:
+                raise
+            # Same as Client: an idle connection may have been dropped by
+            # the server just as it was reused.
+            connection = await self._acquire(request)
+            try:
+                head, headers, body, reusable = await self._exchange(
+                    connection, request)
+            except ConnectException:
+                self._release(connection, False)
+                raise
+
+        self._release(connection, reusable)
+        return Response.from_message(head, body, request, headers=headers)
+
+    async def do_request(self, request: Request):
+        max_hops = self._max_hops
+        response = await self.get_response(request)
+
+        while ((300 <= response.code < 400 or
+                response.location != '') and max_hops):
+            response = await self.get_response(
+                response.request.redirect(response.location))
+            max_hops -= 1
+
+        if (not max_hops or 300 <= response.code < 400 or
+                response.location != ''):
+            raise ConnectException(str(request.url))
+
+        return response
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _acquire(self, request: Request):
+        key = (request.url.scheme, request.url.host, request.url.port)
+        if self._pool is None:
+            return AsyncConnection(*await self._open_connection(request),
+                                   key)
+        return await self._pool.acquire(
+            key, lambda: self._open_connection(request), request.timeout)
+
+    def _release(self, connection: AsyncConnection, reusable: bool):
+        if self._pool is None:
+            connection.close()
+        else:
+            self._pool.release(connection, reusable)
+
+    async def _open_connection(self, request: Request):
+        tls = request.url.scheme == 'https'
+        try:
+            return await asyncio.wait_for(asyncio.open_connection(
+                request.url.host, request.url.port,
+                ssl=self._ssl_context if tls else None,
+                server_hostname=request.url.host if tls else None,
+                limit=MAX_HEAD_SIZE), request.timeout)
+        except Exception:
+            raise ConnectException(f'{request.url.host}: '
+                                   f'{request.url.port}')
+
+    async def _exchange(self, connection: AsyncConnection,
+                        request: Request):
+        try:
+            return await asyncio.wait_for(
+                self._send_and_read(connection, request), request.timeout)
+        except Exception:
+            raise ConnectException(f'{request.url.host}: '
+                                   f'{request.url.port}')
+
+    @staticmethod
+    async def _send_and_read(connection: AsyncConnection, request: Request):
+        connection.writer.writelines(request.buffers())
+        if request.body.streaming:
+            await request.body.write(connection.writer)
+        await connection.writer.drain()
+
+        stream = connection.reader
+        while True:
+            head = (await stream.readuntil(b'\r\n\r\n'))[:-4]
+            code, headers, protocol = ResponseReader.parse_head(head)
+            if not 100 <= code < 200 or code == 101:
+                break
+
+        mode, length, keep_alive = body_framing(
+            request.request_method, code, headers, protocol)
+        if mode == NO_BODY:
+            body = b''
+        elif mode == LENGTH:
+            body = await stream.readexactly(length)
+        elif mode == CHUNKED:
+            body = await AsyncClient._read_chunked(stream)
+        else:
+            body = await stream.read()
+        return head, headers, body, keep_alive and request.keep_alive
+
+    @staticmethod
+    async def _read_chunked(stream: asyncio.StreamReader):
+        body = bytearray()
+        while True:
+            line = await stream.readuntil(b'\r\n')
+            size = int(line.split(b';')[0].strip(), 16)
+            if size == 0:
+                break
+            body += await stream.readexactly(size)
+            if await stream.readexactly(2) != b'\r\n':
+                raise ResponseException('bad chunk terminator')
+
+        while await stream.readuntil(b'\r\n') != b'\r\n':
+            pass
+        return bytes(body)
+
+    @property
+    def pool(self):
+        return self._pool
+
+    @property
+    def max_hops(self):
+        return self._max_hops
+
+    @max_hops.setter
+    def max_hops(self, value: int):
+        self._max_hops = value
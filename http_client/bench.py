@@ -0,0 +1,197 @@
+import math
+import threading
+import time
+
+from http_client.client import Client
+from http_client.exceptions import HTTPSClientException
+from http_client.request import Request
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class BenchResult:
+    def __init__(self, latencies: list, codes: dict, errors: dict,
+                 bytes_sent: int, bytes_received: int, duration: float,
+                 concurrency: int, rate: float = None):
+        self._latencies = sorted(latencies)
+        self._codes = codes
+        self._errors = errors
+        self._bytes_sent = bytes_sent
+        self._bytes_received = bytes_received
+        self._duration = duration
+        self._concurrency = concurrency
+        self._rate = rate
+
+    def percentile(self, percent: float):
+        if not self._latencies:
+            return None
+        # Nearest rank, so p99.9 of a short run is its slowest request
+        # rather than an interpolated value nobody saw.
+        rank = math.ceil(percent / 100 * len(self._latencies))
+        return self._latencies[max(rank, 1) - 1]
+
+    def as_dict(self):
+        latencies = self._latencies
+        latency = {'min': latencies[0] if latencies else None,
+                   'mean': sum(latencies) / len(latencies)
+                   if latencies else None,
+                   'max': latencies[-1] if latencies else None}
+        for percent in PERCENTILES:
+            latency[f'p{percent:g}'] = self.percentile(percent)
+        duration = self._duration or float('inf')
+        return {'requests': self.requests,
+                'responses': len(latencies),
+                'errors': dict(self._errors),
+                'codes': {str(code): count
+                          for code, count in sorted(self._codes.items())},
+                'concurrency': self._concurrency,
+                'rate': self._rate,
+                'duration': self._duration,
+                'throughput': self.requests / duration,
+                'bytes_sent': self._bytes_sent,
+                'bytes_received': self._bytes_received,
+                'sent_per_second': self._bytes_sent / duration,
+                'received_per_second': self._bytes_received / duration,
+                'latency': latency}
+
+    def report(self) -> str:
+        result = self.as_dict()
+        mode = f'{self._rate:g} req/s arrival rate' \
+            if self._rate else f'{self._concurrency} connections'
+        lines = [f'Requests:    {result["requests"]} '
+                 f'({sum(self._errors.values())} errors) with {mode}',
+                 f'Duration:    {result["duration"]:.2f} s',
+                 f'Throughput:  {result["throughput"]:.1f} req/s',
+                 f'Transfer:    '
+                 f'{result["received_per_second"] / 1024:.1f} KiB/s in, '
+                 f'{result["sent_per_second"] / 1024:.1f} KiB/s out']
+        if self._latencies:
+            lines.append('Latency:     ' + '  '.join(
+                f'{name} {value * 1000:.2f} ms'
+                for name, value in result['latency'].items()))
+        if result['codes']:
+            lines.append('Codes:       ' + '  '.join(
+                f'{code}: {count}'
+                for code, count in result['codes'].items()))
+        if self._errors:
+            lines.append('Errors:      ' + '  '.join(
+                f'{error}: {count}'
+                for error, count in sorted(self._errors.items())))
+        return '\n'.join(lines) + '\n'
+
+    @property
+    def requests(self):
+        return len(self._latencies) + sum(self._errors.values())
+
+    @property
+    def latencies(self):
+        return self._latencies
+
+    @property
+    def codes(self):
+        return self._codes
+
+    @property
+    def errors(self):
+        return self._errors
+
+    @property
+    def duration(self):
+        return self._duration
+
+
+class Bench:
+    def __init__(self, client: Client, request: Request,
+                 requests: int = None,
+                 duration: float = None,
+                 concurrency: int = 8,
+                 rate: float = None,
+                 clock=time.perf_counter,
+                 sleep=time.sleep):
+        if requests is None and duration is None:
+            raise HTTPSClientException('bench needs a number of requests '
+                                       'or a duration')
+        self._client = client
+        self._request = request
+        self._requests = requests
+        self._duration = duration
+        self._concurrency = concurrency
+        self._rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._issued = 0
+        self._started = 0.0
+        self._lock = threading.Lock()
+
+    def run(self) -> BenchResult:
+        template = self._client.template(self._request)
+        self._issued = 0
+        self._started = self._clock()
+        # Every worker records into its own lists; they are merged once
+        # the run is over so the hot loop takes no shared lock.
+        workers = [{'latencies': [], 'codes': {}, 'errors': {},
+                    'sent': 0, 'received': 0}
+                   for _ in range(self._concurrency)]
+        threads = [threading.Thread(target=self._work,
+                                    args=(template, worker), daemon=True)
+                   for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = self._clock() - self._started
+
+        latencies, codes, errors = [], {}, {}
+        for worker in workers:
+            latencies += worker['latencies']
+            for code, count in worker['codes'].items():
+                codes[code] = codes.get(code, 0) + count
+            for error, count in worker['errors'].items():
+                errors[error] = errors.get(error, 0) + count
+        return BenchResult(latencies, codes, errors,
+                           sum(i['sent'] for i in workers),
+                           sum(i['received'] for i in workers),
+                           duration, self._concurrency, self._rate)
+
+    def _next(self):
+        with self._lock:
+            if self._requests is not None and \
+                    self._issued >= self._requests:
+                return None
+            index = self._issued
+            self._issued += 1
+
+        if self._rate:
+            # Open loop: request i is due at a fixed time whether or not
+            # earlier ones have finished, and its latency is counted from
+            # then. A stalled server shows up as queueing delay instead
+            # of silently lowering the offered load.
+            scheduled = self._started + index / self._rate
+        else:
+            scheduled = self._clock()
+        if self._duration is not None and \
+                scheduled - self._started >= self._duration:
+            return None
+        return scheduled
+
+    def _work(self, template, worker: dict):
+        while True:
+            scheduled = self._next()
+            if scheduled is None:
+                return
+            delay = scheduled - self._clock()
+            if delay > 0:
+                self._sleep(delay)
+
+            try:
+                response = self._client.do_request(template.request())
+            except Exception as e:
+                errors = worker['errors']
+                name = type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+                continue
+            worker['latencies'].append(self._clock() - scheduled)
+            worker['codes'][response.code] = \
+                worker['codes'].get(response.code, 0) + 1
+            worker['sent'] += response.timings.bytes_sent
+            worker['received'] += response.timings.bytes_received
@@ -0,0 +1,207 @@
+import asyncio
+import io
+import os
+import ssl
+from contextlib import nullcontext
+from pathlib import Path
+
+from http_client.exceptions import UnreadableFileException
+
+ENCODING = 'ISO-8859-1'
+CHUNK_SIZE = 64 * 1024
+
+
+def send_buffers(sock, buffers: list):
+    if isinstance(sock, ssl.SSLSocket) or not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(buffers))
+        return
+
+    # Scatter-gather write: the kernel reads the buffers in place, so the
+    # request line, headers and body are never concatenated.
+    views = [memoryview(i) for i in buffers if i]
+    while views:
+        sent = sock.sendmsg(views)
+        while sent:
+            if sent >= len(views[0]):
+                sent -= len(views.pop(0))
+            else:
+                views[0] = views[0][sent:]
+                sent = 0
+
+
+class Body:
+    streaming = False
+    replayable = True
+    length = 0
+
+    @staticmethod
+    def create(data=None) -> 'Body':
+        if isinstance(data, Body):
+            return data
+        if data is None or data == '' or data == b'':
+            return BytesBody(b'')
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return BytesBody(bytes(data))
+        if isinstance(data, str):
+            if Body._is_file(data):
+                return FileBody(data)
+            return BytesBody(data.encode(ENCODING))
+        if isinstance(data, Path) or hasattr(data, 'read'):
+            return FileBody(data)
+        return IterableBody(data)
+
+    @staticmethod
+    def _is_file(data: str):
+        try:
+            return Path(data).is_file()
+        except (OSError, ValueError):
+            return False
+
+    def framing(self) -> bytes:
+        return b'Content-Length: %d\r\n\r\n' % self.length
+
+    def buffers(self) -> list:
+        return []
+
+    def send(self, sock) -> int:
+        return 0
+
+    def chunks(self):
+        return iter(())
+
+    async def write(self, writer: asyncio.StreamWriter):
+        pass
+
+
+class BytesBody(Body):
+    def __init__(self, data: bytes):
+        self._data = data
+        self.length = len(data)
+
+    def buffers(self) -> list:
+        return [self._data] if self._data else []
+
+    def chunks(self):
+        return iter(self.buffers())
+
+    @property
+    def data(self):
+        return self._data
+
+
+class FileBody(Body):
+    streaming = True
+
+    def __init__(self, file):
+        if isinstance(file, (str, Path)):
+            self._path = str(file)
+            self._file = None
+            self._offset = 0
+            try:
+                self.length = os.stat(self._path).st_size
+            except OSError:
+                raise UnreadableFileException(self._path)
+        else:
+            self._path = None
+            self._file = file
+            self._offset = file.tell()
+            self.length = self._size(file) - self._offset
+
+    def send(self, sock) -> int:
+        with self._open() as f:
+            if isinstance(sock, ssl.SSLSocket) or \
+                    not hasattr(sock, 'sendfile'):
+                self._send_copy(sock, f)
+            else:
+                # The kernel copies the file to the socket directly.
+                sock.sendfile(f, self._offset, self.length)
+        return self.length
+
+    def chunks(self):
+        with self._open() as f:
+            f.seek(self._offset)
+            left = self.length
+            while left:
+                chunk = f.read(min(left, CHUNK_SIZE))
+                if not chunk:
+                    raise UnreadableFileException(self._path or str(f))
+                left -= len(chunk)
+                yield chunk
+
+    async def write(self, writer: asyncio.StreamWriter):
+        await writer.drain()
+        with self._open() as f:
+            await asyncio.get_running_loop().sendfile(
+                writer.transport, f, self._offset, self.length)
+
+    @property
+    def path(self):
+        return self._path
+
+    def _send_copy(self, sock, f):
+        f.seek(self._offset)
+        buffer = bytearray(CHUNK_SIZE)
+        left = self.length
+        with memoryview(buffer) as view:
+            while left:
+                read = f.readinto(view[:min(left, CHUNK_SIZE)])
+                if not read:
+                    raise UnreadableFileException(self._path or str(f))
+                sock.sendall(view[:read])
+                left -= read
+
+    def _open(self):
+        if self._file is not None:
+            return nullcontext(self._file)
+        try:
+            return open(self._path, 'rb')
+        except OSError:
+            raise UnreadableFileException(self._path)
+
+    @staticmethod
+    def _size(file):
+        try:
+            return os.fstat(file.fileno()).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            position = file.tell()
+            size = file.seek(0, io.SEEK_END)
+            file.seek(position)
+            return size
+
+
+class IterableBody(Body):
+    streaming = True
+    replayable = False
+    length = None
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def framing(self) -> bytes:
+        return b'Transfer-Encoding: chunked\r\n\r\n'
+
+    def send(self, sock) -> int:
+        sent = 5
+        for chunk in self._iter_chunks():
+            size = b'%x\r\n' % len(chunk)
+            send_buffers(sock, [size, chunk, b'\r\n'])
+            sent += len(size) + len(chunk) + 2
+        sock.sendall(b'0\r\n\r\n')
+        return sent
+
+    def chunks(self):
+        return self._iter_chunks()
+
+    async def write(self, writer: asyncio.StreamWriter):
+        for chunk in self._iter_chunks():
+            writer.writelines([b'%x\r\n' % len(chunk), chunk, b'\r\n'])
+            await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    def _iter_chunks(self):
+        for chunk in self._chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(ENCODING)
+            if chunk:
+                yield chunk
@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import deque
+
+from http_client.exceptions import CircuitOpenException, \
+    ConcurrencyLimitException
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+
+class RollingWindow:
+    def __init__(self, window: float = 10.0, buckets: int = 10):
+        self._width = window / buckets
+        self._buckets = buckets
+        # [bucket number, calls, failures, slow calls], oldest first
+        self._counts = deque()
+
+    def add(self, now: float, failed: bool, slow: bool):
+        number = int(now / self._width)
+        if not self._counts or self._counts[-1][0] != number:
+            self._counts.append([number, 0, 0, 0])
+        bucket = self._counts[-1]
+        bucket[1] += 1
+        bucket[2] += failed
+        bucket[3] += slow
+
+    def totals(self, now: float):
+        oldest = int(now / self._width) - self._buckets + 1
+        while self._counts and self._counts[0][0] < oldest:
+            self._counts.popleft()
+        calls = sum(i[1] for i in self._counts)
+        failures = sum(i[2] for i in self._counts)
+        slow = sum(i[3] for i in self._counts)
+        return calls, failures, slow
+
+    def clear(self):
+        self._counts.clear()
+
+
+class CircuitBreaker:
+    def __init__(self, origin: str,
+                 failure_rate: float = 0.5,
+                 slow_rate: float = 1.0,
+                 slow_call: float = 5.0,
+                 min_calls: int = 20,
+                 window: float = 10.0,
+                 open_time: float = 5.0,
+                 probes: int = 1,
+                 clock=time.monotonic):
+        self._origin = origin
+        self._failure_rate = failure_rate
+        self._slow_rate = slow_rate
+        self._slow_call = slow_call
+        self._min_calls = min_calls
+        self._open_time = open_time
+        self._probes = probes
+        self._clock = clock
+        self._window = RollingWindow(window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = 0
+        self._passed = 0
+        # Counts half-open periods; a probe carries the one it was let in
+        # during, so calls admitted earlier can't settle a later trial.
+        self._trial = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self._state == OPEN and \
+                    self._clock() - self._opened_at >= self._open_time:
+                self._state = HALF_OPEN
+                self._probing = self._passed = 0
+                self._trial += 1
+
+            if self._state == CLOSED:
+                return None
+            if self._state == HALF_OPEN and self._probing < self._probes:
+                self._probing += 1
+                return self._trial
+            self._rejected += 1
+        raise CircuitOpenException(self._origin)
+
+    def record(self, success: bool, latency: float, probe: int = None):
+        # `probe` is what before_call returned for this call.
+        slow = latency >= self._slow_call
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                if probe != self._trial:
+                    # Let in while closed, or probing an earlier trial.
+                    return
+                self._probing -= 1
+                if not success or slow:
+                    self._open(now)
+                else:
+                    self._passed += 1
+                    if self._passed >= self._probes:
+                        self._state = CLOSED
+                        self._window.clear()
+                return
+
+            if self._state == OPEN:
+                return
+            self._window.add(now, not success, slow)
+            calls, failures, slow_calls = self._window.totals(now)
+            if calls >= self._min_calls and (
+                    failures / calls >= self._failure_rate or
+                    slow_calls / calls >= self._slow_rate):
+                self._open(now)
+
+    def cancel(self, probe: int = None):
+        # Frees the probe slot of a call that was never made.
+        with self._lock:
+            if self._state == HALF_OPEN and probe == self._trial:
+                self._probing -= 1
+
+    def _open(self, now: float):
+        self._state = OPEN
+        self._opened_at = now
+        self._window.clear()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and \
+                    self._clock() - self._opened_at >= self._open_time:
+                return HALF_OPEN
+            return self._state
+
+    @property
+    def stats(self):
+        state = self.state
+        with self._lock:
+            calls, failures, slow = self._window.totals(self._clock())
+            return {'state': state,
+                    'calls': calls,
+                    'failures': failures,
+                    'slow_calls': slow,
+                    'rejected': self._rejected}
+
+
+class AdaptiveLimiter:
+    def __init__(self, origin: str,
+                 initial: int = 20,
+                 minimum: int = 1,
+                 maximum: int = 200,
+                 backoff: float = 0.9,
+                 tolerance: float = 2.0):
+        self._origin = origin
+        self._limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._backoff = backoff
+        self._tolerance = tolerance
+        self._min_latency = None
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float = None):
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._in_flight < int(self._limit), timeout):
+                raise ConcurrencyLimitException(self._origin)
+            self._in_flight += 1
+
+    def release(self, success: bool, latency: float):
+        with self._condition:
+            self._in_flight -= 1
+            if success and (self._min_latency is None or
+                            latency < self._min_latency):
+                self._min_latency = latency
+
+            # AIMD: grow by about one per limit's worth of good calls,
+            # shrink by a factor on errors or when queueing shows up as
+            # latency well above the best seen.
+            if not success or latency > self._min_latency * self._tolerance:
+                self._limit = max(self._minimum, self._limit * self._backoff)
+            else:
+                self._limit = min(self._maximum,
+                                  self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def stats(self):
+        with self._condition:
+            return {'limit': int(self._limit),
+                    'in_flight': self._in_flight,
+                    'min_latency': self._min_latency}
+
+
+class HostGuard:
+    def __init__(self, breaker=CircuitBreaker, limiter=AdaptiveLimiter):
+        # Factories taking the origin; None turns that part off.
+        self._breaker_factory = breaker
+        self._limiter_factory = limiter
+        self._breakers = {}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def enter(self, origin: str, timeout: float = None):
+        # Returns the probe token to hand back to exit.
+        breaker, limiter = self._get(origin)
+        probe = None
+        if breaker is not None:
+            probe = breaker.before_call()
+        if limiter is not None:
+            try:
+                limiter.acquire(timeout)
+            except ConcurrencyLimitException:
+                if breaker is not None:
+                    breaker.cancel(probe)
+                raise
+        return probe
+
+    def exit(self, origin: str, success: bool, latency: float,
+             probe: int = None):
+        breaker, limiter = self._get(origin)
+        if limiter is not None:
+            limiter.release(success, latency)
+        if breaker is not None:
+            breaker.record(success, latency, probe)
+
+    def breaker(self, origin: str) -> CircuitBreaker:
+        return self._get(origin)[0]
+
+    def limiter(self, origin: str) -> AdaptiveLimiter:
+        return self._get(origin)[1]
+
+    def _get(self, origin: str):
+        with self._lock:
+            if origin not in self._breakers:
+                self._breakers[origin] = self._breaker_factory(origin) \
+                    if self._breaker_factory else None
+                self._limiters[origin] = self._limiter_factory(origin) \
+                    if self._limiter_factory else None
+            return self._breakers[origin], self._limiters[origin]
+
+    @property
+    def stats(self):
+        with self._lock:
+            origins = list(self._breakers)
+        stats = {}
+        for origin in origins:
+            breaker, limiter = self._get(origin)
+            stats[origin] = {}
+            if breaker is not None:
+                stats[origin].update(breaker.stats)
+            if limiter is not None:
+                stats[origin].update(limiter.stats)
+        return stats
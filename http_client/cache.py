@@ -0,0 +1,390 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from email.utils import mktime_tz, parsedate_tz
+
+from http_client.headers import Headers
+from http_client.request import Request
+from http_client.response import Response
+
+CACHEABLE_METHODS = ('GET', 'HEAD')
+SAFE_METHODS = CACHEABLE_METHODS + ('OPTIONS', 'TRACE')
+# Status codes that may be cached without explicit freshness information.
+HEURISTIC_CODES = (200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501)
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since',
+                       'If-Match', 'If-Unmodified-Since', 'If-Range')
+# Fields a 304 must not overwrite in the stored response.
+KEEP_ON_UPDATE = ('connection', 'keep-alive', 'transfer-encoding', 'te',
+                  'trailer', 'upgrade', 'content-length',
+                  'content-encoding', 'content-range')
+HEURISTIC_FRACTION = 0.1
+
+
+def parse_cache_control(values) -> dict:
+    directives = {}
+    for value in values:
+        for item in value.split(','):
+            name, _, argument = item.partition('=')
+            name = name.strip().lower()
+            if name:
+                directives[name] = argument.strip().strip('"') or None
+    return directives
+
+
+def parse_date(value: str):
+    if not value:
+        return None
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    try:
+        return mktime_tz(parsed)
+    except (OverflowError, ValueError):
+        return None
+
+
+def parse_seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, status_line: bytes, headers: Headers, body,
+                 vary: dict, request_time: float, response_time: float):
+        self._status_line = status_line
+        self._headers = headers
+        self._body = body
+        self._vary = vary
+        self._request_time = request_time
+        self._response_time = response_time
+
+    @classmethod
+    def from_response(cls, response: Response, request_headers: Headers,
+                      request_time: float, response_time: float):
+        status_line = response.head.partition(b'\r\n')[0]
+        vary = {name: request_headers.get(name)
+                for name in cls.vary_names(response.headers)}
+        return cls(status_line, response.headers.copy(), response.body,
+                   vary, request_time, response_time)
+
+    @staticmethod
+    def vary_names(headers: Headers):
+        return [i.strip().lower()
+                for value in headers.getall('Vary')
+                for i in value.split(',') if i.strip()]
+
+    def matches(self, request_headers: Headers):
+        return all(request_headers.get(name) == value
+                   for name, value in self._vary.items())
+
+    def update(self, headers: Headers, request_time: float,
+               response_time: float):
+        for name, value in headers.multi_items():
+            if name.lower() not in KEEP_ON_UPDATE:
+                self._headers.pop(name, None)
+        for name, value in headers.multi_items():
+            if name.lower() not in KEEP_ON_UPDATE:
+                self._headers.add(name, value)
+        self._request_time = request_time
+        self._response_time = response_time
+
+    def current_age(self, now: float):
+        date = parse_date(self._headers.get('Date')) or self._response_time
+        apparent_age = max(0.0, self._response_time - date)
+        age = parse_seconds(self._headers.get('Age')) or 0
+        corrected_age = age + self._response_time - self._request_time
+        return max(apparent_age, corrected_age) + now - self._response_time
+
+    def freshness_lifetime(self):
+        directives = self.directives
+        max_age = parse_seconds(directives.get('max-age'))
+        if max_age is not None:
+            return max_age
+
+        if 'Expires' in self._headers:
+            expires = parse_date(self._headers['Expires'])
+            if expires is None:
+                return 0
+            date = parse_date(self._headers.get('Date')) or \
+                self._response_time
+            return max(0.0, expires - date)
+
+        last_modified = parse_date(self._headers.get('Last-Modified'))
+        if last_modified is not None and self.code in HEURISTIC_CODES:
+            date = parse_date(self._headers.get('Date')) or \
+                self._response_time
+            return max(0.0, date - last_modified) * HEURISTIC_FRACTION
+        return 0
+
+    def response(self, request: Request, now: float) -> Response:
+        headers = self._headers.copy()
+        headers['Age'] = str(int(self.current_age(now)))
+        return Response.from_message(self.head, self._body, request,
+                                     headers=headers)
+
+    @property
+    def directives(self):
+        return parse_cache_control(self._headers.getall('Cache-Control'))
+
+    @property
+    def validators(self):
+        validators = {}
+        if 'ETag' in self._headers:
+            validators['If-None-Match'] = self._headers['ETag']
+        if 'Last-Modified' in self._headers:
+            validators['If-Modified-Since'] = self._headers['Last-Modified']
+        return validators
+
+    @property
+    def code(self):
+        return int(self._status_line.split(b' ', 2)[1])
+
+    @property
+    def status_line(self):
+        return self._status_line
+
+    @property
+    def head(self):
+        return self._status_line + b'\r\n' + self._headers.encode()
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def body(self):
+        return self._body
+
+    @property
+    def vary(self):
+        return self._vary
+
+    @property
+    def request_time(self):
+        return self._request_time
+
+    @property
+    def response_time(self):
+        return self._response_time
+
+    @property
+    def size(self):
+        return len(self._status_line) + len(self._body) + \
+            sum(len(name) + len(value) + 4
+                for name, value in self._headers.multi_items())
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> list:
+        pass
+
+    @abstractmethod
+    def put(self, key: str, entries: list):
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._evictions = 0
+        # key -> (variants, size in bytes), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> list:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return []
+            self._entries.move_to_end(key)
+            return list(item[0])
+
+    def put(self, key: str, entries: list):
+        size = sum(i.size for i in entries)
+        with self._lock:
+            self._remove(key)
+            if not entries or size > self._max_bytes:
+                return
+            self._entries[key] = (list(entries), size)
+            self._size += size
+            while self._size > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: str):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._size -= item[1]
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @property
+    def evictions(self):
+        return self._evictions
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class HTTPCache:
+    def __init__(self, backend: CacheBackend = None, clock=time.time):
+        self._backend = backend if backend is not None \
+            else MemoryCacheBackend()
+        self._clock = clock
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+        self._stores = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, request: Request):
+        return f'{method} {request.url.with_fragment(None)}'
+
+    def fetch(self, request: Request, send) -> Response:
+        method = request.request_method
+        if method not in CACHEABLE_METHODS:
+            response = send(request)
+            if method not in SAFE_METHODS and response.code < 400:
+                self.invalidate(request)
+            return response
+
+        request_headers = Headers(request.headers)
+        directives = parse_cache_control(
+            request_headers.getall('Cache-Control'))
+        if 'no-store' in directives or \
+                any(i in request_headers for i in CONDITIONAL_HEADERS):
+            return send(request)
+
+        key = self.key(method, request)
+        variants = self._backend.get(key)
+        entry = next((i for i in variants if i.matches(request_headers)),
+                     None)
+
+        now = self._clock()
+        if entry is not None and self._is_fresh(entry, directives, now):
+            self._count('_hits')
+            return entry.response(request, now)
+
+        if entry is not None and entry.validators:
+            conditional = request.derive()
+            for name, value in entry.validators.items():
+                conditional.set_value_in_headers(name, value)
+            response = send(conditional)
+            response_time = self._clock()
+            if response.code == 304:
+                # The body is empty; reading it releases the connection.
+                response.read()
+                entry.update(response.headers, now, response_time)
+                self._store(key, variants, entry, request_headers)
+                self._count('_revalidations')
+                return entry.response(request, response_time)
+        else:
+            response = send(request)
+            response_time = self._clock()
+
+        self._count('_misses')
+        if self.is_storable(response, directives):
+            entry = CacheEntry.from_response(response, request_headers,
+                                             now, response_time)
+            if entry.validators or entry.freshness_lifetime() > 0:
+                self._store(key, variants, entry, request_headers)
+                self._count('_stores')
+        return response
+
+    def invalidate(self, request: Request):
+        for method in CACHEABLE_METHODS:
+            self._backend.delete(self.key(method, request))
+
+    def clear(self):
+        self._backend.clear()
+
+    @staticmethod
+    def is_storable(response: Response, request_directives: dict):
+        if response.raw is not None or response.head is None:
+            # Streamed bodies are handed to the caller unread.
+            return False
+        directives = parse_cache_control(
+            response.headers.getall('Cache-Control'))
+        if 'no-store' in directives or 'no-store' in request_directives:
+            return False
+        if '*' in CacheEntry.vary_names(response.headers):
+            return False
+        return (response.code in HEURISTIC_CODES or
+                'max-age' in directives or 'public' in directives or
+                'Expires' in response.headers)
+
+    @staticmethod
+    def _is_fresh(entry: CacheEntry, request_directives: dict, now: float):
+        directives = entry.directives
+        if 'no-cache' in directives or 'no-cache' in request_directives:
+            return False
+
+        lifetime = entry.freshness_lifetime()
+        age = entry.current_age(now)
+        max_age = parse_seconds(request_directives.get('max-age'))
+        if max_age is not None:
+            lifetime = min(lifetime, max_age)
+        min_fresh = parse_seconds(request_directives.get('min-fresh'))
+        if min_fresh is not None:
+            age += min_fresh
+        if 'max-stale' in request_directives and \
+                'must-revalidate' not in directives:
+            max_stale = parse_seconds(request_directives['max-stale'])
+            lifetime += float('inf') if max_stale is None else max_stale
+        return age < lifetime
+
+    def _store(self, key: str, variants: list, entry: CacheEntry,
+               request_headers: Headers):
+        variants = [i for i in variants
+                    if i is not entry and
+                    not (i.vary.keys() == entry.vary.keys() and
+                         i.matches(request_headers))]
+        self._backend.put(key, [entry] + variants)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @property
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses + self._revalidations
+            return {'hits': self._hits,
+                    'misses': self._misses,
+                    'revalidations': self._revalidations,
+                    'stores': self._stores,
+                    'hit_ratio': (self._hits + self._revalidations) /
+                    lookups if lookups else 0.0}
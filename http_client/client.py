@@ -1,85 +1,682 @@
 import ssl
-from socket import socket, AF_INET, SOCK_STREAM
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from socket import timeout as socket_timeout
 
-from http_client.exceptions import ConnectException
-from http_client.request import Request
+from http_client.body import send_buffers
+from http_client.breaker import HostGuard
+from http_client.cache import HTTPCache
+from http_client.cookies import CookieJar
+from http_client.exceptions import CertificateVerifyException, \
+    ConnectException, HTTPSClientException, TimeoutException, \
+    ConnectTimeoutException, TLSTimeoutException, WriteTimeoutException, \
+    PoolTimeoutException
+from http_client.http2 import H2Connection, ALPN
+from http_client.metrics import ClientMetrics
+from http_client.pool import ConnectionPool, Connection
+from http_client.reader import ResponseStream
+from http_client.request import Request, RequestTemplate
+from http_client.resolver import Resolver
 from http_client.response import Response
-
-CHUNK = 1024
+from http_client.retry import RetryPolicy
+from http_client.timeouts import Timeouts, Deadline
+from http_client.tls import create_ssl_context, Handshake, SessionCache, \
+    TLSMetrics
+from http_client.trace import Hooks, Timings
 
 
 class Client:
-    def __init__(self, max_hops: int):
+    def __init__(self, max_hops: int,
+                 keep_alive: bool = True,
+                 pool: ConnectionPool = None,
+                 ssl_context: ssl.SSLContext = None,
+                 cache: HTTPCache = None,
+                 resolver: Resolver = None,
+                 timeouts: Timeouts = None,
+                 retry: RetryPolicy = None,
+                 guard: HostGuard = None,
+                 hooks: Hooks = None,
+                 metrics: ClientMetrics = None,
+                 http2: bool = False,
+                 cookies: CookieJar = None):
         self._const_max_hops = max_hops
         self._max_hops = max_hops
-        self._response = None
+        self._pool = (pool or ConnectionPool()) if keep_alive else None
+        self._ssl_context = ssl_context or create_ssl_context(
+            alpn=ALPN if http2 else None)
+        self._sessions = SessionCache()
+        self._tls_metrics = TLSMetrics()
+        self._cache = cache
+        self._resolver = resolver or Resolver()
+        self._timeouts = timeouts or Timeouts()
+        self._retry = retry
+        self._guard = guard
+        self._hooks = hooks
+        self._metrics = metrics or ClientMetrics()
+        self._metrics.bind(self)
+        # HTTP/2 needs the pool: one shared connection per origin stands
+        # in for the pooled HTTP/1.1 ones.
+        self._http2 = http2 and self._pool is not None
+        self._multiplexed = {}
+        self._http1_origins = set()
+        self._opening = {}
+        self._multiplexed_lock = threading.Lock()
+        self._cookies = cookies
 
-    def get_response(self, request):
-        return Response.from_bytes(
-            self._get_response(self._prepare_socket(request), request),
-            request)
+    def get_response(self, request, stream: bool = False):
+        self._add_cookies(request)
+        if self._cache is None:
+            return self._store_cookies(self._retrying_fetch(request, stream))
+        # Only responses off the network set cookies; a cache hit replays
+        # the Set-Cookie of a response the jar has already seen.
+        return self._cache.fetch(
+            request,
+            lambda i: self._store_cookies(self._retrying_fetch(i, stream)))
+
+    def _add_cookies(self, request: Request):
+        if self._cookies is None:
+            return
+        # Changing keep-alive rebuilds the headers, so it is settled
+        # before the Cookie header is.
+        request.keep_alive = self._pool is not None
+        # The jar owns the Cookie header, so every hop of a redirect
+        # gets the cookies of its own URL.
+        cookie = self._cookies.header(request.url)
+        if cookie is None:
+            request.remove_header('Cookie')
+        elif cookie != request.headers.get('Cookie'):
+            request.set_value_in_headers('Cookie', cookie)
+
+    def _store_cookies(self, response: Response):
+        if self._cookies is not None:
+            self._cookies.extract(response)
+        return response
+
+    def _retrying_fetch(self, request, stream: bool = False):
+        if self._retry is None:
+            return self._guarded_fetch(request, stream)
+        return self._retry.call(request,
+                                lambda i: self._guarded_fetch(i, stream))
+
+    def _guarded_fetch(self, request, stream: bool = False):
+        origin = request.origin
+        probe = None
+        if self._guard is not None:
+            probe = self._guard.enter(origin, self._timeout(request, 'pool'))
+        started = time.perf_counter()
+
+        def done(success: bool):
+            if self._guard is not None:
+                self._guard.exit(origin, success,
+                                 time.perf_counter() - started, probe)
 
-    @staticmethod
-    def _get_response(sock, request: Request):
-        response = bytearray()
         try:
-            sock.connect((
-                request.url.host,
-                request.url.port))
+            # A streamed response holds its slot until the body is read.
+            response = self._fetch(request, stream, done)
+        except BaseException as e:
+            self._metrics.failed(request, e)
+            done(False)
+            raise
+        if not stream:
+            done(response.code < 500)
+        return response
 
-            if request.url.scheme == 'https':
-                sock.do_handshake()
+    def _fetch(self, request, stream: bool = False, done=None):
+        request.keep_alive = self._pool is not None
+        timings = Timings()
+        connection = None
+        if self._http2 and request.url.scheme == 'https':
+            connection = self._multiplexed_connection(request, timings)
+            if isinstance(connection, H2Connection):
+                return self._fetch_multiplexed(connection, request, stream,
+                                               timings, done)
+        connection, head = self._send(request, timings, connection)
 
-            sock.sendall(bytes(request))
+        if stream:
+            def release(reusable):
+                self._finish(response, connection.reader.received)
+                self._release(connection, reusable and request.keep_alive)
+                if done is not None:
+                    done(response.code < 500)
 
+            response = Response.from_message(
+                head, b'', request,
+                raw=ResponseStream(connection.reader, release),
+                handshake=self._new_handshake(connection),
+                headers=connection.reader.headers, timings=timings)
+            return response
+
+        try:
+            body = connection.reader.read_body()
+        except TimeoutException:
+            self._release(connection, False)
+            raise
         except Exception:
+            self._release(connection, False)
             raise ConnectException(f'{request.url.host}: '
                                    f'{request.url.port}')
 
-        while True:
-            data = sock.recv(CHUNK)
-            if not data or data == '':
-                break
-            response.extend(data)
+        response = Response.from_message(
+            head, body, request, handshake=self._new_handshake(connection),
+            headers=connection.reader.headers, timings=timings)
+        self._finish(response, connection.reader.received)
+        self._release(connection,
+                      connection.reader.reusable and request.keep_alive)
+        return response
 
-        sock.close()
+    def _fetch_multiplexed(self, connection: H2Connection,
+                           request: Request, stream: bool,
+                           timings: Timings, done=None):
+        try:
+            h2_stream = connection.request(request,
+                                           self._timeout(request, 'write'))
+        except PoolTimeoutException:
+            self._check_deadline(request)
+            raise
+        timings.add_sent(h2_stream.sent)
+        timings.mark('sent')
+        self._emit('on_request_sent', request, bytes_sent=h2_stream.sent)
+
+        try:
+            h2_stream.set_timeout(self._timeout(request, 'read'),
+                                  request.deadline)
+            head = h2_stream.read_head(request.request_method)
+            timings.mark('first_byte')
+            self._emit('on_first_byte', request)
+            if stream:
+                def release(reusable):
+                    h2_stream.close()
+                    self._finish(response, h2_stream.received)
+                    if done is not None:
+                        done(response.code < 500)
+
+                response = Response.from_message(
+                    head, b'', request,
+                    raw=ResponseStream(h2_stream, release),
+                    handshake=self._new_handshake(connection),
+                    headers=h2_stream.headers, timings=timings)
+                return response
+            body = h2_stream.read_body()
+        except BaseException:
+            h2_stream.close()
+            raise
+
+        h2_stream.close()
+        connection.touch()
+        response = Response.from_message(
+            head, body, request, handshake=self._new_handshake(connection),
+            headers=h2_stream.headers, timings=timings)
+        self._finish(response, h2_stream.received)
         return response
 
-    def do_request(self, request: Request):
-        self._max_hops = self._const_max_hops
-        self._response = self.get_response(request)
-
-        while ((300 <= self._response.code < 400 or
-                self._response.location != '') and self.max_hops):
-            temp_request = Request(url=self._response.location,
-                                   reference=request.reference,
-                                   cookie=request.cookie,
-                                   agent=request.user_agent,
-                                   headers=request.headers,
-                                   method=request.request_method,
-                                   cookie_file=request.cookie_file,
-                                   timeout=request.timeout,
-                                   data=request.data,
-                                   protocol=request.protocol)
-            self._response = self.get_response(temp_request)
-            self._max_hops -= 1
-
-        if (not self.max_hops or 300 <= self._response.code < 400 or
-                self._response.location != ''):
+    def _multiplexed_connection(self, request: Request, timings: Timings):
+        key = self._pool_key(request)
+        with self._multiplexed_lock:
+            if key in self._http1_origins:
+                return None
+            lock = self._opening.setdefault(key, threading.Lock())
+
+        # Requests that arrive while the connection is being set up wait
+        # for it and share it instead of each opening their own.
+        with lock:
+            connection = self._multiplexed.get(key)
+            if connection is not None and connection.available:
+                self._emit('on_pool_reuse', request, connection=connection)
+                return connection
+            if connection is not None:
+                # Got GOAWAY or failed: streams still on it may finish,
+                # then it is closed.
+                connection.retire()
+
+            opened = self._open_connection(request, timings)
+            if opened.handshake is None or opened.handshake.alpn != 'h2':
+                # The server only speaks HTTP/1.1: this request uses the
+                # new connection and later ones go through the pool.
+                with self._multiplexed_lock:
+                    self._http1_origins.add(key)
+                self._pool.adopt(opened)
+                return opened
+            timeout = self._timeouts.write
+            connection = H2Connection(
+                opened.sock, key, opened.handshake,
+                request.timeout if timeout is None else timeout)
+            with self._multiplexed_lock:
+                self._multiplexed[key] = connection
+            return connection
+
+    def _finish(self, response: Response, received: int):
+        response.timings.mark('total')
+        response.timings.add_received(received)
+        self._metrics.response_done(response)
+        self._emit('on_response_done', response.request, response=response)
+
+    def _emit(self, event: str, request: Request, **data):
+        if self._hooks is not None:
+            self._hooks.emit(event, request, **data)
+
+    def _send(self, request: Request, timings: Timings,
+              connection: Connection = None):
+        if connection is None:
+            connection = self._acquire(request, timings)
+        try:
+            return connection, self._exchange(connection, request, timings)
+        except ConnectException:
+            self._release(connection, False)
+            if not connection.reused or not request.idempotent or \
+                    not request.body.replayable:
+                raise
+
+        # The server may have dropped an idle connection just as we
+        # reused it, so retry once on a fresh one. A POST may already
+        # have been processed, so only idempotent requests are resent.
+        connection = self._acquire(request, timings)
+        try:
+            return connection, self._exchange(connection, request, timings)
+        except ConnectException:
+            self._release(connection, False)
+            raise
+
+    def _acquire(self, request: Request, timings: Timings):
+        if self._pool is None:
+            return self._open_connection(request, timings)
+        try:
+            connection = self._pool.acquire(
+                self._pool_key(request),
+                lambda: self._open_connection(request, timings),
+                self._timeout(request, 'pool'))
+        except PoolTimeoutException:
+            self._check_deadline(request)
+            raise
+        if connection.reused:
+            self._emit('on_pool_reuse', request, connection=connection)
+        return connection
+
+    def _release(self, connection: Connection, reusable: bool):
+        if isinstance(connection.sock, ssl.SSLSocket):
+            # TLS 1.3 tickets arrive after the handshake, so the session
+            # is saved once the connection has actually been used.
+            self._save_session(connection.key, connection.sock)
+
+        if self._pool is None:
+            connection.close()
+        else:
+            self._pool.release(connection, reusable)
+
+    def _open_connection(self, request: Request, timings: Timings):
+        sock = self._connect(request, timings)
+        try:
+            sock = self._prepare_socket(sock, request)
+            handshake = self._handshake(sock, request)
+        except ConnectException:
+            sock.close()
+            raise
+        if handshake is not None:
+            timings.mark('tls')
+            self._emit('on_tls', request, handshake=handshake)
+        return Connection(sock, self._pool_key(request), handshake)
+
+    def _connect(self, request: Request, timings: Timings):
+        if request.url.host is None:
+            # A relative URL or not a URL at all: nothing to connect to.
             raise ConnectException(str(request.url))
+        self._emit('on_dns_start', request, host=request.url.host)
+        try:
+            addresses = self._resolver.resolve(request.url.host,
+                                               request.url.port)
+        except OSError:
+            raise ConnectException(f'{request.url.host}: '
+                                   f'{request.url.port}')
+        timings.mark('dns')
+        self._emit('on_dns_end', request, addresses=addresses)
 
-        return self._response
+        try:
+            sock = self._resolver.connect_to(
+                addresses, self._timeout(request, 'connect'),
+                request.url.host)
+        except socket_timeout:
+            self._check_deadline(request)
+            raise ConnectTimeoutException(f'{request.url.host}: '
+                                          f'{request.url.port}')
+        except OSError:
+            raise ConnectException(f'{request.url.host}: '
+                                   f'{request.url.port}')
+        timings.mark('connect')
+        self._emit('on_connect', request, address=sock.getpeername())
+        return sock
+
+    def _handshake(self, sock, request: Request):
+        if request.url.scheme != 'https':
+            return None
+        try:
+            handshake = Handshake.perform(sock)
+        except socket_timeout:
+            self._check_deadline(request)
+            raise TLSTimeoutException(f'{request.url.host}: '
+                                      f'{request.url.port}')
+        except ssl.SSLCertVerificationError as e:
+            raise CertificateVerifyException(f'{request.url.host}: '
+                                             f'{request.url.port}',
+                                             e.verify_message)
+        except Exception:
+            raise ConnectException(f'{request.url.host}: '
+                                   f'{request.url.port}')
+        self._tls_metrics.record(handshake)
+        self._save_session(self._pool_key(request), sock)
+        return handshake
+
+    def _save_session(self, key: tuple, sock: ssl.SSLSocket):
+        try:
+            self._sessions.put(key, sock.session)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _new_handshake(connection: Connection):
+        return None if connection.reused else connection.handshake
+
+    def _exchange(self, connection: Connection, request: Request,
+                  timings: Timings):
+        link = f'{request.url.host}: {request.url.port}'
+        try:
+            connection.sock.settimeout(self._timeout(request, 'write'))
+            buffers = request.buffers()
+            send_buffers(connection.sock, buffers)
+            sent = sum(len(i) for i in buffers)
+            if request.body.streaming:
+                sent += request.body.send(connection.sock)
+        except TimeoutException:
+            raise
+        except socket_timeout:
+            self._check_deadline(request)
+            raise WriteTimeoutException(link)
+        except Exception:
+            raise ConnectException(link)
+
+        timings.add_sent(sent)
+        timings.mark('sent')
+        self._emit('on_request_sent', request, bytes_sent=sent)
+
+        try:
+            connection.reader.set_timeout(self._timeout(request, 'read'),
+                                          request.deadline)
+            head = connection.reader.read_head(request.request_method)
+        except TimeoutException:
+            raise
+        except Exception:
+            raise ConnectException(link)
+        timings.mark('first_byte')
+        self._emit('on_first_byte', request)
+        return head
 
     @staticmethod
-    def _prepare_socket(request: Request):
-        sock = socket(AF_INET, SOCK_STREAM)
-        sock.settimeout(request.timeout)
+    def _check_deadline(request: Request):
+        # A phase timeout cut short by the deadline reports the deadline.
+        if request.deadline is not None:
+            request.deadline.clamp()
+
+    def _timeout(self, request: Request, phase: str):
+        timeout = getattr(self._timeouts, phase)
+        if timeout is None:
+            timeout = request.timeout
+        if request.deadline is not None:
+            timeout = request.deadline.clamp(timeout)
+        return timeout
 
+    def do_request(self, request: Request, stream: bool = False):
+        request = self._start(request)
+        return self._follow(request, self.get_response(request, stream),
+                            stream)
+
+    def _start(self, request: Request):
+        cookie = request.headers.get('Cookie')
+        if self._cookies is not None and cookie and \
+                cookie != self._cookies.header(request.url):
+            # Cookies set on the request itself belong to its host.
+            self._cookies.set_header(cookie, request.url)
+        if self._timeouts.total is None:
+            return request
+        # Redirect hops are derived from the request and share the
+        # deadline. The caller's request doesn't keep it.
+        return request.with_deadline(Deadline(self._timeouts.total))
+
+    def _follow(self, request: Request, response: Response,
+                stream: bool = False):
+        max_hops = self._const_max_hops
+        hops = []
+
+        while ((300 <= response.code < 400 or
+                response.location != '') and max_hops):
+            self._drain(response)
+            hops.append(response.elapsed or 0.0)
+            self._metrics.redirect(response.request)
+            self._emit('on_redirect', response.request, response=response,
+                       location=response.location)
+            response = self.get_response(
+                response.request.redirect(response.location), stream)
+            max_hops -= 1
+
+        for elapsed in hops:
+            response.timings.add_redirect(elapsed)
+
+        if (not max_hops or 300 <= response.code < 400 or
+                response.location != ''):
+            response.close()
+            raise ConnectException(str(request.url))
+
+        return response
+
+    def template(self, request: Request) -> RequestTemplate:
+        request.keep_alive = self._pool is not None
+        return RequestTemplate(request)
+
+    def do_requests(self, requests, concurrency: int = 8):
+        requests = iter(requests)
+        with ThreadPoolExecutor(concurrency) as executor:
+            # Only a couple of requests per worker are queued at a time,
+            # so huge (or endless) inputs are consumed lazily.
+            pending = {executor.submit(self.do_request, i): i
+                       for i in islice(requests, concurrency * 2)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    request = pending.pop(future)
+                    for i in islice(requests, 1):
+                        pending[executor.submit(self.do_request, i)] = i
+                    try:
+                        yield request, future.result()
+                    except HTTPSClientException as e:
+                        yield request, e
+
+    def pipeline(self, requests, depth: int = 16):
+        # Safe requests to the same origin are written back to back on
+        # one connection and their responses read in order, saving a
+        # round trip per request. Anything else, or whatever a failed
+        # batch did not get answers for, is sent one by one. A batch
+        # goes straight to the connection, so a client with a cache,
+        # guard or retry policy sends everything one by one instead.
+        batch = []
+        for request in requests:
+            if self._pipelinable(request) and len(batch) < depth and \
+                    (not batch or self._pool_key(request) ==
+                     self._pool_key(batch[0])):
+                batch.append(request)
+                continue
+
+            yield from self._run_pipeline(batch)
+            batch = []
+            if self._pipelinable(request):
+                batch.append(request)
+            else:
+                yield request, self._result(request)
+        yield from self._run_pipeline(batch)
+
+    def _pipelinable(self, request: Request):
+        if self._cache is not None or self._guard is not None or \
+                self._retry is not None:
+            return False
+        return self._pool is not None and request.safe and \
+            not request.body.length and not request.body.streaming and \
+            not (self._http2 and request.url.scheme == 'https')
+
+    def _run_pipeline(self, batch: list):
+        responses = self._send_pipelined(batch) if len(batch) > 1 else []
+        for request, response in zip(batch, responses):
+            try:
+                yield request, self._follow(request, response)
+            except HTTPSClientException as e:
+                yield request, e
+        for request in batch[len(responses):]:
+            yield request, self._result(request)
+
+    def _result(self, request: Request):
+        try:
+            return self.do_request(request)
+        except HTTPSClientException as e:
+            return e
+
+    def _send_pipelined(self, batch: list):
+        timings = [Timings() for _ in batch]
+        batch = [self._start(i) for i in batch]
+        buffers = []
+        for request in batch:
+            self._add_cookies(request)
+            request.keep_alive = True
+            buffers.append(request.buffers())
+        try:
+            connection = self._acquire(batch[0], timings[0])
+        except HTTPSClientException:
+            return []
+
+        try:
+            connection.sock.settimeout(self._timeout(batch[0], 'write'))
+            send_buffers(connection.sock, [i for j in buffers for i in j])
+        except OSError:
+            self._release(connection, False)
+            return []
+        for request, timing, request_buffers in zip(batch, timings,
+                                                    buffers):
+            sent = sum(len(i) for i in request_buffers)
+            timing.add_sent(sent)
+            timing.mark('sent')
+            self._emit('on_request_sent', request, bytes_sent=sent)
+
+        reader = connection.reader
+        responses = []
+        for request, timing in zip(batch, timings):
+            try:
+                reader.set_timeout(self._timeout(request, 'read'),
+                                   request.deadline)
+                head = reader.read_head(request.request_method)
+                timing.mark('first_byte')
+                self._emit('on_first_byte', request)
+                body = reader.read_body()
+            except Exception:
+                break
+            response = Response.from_message(
+                head, body, request,
+                handshake=None if responses
+                else self._new_handshake(connection),
+                headers=reader.headers, timings=timing)
+            self._finish(response, reader.received)
+            self._store_cookies(response)
+            responses.append(response)
+            if not reader.reusable:
+                # The server closes after this response; the requests
+                # behind it were dropped and are sent again.
+                break
+
+        self._release(connection, len(responses) == len(batch) and
+                      reader.reusable)
+        return responses
+
+    @staticmethod
+    def _drain(response: Response):
+        # Redirect bodies are small; reading them lets the connection go
+        # back to the pool instead of being closed.
+        if response.raw is not None:
+            response.raw.readall()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+        with self._multiplexed_lock:
+            connections = list(self._multiplexed.values())
+            self._multiplexed.clear()
+        for connection in connections:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @staticmethod
+    def _pool_key(request: Request):
+        return (request.url.scheme,
+                request.url.host,
+                request.url.port)
+
+    def _prepare_socket(self, sock, request: Request):
         if request.url.scheme == 'https':
-            sock = ssl.wrap_socket(sock)
+            sock.settimeout(self._timeout(request, 'tls'))
+            sock = self._ssl_context.wrap_socket(
+                sock, server_hostname=request.url.host,
+                do_handshake_on_connect=False,
+                session=self._sessions.get(self._pool_key(request)))
 
         return sock
 
+    @property
+    def ssl_context(self):
+        return self._ssl_context
+
+    @property
+    def tls_metrics(self):
+        return self._tls_metrics.snapshot()
+
+    @property
+    def cookies(self):
+        return self._cookies
+
+    @property
+    def http2(self):
+        return self._http2
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def hooks(self):
+        return self._hooks
+
+    @property
+    def guard(self):
+        return self._guard
+
+    @property
+    def retry(self):
+        return self._retry
+
+    @property
+    def timeouts(self):
+        return self._timeouts
+
+    @property
+    def resolver(self):
+        return self._resolver
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def pool(self):
+        return self._pool
+
     @property
     def max_hops(self):
         return self._max_hops
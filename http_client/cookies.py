@@ -0,0 +1,304 @@
+import ipaddress
+import itertools
+import threading
+import time
+from http.cookiejar import http2time
+
+from yarl import URL
+
+from http_client.exceptions import UnreadableFileException
+from http_client.response import Response
+
+NETSCAPE_HEADER = '# Netscape HTTP Cookie File'
+HTTP_ONLY_PREFIX = '#HttpOnly_'
+# Second-level labels that countries hand out like top-level domains
+# (co.uk, com.au); the same guess http.cookiejar.DefaultCookiePolicy makes.
+SUFFIX_LABELS = ('co', 'ac', 'com', 'edu', 'org', 'net', 'gov', 'mil',
+                 'int', 'aero', 'biz', 'cat', 'coop', 'info', 'jobs',
+                 'mobi', 'museum', 'name', 'pro', 'travel', 'eu')
+
+
+def is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+    except ValueError:
+        return False
+    return True
+
+
+def is_public_suffix(domain: str) -> bool:
+    labels = domain.split('.')
+    if len(labels) == 1:
+        return True
+    return len(labels) == 2 and len(labels[1]) == 2 and \
+        labels[0] in SUFFIX_LABELS
+
+
+def registrable_domain(host: str) -> str:
+    # Without a public suffix list the last two labels, or three under a
+    # suffix like co.uk, stand in for the registrable domain. It only
+    # picks the bucket a cookie is kept in; whether it is sent is decided
+    # by domain matching.
+    host = host.lower().rstrip('.')
+    if is_ip(host):
+        return host
+    labels = host.rsplit('.', 3)
+    if is_public_suffix('.'.join(labels[-2:])):
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def domain_match(host: str, domain: str) -> bool:
+    return host == domain or host.endswith('.' + domain)
+
+
+def path_match(path: str, cookie_path: str) -> bool:
+    if path == cookie_path:
+        return True
+    return path.startswith(cookie_path) and \
+        (cookie_path.endswith('/') or path[len(cookie_path)] == '/')
+
+
+def default_path(path: str) -> str:
+    if not path.startswith('/') or path.count('/') == 1:
+        return '/'
+    return path[:path.rindex('/')]
+
+
+def is_cookie_file(path: str) -> bool:
+    # Tells a Netscape cookie file from one holding a bare Cookie header.
+    try:
+        with open(path) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        raise UnreadableFileException(path)
+    return any(line.startswith(NETSCAPE_HEADER) or
+               line.count('\t') == 6 for line in lines)
+
+
+class Cookie:
+    def __init__(self, name: str, value: str, domain: str,
+                 path: str = '/',
+                 expires: float = None,
+                 secure: bool = False,
+                 host_only: bool = True,
+                 http_only: bool = False):
+        self._name = name
+        self._value = value
+        self._domain = domain
+        self._path = path
+        self._expires = expires
+        self._secure = secure
+        self._host_only = host_only
+        self._http_only = http_only
+
+    @classmethod
+    def parse(cls, header: str, url: URL, now: float = None):
+        pair, *attributes = header.split(';')
+        name, separator, value = pair.partition('=')
+        name = name.strip()
+        if not separator or not name:
+            return None
+
+        host = url.host.lower()
+        domain, path, expires = None, None, None
+        secure = http_only = False
+        for attribute in attributes:
+            key, _, argument = attribute.partition('=')
+            key, argument = key.strip().lower(), argument.strip()
+            if key == 'domain' and argument:
+                domain = argument.lstrip('.').lower()
+            elif key == 'path' and argument.startswith('/'):
+                path = argument
+            elif key == 'max-age':
+                try:
+                    expires = (now or time.time()) + int(argument)
+                except ValueError:
+                    pass
+            elif key == 'expires' and expires is None:
+                expires = http2time(argument)
+            elif key == 'secure':
+                secure = True
+            elif key == 'httponly':
+                http_only = True
+
+        if domain is not None and not (
+                domain == host if is_ip(host) else
+                domain_match(host, domain) and not is_public_suffix(domain)):
+            # A server may only set cookies for its own domain, never for
+            # a public suffix, and an IP address has no parent domains.
+            return None
+        return cls(name, value.strip(), domain or host,
+                   path or default_path(url.path), expires, secure,
+                   domain is None, http_only)
+
+    def expired(self, now: float) -> bool:
+        return self._expires is not None and self._expires <= now
+
+    def matches(self, host: str, path: str, secure: bool) -> bool:
+        if self._secure and not secure:
+            return False
+        if self._host_only:
+            if host != self._domain:
+                return False
+        elif not domain_match(host, self._domain):
+            return False
+        return path_match(path, self._path)
+
+    @property
+    def key(self):
+        return self._domain, self._path, self._name
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def domain(self):
+        return self._domain
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def expires(self):
+        return self._expires
+
+    @property
+    def secure(self):
+        return self._secure
+
+    @property
+    def host_only(self):
+        return self._host_only
+
+    @property
+    def http_only(self):
+        return self._http_only
+
+    def __repr__(self):
+        return f'{self._name}={self._value}'
+
+
+class CookieJar:
+    def __init__(self, clock=time.time):
+        # registrable domain -> {(domain, path, name): (order, Cookie)}.
+        # A request only looks at the cookies of its own site.
+        self._domains = {}
+        self._order = itertools.count()
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def set(self, cookie: Cookie):
+        bucket_key = registrable_domain(cookie.domain)
+        with self._lock:
+            bucket = self._domains.setdefault(bucket_key, {})
+            if cookie.expired(self._clock()):
+                # An expiry in the past is how servers delete a cookie.
+                bucket.pop(cookie.key, None)
+                return
+            previous = bucket.get(cookie.key)
+            # A replaced cookie keeps its place in the header.
+            order = previous[0] if previous else next(self._order)
+            bucket[cookie.key] = (order, cookie)
+
+    def set_header(self, header: str, url: URL):
+        # Cookies given as a Cookie header, e.g. from the command line,
+        # belong to that host only.
+        if url.host is None:
+            return
+        for pair in header.split(';'):
+            name, separator, value = pair.partition('=')
+            if separator and name.strip():
+                self.set(Cookie(name.strip(), value.strip(),
+                                url.host.lower()))
+
+    def extract(self, response: Response):
+        url = response.request.url
+        for header in response.headers.getall('Set-Cookie'):
+            cookie = Cookie.parse(header, url, self._clock())
+            if cookie is not None:
+                self.set(cookie)
+
+    def header(self, url: URL):
+        if url.host is None:
+            return None
+        host = url.host.lower()
+        path = url.path or '/'
+        secure = url.scheme == 'https'
+        now = self._clock()
+        with self._lock:
+            bucket = self._domains.get(registrable_domain(host))
+            if not bucket:
+                return None
+            cookies = []
+            for key, (order, cookie) in list(bucket.items()):
+                if cookie.expired(now):
+                    del bucket[key]
+                elif cookie.matches(host, path, secure):
+                    cookies.append((-len(cookie.path), order, cookie))
+        if not cookies:
+            return None
+        # Longer paths first, then the oldest cookie (RFC 6265, 5.4).
+        cookies.sort(key=lambda i: i[:2])
+        return '; '.join(repr(i[2]) for i in cookies)
+
+    def clear(self):
+        with self._lock:
+            self._domains.clear()
+
+    def load(self, path: str):
+        try:
+            with open(path) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            raise UnreadableFileException(path)
+
+        for line in lines:
+            http_only = line.startswith(HTTP_ONLY_PREFIX)
+            if http_only:
+                line = line[len(HTTP_ONLY_PREFIX):]
+            fields = line.split('\t')
+            if line.startswith('#') or len(fields) != 7:
+                continue
+            domain, subdomains, cookie_path, secure, expires, name, value = \
+                fields
+            try:
+                expires = int(expires) or None
+            except ValueError:
+                continue
+            self.set(Cookie(name, value, domain.lstrip('.').lower(),
+                            cookie_path, expires, secure == 'TRUE',
+                            subdomains != 'TRUE', http_only))
+
+    def save(self, path: str):
+        now = self._clock()
+        lines = [NETSCAPE_HEADER, '']
+        for cookie in self:
+            if cookie.expired(now):
+                continue
+            domain = cookie.domain if cookie.host_only \
+                else '.' + cookie.domain
+            if cookie.http_only:
+                domain = HTTP_ONLY_PREFIX + domain
+            lines.append('\t'.join((
+                domain, 'FALSE' if cookie.host_only else 'TRUE',
+                cookie.path, 'TRUE' if cookie.secure else 'FALSE',
+                str(int(cookie.expires or 0)), cookie.name, cookie.value)))
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def __iter__(self):
+        with self._lock:
+            cookies = sorted(entry for bucket in self._domains.values()
+                             for entry in bucket.values())
+        return iter(cookie for _, cookie in cookies)
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(i) for i in self._domains.values())
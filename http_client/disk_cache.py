@@ -0,0 +1,299 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from http_client.cache import CacheBackend, CacheEntry
+from http_client.headers import Headers
+
+ENCODING = 'ISO-8859-1'
+INDEX_VERSION = 2
+
+
+class DiskCacheBackend(CacheBackend):
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024,
+                 clock=time.time):
+        self._directory = directory
+        self._blobs = os.path.join(directory, 'blobs')
+        self._keys = os.path.join(directory, 'keys')
+        self._journal = os.path.join(directory, 'index.log')
+        self._lock_file = os.path.join(directory, '.lock')
+        self._max_bytes = max_bytes
+        self._clock = clock
+        # key file name -> size and -> last use, replayed from the
+        # journal. Only lines appended since the last look are read.
+        self._sizes = {}
+        self._used = {}
+        self._journal_id = None
+        self._journal_offset = 0
+        self._journal_lines = 0
+        os.makedirs(self._blobs, exist_ok=True)
+        os.makedirs(self._keys, exist_ok=True)
+        legacy_index = os.path.join(directory, 'index.json')
+        if os.path.exists(legacy_index):
+            # Version 1 kept every key in one index file; its blobs can't
+            # be matched to the new key files.
+            self.clear()
+            self._unlink(legacy_index)
+
+    def get(self, key: str) -> list:
+        name = self._key_name(key)
+        with self._locked(exclusive=False):
+            entries = []
+            for variant in self._read_key(name):
+                body = self._map_blob(variant['blob'])
+                if body is not None:
+                    entries.append(self._entry(variant, body))
+            if entries:
+                self._append(f'{name} @ {self._clock()}\n')
+            self._sync()
+        if self._journal_lines > 2 * len(self._sizes) + 64:
+            # Reads only append, so they compact under the write lock.
+            with self._locked(exclusive=True):
+                self._sync()
+                self._compact()
+        return entries
+
+    def put(self, key: str, entries: list):
+        with self._locked(exclusive=True):
+            self._sync()
+            name = self._key_name(key)
+            old = self._read_key(name)
+            # Blobs are written before the key file, so a reader never
+            # sees an entry without its body.
+            variants = [self._variant(i, self._write_blob(name, i.body))
+                        for i in entries]
+            if variants:
+                data = json.dumps({'version': INDEX_VERSION, 'key': key,
+                                   'variants': variants})
+                self._write_atomic(os.path.join(self._keys, name),
+                                   data.encode())
+                self._record(name, sum(i['size'] for i in variants))
+                self._unlink_blobs(old, variants)
+            else:
+                self._remove(name, old)
+            self._evict(name)
+
+    def delete(self, key: str):
+        with self._locked(exclusive=True):
+            self._sync()
+            name = self._key_name(key)
+            if name in self._sizes:
+                self._remove(name, self._read_key(name))
+
+    def clear(self):
+        with self._locked(exclusive=True):
+            for directory in (self._keys, self._blobs):
+                for name in os.listdir(directory):
+                    self._unlink(os.path.join(directory, name))
+            self._write_atomic(self._journal, b'')
+            self._sync()
+
+    @property
+    def size(self):
+        with self._locked(exclusive=False):
+            self._sync()
+            return sum(self._sizes.values())
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def __len__(self):
+        with self._locked(exclusive=False):
+            self._sync()
+            return len(self._sizes)
+
+    def _evict(self, keep: str):
+        total = sum(self._sizes.values())
+        if total <= self._max_bytes:
+            return
+
+        for name in sorted((i for i in self._sizes if i != keep),
+                           key=lambda i: self._used.get(i, 0)):
+            total -= self._sizes[name]
+            self._remove(name, self._read_key(name))
+            if total <= self._max_bytes:
+                return
+        if total > self._max_bytes:
+            self._remove(keep, self._read_key(keep))
+
+    def _remove(self, name: str, variants: list):
+        self._unlink(os.path.join(self._keys, name))
+        self._record(name, None)
+        self._unlink_blobs(variants, [])
+
+    def _unlink_blobs(self, old: list, new: list):
+        used = {i['blob'] for i in new}
+        for variant in old:
+            if variant['blob'] not in used:
+                self._unlink(os.path.join(self._blobs, variant['blob']))
+
+    def _record(self, name: str, size):
+        # The journal is append-only: `name size last-use` for a stored
+        # key, `name @ last-use` for a read and `name -` for a removal.
+        # Once it is mostly superseded lines it is rewritten with one
+        # line per key.
+        if size is None:
+            self._sizes.pop(name, None)
+            self._used.pop(name, None)
+            line = f'{name} -\n'
+        else:
+            self._sizes[name] = size
+            self._used[name] = self._clock()
+            line = f'{name} {size} {self._used[name]}\n'
+        if self._journal_lines > 2 * len(self._sizes) + 64:
+            self._compact()
+            return
+        self._append(line)
+        self._sync()
+
+    def _compact(self):
+        data = ''.join(f'{name} {size} {self._used.get(name, 0)}\n'
+                       for name, size in self._sizes.items())
+        self._write_atomic(self._journal, data.encode())
+        self._journal_id = None
+        self._sync()
+
+    def _append(self, line: str):
+        # One write per line, so lines appended by several processes at
+        # once don't interleave.
+        with open(self._journal, 'a') as f:
+            f.write(line)
+
+    def _sync(self):
+        try:
+            stat = os.stat(self._journal)
+        except OSError:
+            self._sizes, self._used, self._journal_id = {}, {}, None
+            self._journal_offset = self._journal_lines = 0
+            return
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self._journal_id or \
+                stat.st_size < self._journal_offset:
+            # Compacted or cleared by another process: replay it all.
+            self._sizes, self._used, self._journal_id = {}, {}, identity
+            self._journal_offset = self._journal_lines = 0
+        if stat.st_size == self._journal_offset:
+            return
+
+        with open(self._journal, 'rb') as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+        # A line still being appended is picked up next time.
+        data = data[:data.rfind(b'\n') + 1]
+        self._journal_offset += len(data)
+        for line in data.decode().splitlines():
+            name, size, *used = line.split(' ') + ['', '']
+            self._journal_lines += 1
+            if size == '-':
+                self._sizes.pop(name, None)
+                self._used.pop(name, None)
+                continue
+            try:
+                used = float(used[0])
+            except ValueError:
+                used = 0.0
+            if size == '@':
+                if name in self._sizes:
+                    self._used[name] = used
+            elif size.isdigit():
+                self._sizes[name] = int(size)
+                self._used[name] = used
+
+    def _read_key(self, name: str) -> list:
+        try:
+            with open(os.path.join(self._keys, name), 'rb') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if data.get('version') != INDEX_VERSION:
+            return []
+        return data.get('variants', [])
+
+    def _map_blob(self, name: str):
+        try:
+            with open(os.path.join(self._blobs, name), 'rb') as f:
+                if not os.fstat(f.fileno()).st_size:
+                    return b''
+                # The mapping outlives the descriptor and even an unlink
+                # by another process evicting the entry.
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+    def _write_blob(self, key_name: str, body) -> str:
+        # Named by key and content, so a blob belongs to one key and can
+        # be removed with it without looking at any other key.
+        digest = hashlib.sha256(body).hexdigest()
+        name = f'{key_name[:16]}-{digest}'
+        path = os.path.join(self._blobs, name)
+        if not os.path.exists(path):
+            self._write_atomic(path, body)
+        return name
+
+    @staticmethod
+    def _key_name(key: str) -> str:
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _unlink(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def _write_atomic(self, path: str, data):
+        descriptor, temp = tempfile.mkstemp(dir=self._directory,
+                                            prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _variant(entry: CacheEntry, blob: str) -> dict:
+        return {'status': entry.status_line.decode(ENCODING),
+                'headers': entry.headers.multi_items(),
+                'vary': entry.vary,
+                'request_time': entry.request_time,
+                'response_time': entry.response_time,
+                'blob': blob,
+                'size': entry.size}
+
+    @staticmethod
+    def _entry(variant: dict, body) -> CacheEntry:
+        return CacheEntry(variant['status'].encode(ENCODING),
+                          Headers(variant['headers']), body,
+                          variant['vary'], variant['request_time'],
+                          variant['response_time'])
@@ -0,0 +1,196 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client.client import Client
+from http_client.exceptions import HTTPSClientException, \
+    ResponseException, ResourceChangedException
+from http_client.request import Request
+
+re_content_range = re.compile(r'bytes (?P<start>\d+)-(?P<end>\d+)/')
+
+# Progress is flushed to the sidecar file every SAVE_EVERY bytes, so an
+# interrupted download loses at most that much per segment.
+SAVE_EVERY = 4 * 1024 * 1024
+
+
+class Segment:
+    def __init__(self, start: int, end: int, position: int = None):
+        # [start, end) of the file; position is the next byte to fetch.
+        self.start = start
+        self.end = end
+        self.position = start if position is None else position
+
+    @property
+    def done(self):
+        return self.position >= self.end
+
+    def as_list(self):
+        return [self.start, self.end, self.position]
+
+
+class SegmentedDownload:
+    def __init__(self, client: Client, request: Request, path: str,
+                 segments: int = 4,
+                 min_size: int = 1024 * 1024,
+                 chunk_size: int = 256 * 1024):
+        self._client = client
+        self._request = request
+        self._path = path
+        self._progress_path = path + '.progress'
+        self._segments = segments
+        self._min_size = min_size
+        self._chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+
+    def run(self):
+        # Returns the number of bytes in the file, or None if the
+        # resource can't be fetched in ranges and should be downloaded
+        # in one piece.
+        probe = self._probe()
+        if probe is None:
+            return None
+        url, length, validator = probe
+
+        state = self._load_progress(url, length, validator)
+        if state is None:
+            state = {'url': url, 'length': length, 'validator': validator,
+                     'segments': self._split(length)}
+            mode = 'wb'
+        else:
+            mode = 'r+b'
+
+        with open(self._path, mode) as f:
+            # The file gets its final size up front, so every segment
+            # writes at its own offset and nothing is appended.
+            os.truncate(f.fileno(), length)
+            self._save_progress(state)
+            pending = [i for i in state['segments'] if not i.done]
+            errors = []
+            with ThreadPoolExecutor(max(len(pending), 1)) as executor:
+                for error in executor.map(
+                        lambda i: self._fetch(f.fileno(), url, validator,
+                                              i, state),
+                        pending):
+                    if error is not None:
+                        errors.append(error)
+
+        if errors:
+            if any(isinstance(i, ResourceChangedException) for i in errors):
+                os.remove(self._progress_path)
+            else:
+                self._save_progress(state)
+            raise errors[0]
+        os.remove(self._progress_path)
+        return length
+
+    def _probe(self):
+        if self._request.compress or self._request.body.length:
+            # Ranges of a compressed representation aren't ranges of the
+            # file, and only plain downloads are worth splitting.
+            return None
+        request = self._request.derive()
+        request.request_method = 'HEAD'
+        response = self._client.do_request(request)
+        headers = response.headers
+        if response.code != 200 or \
+                headers.get('Accept-Ranges', '').lower() != 'bytes' or \
+                headers.get('Content-Encoding'):
+            return None
+        try:
+            length = int(headers.get('Content-Length', ''))
+        except ValueError:
+            return None
+        if length < self._min_size:
+            return None
+
+        etag = headers.get('ETag')
+        # If-Range only works with a strong validator.
+        validator = etag if etag and not etag.startswith('W/') \
+            else headers.get('Last-Modified')
+        return str(response.request.url), length, validator
+
+    def _split(self, length: int):
+        count = max(min(self._segments, length // self._min_size), 1)
+        size = -(-length // count)
+        return [Segment(start, min(start + size, length))
+                for start in range(0, length, size)]
+
+    def _fetch(self, fd: int, url: str, validator: str,
+               segment: Segment, state: dict):
+        request = self._request.derive()
+        request.url = url
+        request.headers['Range'] = \
+            f'bytes={segment.position}-{segment.end - 1}'
+        if validator:
+            request.headers['If-Range'] = validator
+        try:
+            with self._client.do_request(request, stream=True) as response:
+                self._check(response, segment, url)
+                for chunk in response.iter_content(self._chunk_size,
+                                                   decode_content=False):
+                    chunk = chunk[:segment.end - segment.position]
+                    os.pwrite(fd, chunk, segment.position)
+                    self._advance(segment, len(chunk), state)
+                    if segment.done:
+                        break
+        except HTTPSClientException as e:
+            return e
+        except OSError as e:
+            return HTTPSClientException(f'{self._path}: {e.strerror}')
+        if not segment.done:
+            return ResponseException(f'range of {url} ended at '
+                                     f'{segment.position} instead of '
+                                     f'{segment.end}')
+        return None
+
+    @staticmethod
+    def _check(response, segment: Segment, url: str):
+        if response.code == 200:
+            # If-Range didn't match, so the whole (new) file came back.
+            raise ResourceChangedException(url)
+        if response.code != 206:
+            raise ResponseException(f'{url} answered a range request '
+                                    f'with {response.code}')
+        match = re_content_range.match(
+            response.headers.get('Content-Range', ''))
+        if match is None or int(match.group('start')) != segment.position:
+            raise ResponseException(f'{url} sent a range other than the '
+                                    f'requested one')
+
+    def _advance(self, segment: Segment, size: int, state: dict):
+        with self._lock:
+            segment.position += size
+            self._unsaved += size
+            if self._unsaved < SAVE_EVERY:
+                return
+            self._unsaved = 0
+        self._save_progress(state)
+
+    def _load_progress(self, url: str, length: int, validator: str):
+        if not validator or not os.path.exists(self._path):
+            return None
+        try:
+            with open(self._progress_path) as f:
+                state = json.load(f)
+            if (state['url'], state['length'], state['validator']) != \
+                    (url, length, validator):
+                return None
+            state['segments'] = [Segment(*i) for i in state['segments']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return state
+
+    def _save_progress(self, state: dict):
+        with self._save_lock:
+            with self._lock:
+                data = dict(state, segments=[i.as_list()
+                                             for i in state['segments']])
+            temporary = self._progress_path + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(data, f)
+            os.replace(temporary, self._progress_path)
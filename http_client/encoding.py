@@ -0,0 +1,93 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accept_encoding():
+    return 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+
+def decode_content(data: bytes, encodings: str):
+    decoder = ContentDecoder(encodings)
+    if not decoder.active:
+        return bytes(data)
+    return decoder.decompress(data) + decoder.flush()
+
+
+class _Deflate:
+    def __init__(self):
+        self._first = True
+        self._decompressor = zlib.decompressobj()
+
+    def decompress(self, data: bytes):
+        if not self._first:
+            return self._decompressor.decompress(data)
+
+        # Some servers send raw deflate data without the zlib header.
+        self._first = False
+        try:
+            return self._decompressor.decompress(data)
+        except zlib.error:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressor.decompress(data)
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class _Gzip:
+    def __init__(self):
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes):
+        return self._decompressor.decompress(data)
+
+    def flush(self):
+        return self._decompressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data: bytes):
+        return self._decompressor.process(data)
+
+    def flush(self):
+        return b''
+
+
+DECODERS = {'gzip': _Gzip, 'x-gzip': _Gzip, 'deflate': _Deflate}
+if brotli is not None:
+    DECODERS['br'] = _Brotli
+
+
+class ContentDecoder:
+    def __init__(self, encodings: str):
+        names = [i.strip().lower() for i in encodings.split(',')]
+        names = [i for i in names if i and i != 'identity']
+        # Codings are listed in the order they were applied; an unknown
+        # one makes the body opaque, so it is passed through untouched.
+        if all(i in DECODERS for i in names):
+            self._decoders = [DECODERS[i]() for i in reversed(names)]
+        else:
+            self._decoders = []
+
+    def decompress(self, data: bytes):
+        for decoder in self._decoders:
+            data = decoder.decompress(data)
+        return data
+
+    def flush(self):
+        data = b''
+        for decoder in self._decoders:
+            data = decoder.decompress(data) + decoder.flush() \
+                if data else decoder.flush()
+        return data
+
+    @property
+    def active(self):
+        return bool(self._decoders)
@@ -24,7 +24,79 @@ class ConnectException(HTTPSClientException):
         super().__init__(f'not connect to the server, check URL {link}')
 
 
+class CertificateVerifyException(ConnectException):
+    def __init__(self, link: str, reason: str):
+        HTTPSClientException.__init__(
+            self, f'certificate verification failed ({reason}) for {link}')
+
+
 class ValueRequestTypeException(HTTPSClientException):
     def __init__(self, request_type: str):
         super().__init__(f'{request_type} the request type does '
                          f'not exist. See help')
+
+
+class StreamedBodyRedirectException(HTTPSClientException):
+    def __init__(self, location: str):
+        super().__init__(f'can\'t follow the redirect to {location}: the '
+                         f'request body was streamed and can\'t be sent '
+                         f'again')
+
+
+class ResponseException(HTTPSClientException):
+    def __init__(self, reason: str):
+        super().__init__(f'invalid response: {reason}')
+
+
+class TimeoutException(HTTPSClientException):
+    def __init__(self, phase: str, link: str = None):
+        super().__init__(f'{phase} timed out' +
+                         (f', check URL {link}' if link else ''))
+
+
+class ConnectTimeoutException(TimeoutException):
+    def __init__(self, link: str = None):
+        super().__init__('connect', link)
+
+
+class TLSTimeoutException(TimeoutException):
+    def __init__(self, link: str = None):
+        super().__init__('TLS handshake', link)
+
+
+class WriteTimeoutException(TimeoutException):
+    def __init__(self, link: str = None):
+        super().__init__('sending the request', link)
+
+
+class PoolTimeoutException(TimeoutException):
+    def __init__(self, origin: str):
+        super().__init__(f'waiting for a free connection to {origin} '
+                         f'in the pool')
+
+
+class ReadTimeoutException(TimeoutException):
+    def __init__(self, link: str = None):
+        super().__init__('waiting for the response', link)
+
+
+class DeadlineExceededException(TimeoutException):
+    def __init__(self, link: str = None):
+        super().__init__('request deadline', link)
+
+
+class CircuitOpenException(HTTPSClientException):
+    def __init__(self, origin: str):
+        super().__init__(f'{origin} is failing, requests are '
+                         f'rejected until it recovers')
+
+
+class ConcurrencyLimitException(HTTPSClientException):
+    def __init__(self, origin: str):
+        super().__init__(f'too many requests in flight to {origin}')
+
+
+class ResourceChangedException(HTTPSClientException):
+    def __init__(self, link: str):
+        super().__init__(f'{link} changed on the server during the '
+                         f'download, run it again to start over')
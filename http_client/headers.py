@@ -0,0 +1,96 @@
+from collections.abc import MutableMapping
+
+ENCODING = 'ISO-8859-1'
+
+
+class Headers(MutableMapping):
+    def __init__(self, items=None):
+        # lower-cased name -> [name as first seen, [values]]
+        self._store = {}
+        if items:
+            pairs = items.items() if hasattr(items, 'items') else items
+            for name, value in pairs:
+                self.add(name, value)
+
+    @classmethod
+    def parse(cls, data: bytes) -> 'Headers':
+        headers = cls()
+        store = headers._store
+        last = None
+        # Latin-1 maps bytes 1:1, so decoding the block once is lossless
+        # and much cheaper than decoding every name and value.
+        for line in data.decode(ENCODING).split('\r\n'):
+            if line[:1] in (' ', '\t'):
+                # Obsolete line folding continues the previous value.
+                if last is not None:
+                    last[-1] = f'{last[-1]} {line.strip()}'
+                continue
+
+            name, separator, value = line.partition(':')
+            if not separator:
+                continue
+            name = name.rstrip()
+            key = name.lower()
+            entry = store.get(key)
+            if entry is None:
+                last = [value.strip()]
+                store[key] = [name, last]
+            else:
+                last = entry[1]
+                last.append(value.strip())
+        return headers
+
+    @classmethod
+    def parse_lines(cls, lines) -> 'Headers':
+        return cls.parse('\r\n'.join(lines).encode(ENCODING))
+
+    def add(self, name: str, value: str):
+        entry = self._store.get(name.lower())
+        if entry is None:
+            self._store[name.lower()] = [name, [value]]
+        else:
+            entry[1].append(value)
+
+    def getall(self, name: str, default=None):
+        entry = self._store.get(name.lower())
+        if entry is None:
+            return [] if default is None else default
+        return list(entry[1])
+
+    def multi_items(self):
+        return [(name, value)
+                for name, values in self._store.values()
+                for value in values]
+
+    def encode(self) -> bytes:
+        return ''.join(f'{name}: {value}\r\n'
+                       for name, value in self.multi_items()
+                       ).encode(ENCODING)[:-2]
+
+    def copy(self) -> 'Headers':
+        headers = Headers()
+        headers._store = {key: [name, list(values)]
+                          for key, (name, values) in self._store.items()}
+        return headers
+
+    def __getitem__(self, name: str):
+        values = self._store[name.lower()][1]
+        return values[0] if len(values) == 1 else ', '.join(values)
+
+    def __setitem__(self, name: str, value: str):
+        self._store[name.lower()] = [name, [value]]
+
+    def __delitem__(self, name: str):
+        del self._store[name.lower()]
+
+    def __contains__(self, name):
+        return isinstance(name, str) and name.lower() in self._store
+
+    def __iter__(self):
+        return (name for name, _ in self._store.values())
+
+    def __len__(self):
+        return len(self._store)
+
+    def __repr__(self):
+        return f'Headers({self.multi_items()!r})'
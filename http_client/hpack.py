@@ -0,0 +1,318 @@
+from collections import deque
+
+from http_client.exceptions import ResponseException
+
+ENCODING = 'ISO-8859-1'
+DEFAULT_TABLE_SIZE = 4096
+ENTRY_OVERHEAD = 32
+
+STATIC_TABLE = (
+    (':authority', ''), (':method', 'GET'), (':method', 'POST'),
+    (':path', '/'), (':path', '/index.html'), (':scheme', 'http'),
+    (':scheme', 'https'), (':status', '200'), (':status', '204'),
+    (':status', '206'), (':status', '304'), (':status', '400'),
+    (':status', '404'), (':status', '500'), ('accept-charset', ''),
+    ('accept-encoding', 'gzip, deflate'), ('accept-language', ''),
+    ('accept-ranges', ''), ('accept', ''),
+    ('access-control-allow-origin', ''), ('age', ''), ('allow', ''),
+    ('authorization', ''), ('cache-control', ''),
+    ('content-disposition', ''), ('content-encoding', ''),
+    ('content-language', ''), ('content-length', ''),
+    ('content-location', ''), ('content-range', ''), ('content-type', ''),
+    ('cookie', ''), ('date', ''), ('etag', ''), ('expect', ''),
+    ('expires', ''), ('from', ''), ('host', ''), ('if-match', ''),
+    ('if-modified-since', ''), ('if-none-match', ''), ('if-range', ''),
+    ('if-unmodified-since', ''), ('last-modified', ''), ('link', ''),
+    ('location', ''), ('max-forwards', ''), ('proxy-authenticate', ''),
+    ('proxy-authorization', ''), ('range', ''), ('referer', ''),
+    ('refresh', ''), ('retry-after', ''), ('server', ''),
+    ('set-cookie', ''), ('strict-transport-security', ''),
+    ('transfer-encoding', ''), ('user-agent', ''), ('vary', ''),
+    ('via', ''), ('www-authenticate', ''))
+STATIC_INDEX = {entry: index
+                for index, entry in enumerate(STATIC_TABLE, 1)}
+STATIC_NAMES = {}
+for _index, (_name, _) in enumerate(STATIC_TABLE, 1):
+    STATIC_NAMES.setdefault(_name, _index)
+
+# Credentials are sent as never-indexed literals, so intermediaries
+# don't put them in a shared table either.
+SENSITIVE = ('authorization', 'proxy-authorization')
+
+# The Huffman code of RFC 7541 Appendix B is canonical: codes of each
+# length are consecutive in symbol order, so the symbols grouped by code
+# length are enough to rebuild it. 256 is EOS.
+HUFFMAN_SYMBOLS = {
+    5: b'012aceiost',
+    6: b' %-./3456789=A_bdfghlmnpru',
+    7: b':BCDEFGHIJKLMNOPQRSTUVWYjkqvwxyz',
+    8: b'&*,;XZ',
+    10: b'!"()?',
+    11: b"'+|",
+    12: b'#>',
+    13: b'\x00$@[]~',
+    14: b'^}',
+    15: b'<`{',
+    19: (92, 195, 208),
+    20: (128, 130, 131, 162, 184, 194, 224, 226),
+    21: (153, 161, 167, 172, 176, 177, 179, 209, 216, 217, 227, 229, 230),
+    22: (129, 132, 133, 134, 136, 146, 154, 156, 160, 163, 164, 169, 170,
+         173, 178, 181, 185, 186, 187, 189, 190, 196, 198, 228, 232, 233),
+    23: (1, 135, 137, 138, 139, 140, 141, 143, 147, 149, 150, 151, 152,
+         155, 157, 158, 165, 166, 168, 174, 175, 180, 182, 183, 188, 191,
+         197, 231, 239),
+    24: (9, 142, 144, 145, 148, 159, 171, 206, 215, 225, 236, 237),
+    25: (199, 207, 234, 235),
+    26: (192, 193, 200, 201, 202, 205, 210, 213, 218, 219, 238, 240, 242,
+         243, 255),
+    27: (203, 204, 211, 212, 214, 221, 222, 223, 241, 244, 245, 246, 247,
+         248, 250, 251, 252, 253, 254),
+    28: (2, 3, 4, 5, 6, 7, 8, 11, 12, 14, 15, 16, 17, 18, 19, 20, 21, 23,
+         24, 25, 26, 27, 28, 29, 30, 31, 127, 220, 249),
+    30: (10, 13, 22, 256),
+}
+EOS = 256
+
+
+def build_huffman():
+    codes = [None] * 257
+    # code length -> (first code of that length, symbols in code order)
+    decoding = {}
+    code, previous = 0, min(HUFFMAN_SYMBOLS)
+    for length in sorted(HUFFMAN_SYMBOLS):
+        code <<= length - previous
+        previous = length
+        decoding[length] = (code, tuple(HUFFMAN_SYMBOLS[length]))
+        for symbol in HUFFMAN_SYMBOLS[length]:
+            codes[symbol] = (code, length)
+            code += 1
+    return codes, decoding
+
+
+HUFFMAN_CODES, HUFFMAN_DECODING = build_huffman()
+
+
+def huffman_encode(data: bytes) -> bytes:
+    value = bits = 0
+    for byte in data:
+        code, length = HUFFMAN_CODES[byte]
+        value = (value << length) | code
+        bits += length
+    # The last byte is padded with the most significant bits of EOS.
+    padding = -bits % 8
+    value = (value << padding) | ((1 << padding) - 1)
+    return value.to_bytes((bits + padding) // 8, 'big')
+
+
+def huffman_decode(data: bytes) -> bytes:
+    decoded = bytearray()
+    code = length = 0
+    for byte in data:
+        for shift in range(7, -1, -1):
+            code = (code << 1) | ((byte >> shift) & 1)
+            length += 1
+            entry = HUFFMAN_DECODING.get(length)
+            if entry is None:
+                continue
+            index = code - entry[0]
+            if 0 <= index < len(entry[1]):
+                symbol = entry[1][index]
+                if symbol == EOS:
+                    raise ResponseException('HPACK: EOS in Huffman string')
+                decoded.append(symbol)
+                code = length = 0
+    if length > 7 or code != (1 << length) - 1:
+        raise ResponseException('HPACK: bad Huffman padding')
+    return bytes(decoded)
+
+
+def encode_integer(value: int, prefix: int, flags: int = 0) -> bytearray:
+    limit = (1 << prefix) - 1
+    if value < limit:
+        return bytearray((flags | value,))
+    encoded = bytearray((flags | limit,))
+    value -= limit
+    while value >= 0x80:
+        encoded.append(value & 0x7f | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return encoded
+
+
+def decode_integer(data: bytes, position: int, prefix: int):
+    limit = (1 << prefix) - 1
+    try:
+        value = data[position] & limit
+        position += 1
+        if value < limit:
+            return value, position
+        shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            value += (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value, position
+            if shift > 28:
+                raise ResponseException('HPACK: integer overflow')
+    except IndexError:
+        raise ResponseException('HPACK: truncated integer')
+
+
+def encode_string(value: str) -> bytes:
+    raw = value.encode(ENCODING)
+    compressed = huffman_encode(raw)
+    if len(compressed) < len(raw):
+        return bytes(encode_integer(len(compressed), 7, 0x80)) + compressed
+    return bytes(encode_integer(len(raw), 7)) + raw
+
+
+def decode_string(data: bytes, position: int):
+    huffman = position < len(data) and data[position] & 0x80
+    length, position = decode_integer(data, position, 7)
+    end = position + length
+    if end > len(data):
+        raise ResponseException('HPACK: truncated string')
+    value = bytes(data[position:end])
+    if huffman:
+        value = huffman_decode(value)
+    return value.decode(ENCODING), end
+
+
+class HeaderTable:
+    def __init__(self, max_size: int = DEFAULT_TABLE_SIZE):
+        # Newest entry first, as dynamic indexes count from it.
+        self._entries = deque()
+        self._size = 0
+        self._max_size = max_size
+
+    def get(self, index: int):
+        if 1 <= index <= len(STATIC_TABLE):
+            return STATIC_TABLE[index - 1]
+        index -= len(STATIC_TABLE) + 1
+        if not 0 <= index < len(self._entries):
+            raise ResponseException(f'HPACK: bad index {index}')
+        return self._entries[index]
+
+    def find(self, name: str, value: str):
+        # (index, whether the value matched too); index 0 is no match.
+        index = STATIC_INDEX.get((name, value))
+        if index is not None:
+            return index, True
+        name_index = STATIC_NAMES.get(name, 0)
+        for offset, entry in enumerate(self._entries):
+            if entry[0] == name:
+                index = len(STATIC_TABLE) + offset + 1
+                if entry[1] == value:
+                    return index, True
+                name_index = name_index or index
+        return name_index, False
+
+    def add(self, name: str, value: str):
+        size = len(name) + len(value) + ENTRY_OVERHEAD
+        self._entries.appendleft((name, value))
+        self._size += size
+        self._evict()
+
+    def resize(self, max_size: int):
+        self._max_size = max_size
+        self._evict()
+
+    def _evict(self):
+        while self._size > self._max_size and self._entries:
+            name, value = self._entries.pop()
+            self._size -= len(name) + len(value) + ENTRY_OVERHEAD
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Encoder:
+    def __init__(self, max_size: int = DEFAULT_TABLE_SIZE):
+        self._table = HeaderTable(max_size)
+        self._size_update = None
+
+    def set_max_size(self, max_size: int):
+        # The peer's limit; we never use more than the default even if
+        # it allows it.
+        max_size = min(max_size, DEFAULT_TABLE_SIZE)
+        if max_size != self._table.max_size:
+            self._table.resize(max_size)
+            self._size_update = max_size
+
+    def encode(self, headers) -> bytes:
+        block = bytearray()
+        if self._size_update is not None:
+            block += encode_integer(self._size_update, 5, 0x20)
+            self._size_update = None
+
+        for name, value in headers:
+            index, exact = self._table.find(name, value)
+            if exact:
+                block += encode_integer(index, 7, 0x80)
+                continue
+
+            if name in SENSITIVE:
+                block += encode_integer(index, 4, 0x10)
+            else:
+                block += encode_integer(index, 6, 0x40)
+                self._table.add(name, value)
+            if not index:
+                block += encode_string(name)
+            block += encode_string(value)
+        return bytes(block)
+
+    @property
+    def table(self):
+        return self._table
+
+
+class Decoder:
+    def __init__(self, max_size: int = DEFAULT_TABLE_SIZE):
+        self._table = HeaderTable(max_size)
+        self._max_allowed = max_size
+
+    def decode(self, data: bytes) -> list:
+        headers = []
+        position = 0
+        while position < len(data):
+            byte = data[position]
+            if byte & 0x80:
+                index, position = decode_integer(data, position, 7)
+                if not index:
+                    raise ResponseException('HPACK: index 0')
+                headers.append(self._table.get(index))
+                continue
+
+            if byte & 0xe0 == 0x20:
+                size, position = decode_integer(data, position, 5)
+                if size > self._max_allowed:
+                    raise ResponseException('HPACK: table size too big')
+                self._table.resize(size)
+                continue
+
+            indexing = byte & 0xc0 == 0x40
+            index, position = decode_integer(data, position,
+                                             6 if indexing else 4)
+            if index:
+                name = self._table.get(index)[0]
+            else:
+                name, position = decode_string(data, position)
+            value, position = decode_string(data, position)
+            if indexing:
+                self._table.add(name, value)
+            headers.append((name, value))
+        return headers
+
+    @property
+    def table(self):
+        return self._table
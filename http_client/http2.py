@@ -0,0 +1,705 @@
+import selectors
+import socket
+import ssl
+import struct
+import threading
+import time
+from collections import deque
+
+from http_client.exceptions import HTTPSClientException, \
+    ConnectException, ResponseException, ReadTimeoutException, \
+    WriteTimeoutException, PoolTimeoutException
+from http_client.headers import Headers
+from http_client.hpack import Encoder, Decoder
+
+PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+ALPN = ['h2', 'http/1.1']
+
+DATA, HEADERS, PRIORITY, RST_STREAM, SETTINGS, PUSH_PROMISE, PING, \
+    GOAWAY, WINDOW_UPDATE, CONTINUATION = range(10)
+END_STREAM = ACK = 0x1
+END_HEADERS = 0x4
+PADDED = 0x8
+PRIORITY_FLAG = 0x20
+
+HEADER_TABLE_SIZE, ENABLE_PUSH, MAX_CONCURRENT_STREAMS, \
+    INITIAL_WINDOW_SIZE, MAX_FRAME_SIZE, MAX_HEADER_LIST_SIZE = range(1, 7)
+NO_ERROR, PROTOCOL_ERROR, CANCEL = 0x0, 0x1, 0x8
+
+DEFAULT_WINDOW = 65535
+DEFAULT_FRAME_SIZE = 16384
+MAX_WINDOW = 2 ** 31 - 1
+# Our receive windows: big enough that a fast download is not held back
+# by window updates, small enough to bound what a stalled stream buffers.
+STREAM_WINDOW = 4 * 1024 * 1024
+CONNECTION_WINDOW = 16 * 1024 * 1024
+BUFFER_SIZE = 64 * 1024
+
+FRAME_HEADER = struct.Struct('!BHBBL')
+SETTING = struct.Struct('!HL')
+UINT32 = struct.Struct('!L')
+
+# Connection-specific fields are not allowed in HTTP/2 and Host turns
+# into :authority.
+SKIP_HEADERS = ('connection', 'keep-alive', 'proxy-connection',
+                'transfer-encoding', 'upgrade', 'host', 'te')
+ENCODING = 'ISO-8859-1'
+
+
+def frame_header(kind: int, flags: int, stream_id: int,
+                 length: int) -> bytes:
+    return FRAME_HEADER.pack(length >> 16, length & 0xffff, kind, flags,
+                             stream_id)
+
+
+def settings_frame(settings: dict) -> bytes:
+    payload = b''.join(SETTING.pack(key, value)
+                       for key, value in settings.items())
+    return frame_header(SETTINGS, 0, 0, len(payload)) + payload
+
+
+def request_headers(request) -> list:
+    headers = [(':method', request.request_method),
+               (':scheme', request.url.scheme),
+               (':authority', request.host),
+               (':path', request.target)]
+    for name, value in request.headers.items():
+        name = name.lower()
+        if name not in SKIP_HEADERS:
+            headers.append((name, str(value)))
+    if request.body.length and 'content-length' not in request.headers:
+        headers.append(('content-length', str(request.body.length)))
+    return headers
+
+
+class H2Stream:
+    def __init__(self, connection: 'H2Connection', stream_id: int,
+                 send_window: int, window: int):
+        self._connection = connection
+        self._id = stream_id
+        self._send_window = send_window
+        self._window = window
+        self._unacked = 0
+        self._buffered = False
+        self._code = None
+        self._headers = None
+        self._head = None
+        self._data = deque()
+        self._ended = False
+        self._closed = False
+        self._error = None
+        self._sent = 0
+        self._received = 0
+        self._timeout = None
+        self._deadline = None
+
+    # Called by the connection's reader with its lock held.
+
+    def on_headers(self, headers: list, size: int, end: bool):
+        self._received += size
+        status = next((value for name, value in headers
+                       if name == ':status'), None)
+        if self._headers is None:
+            if status is None or not status.isdigit():
+                self._error = 'response without :status'
+                return
+            if 100 <= int(status) < 200:
+                return
+            self._code = int(status)
+            self._headers = Headers((name, value) for name, value in headers
+                                    if not name.startswith(':'))
+            self._head = (f'HTTP/2 {status}\r\n'.encode(ENCODING) +
+                          self._headers.encode())
+        self._ended = self._ended or end
+
+    def on_data(self, data: bytes, size: int, end: bool):
+        # Returns the window increment to send back, if any. Padding is
+        # never read, so it is given back at once.
+        self._received += size
+        if data:
+            self._data.append(data)
+        self._ended = self._ended or end
+        used = size - 9 - len(data)
+        if self._buffered:
+            used += len(data)
+        return self._credit(used)
+
+    def on_error(self, reason: str):
+        if not self._ended or self._headers is None:
+            self._error = self._error or reason
+
+    # Reader-like interface, the same as ResponseReader's.
+
+    def set_timeout(self, timeout: float = None, deadline=None):
+        self._timeout = timeout
+        self._deadline = deadline
+
+    def read_head(self, method: str = 'GET'):
+        self._connection.wait(
+            lambda: self._headers is not None or self._error, self)
+        self._check()
+        return self._head
+
+    def read_body(self):
+        self._connection.buffer(self)
+        self._connection.wait(lambda: self._ended or self._error, self)
+        self._check()
+        body = b''.join(self._data)
+        self._data.clear()
+        return body
+
+    def readinto(self, view: memoryview):
+        self._connection.wait(
+            lambda: self._data or self._ended or self._error, self)
+        self._check()
+        if not self._data:
+            return 0
+        chunk = self._data[0]
+        size = min(len(view), len(chunk))
+        view[:size] = chunk[:size]
+        if size < len(chunk):
+            self._data[0] = memoryview(chunk)[size:]
+        else:
+            self._data.popleft()
+        self._connection.consumed(self, size)
+        return size
+
+    def close(self):
+        self._connection.close_stream(self)
+
+    def _credit(self, size: int):
+        # Called with the connection's lock held. The window opens again
+        # once half of it has been used, so a slow reader throttles the
+        # sender instead of buffering.
+        self._unacked += size
+        if self._ended or self._unacked < self._window // 2:
+            return 0
+        increment, self._unacked = self._unacked, 0
+        return increment
+
+    def _check(self):
+        if self._error is not None:
+            raise ConnectException(f'{self._connection.link} '
+                                   f'({self._error})')
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def code(self):
+        return self._code
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def sent(self):
+        return self._sent
+
+    @property
+    def received(self):
+        return self._received
+
+    @property
+    def ended(self):
+        return self._ended
+
+    @property
+    def failed(self):
+        return self._error is not None
+
+    @property
+    def reusable(self):
+        return self._ended and self._error is None
+
+
+class H2Connection:
+    def __init__(self, sock, key: tuple, handshake=None,
+                 timeout: float = None,
+                 window: int = STREAM_WINDOW,
+                 connection_window: int = CONNECTION_WINDOW):
+        self._sock = sock
+        self._key = key
+        self._handshake = handshake
+        # Write timeout for frames that no request is waiting on.
+        self._timeout = timeout
+        self._window = window
+        self._connection_window = connection_window
+        self._encoder = Encoder()
+        self._decoder = Decoder()
+        # One lock for all stream state and one that serialises socket
+        # calls: an SSL socket must not be read and written from two
+        # threads at once. The socket is non-blocking, so the I/O lock
+        # is only held for a single send or recv. Frames are queued in
+        # order under the state lock and written by whichever thread
+        # holds the write lock.
+        self._condition = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._outgoing = deque()
+        self._streams = {}
+        self._next_id = 1
+        self._max_streams = 100
+        self._max_frame = DEFAULT_FRAME_SIZE
+        self._peer_window = DEFAULT_WINDOW
+        self._send_window = DEFAULT_WINDOW
+        self._unacked = 0
+        self._block = None
+        self._error = None
+        self._goaway = False
+        self._retired = False
+        self._requests = 0
+        self._last_used = time.monotonic()
+
+        self._sock.settimeout(0)
+        self._send([PREFACE,
+                    settings_frame({ENABLE_PUSH: 0,
+                                    INITIAL_WINDOW_SIZE: window}),
+                    self._window_update_frame(
+                        0, connection_window - DEFAULT_WINDOW)])
+        self._reader = threading.Thread(target=self._read_frames,
+                                        daemon=True)
+        self._reader.start()
+
+    def request(self, request, timeout: float = None) -> H2Stream:
+        headers = request_headers(request)
+        body = request.body
+        end = not (body.length or body.streaming)
+
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._error or self._goaway or
+                    len(self._streams) < self._max_streams, timeout):
+                raise PoolTimeoutException(self.origin)
+            if self._error or self._goaway:
+                raise ConnectException(self.link)
+            stream = H2Stream(self, self._next_id, self._peer_window,
+                              self._window)
+            self._streams[stream.id] = stream
+            self._next_id += 2
+            self._requests += 1
+            self._last_used = time.monotonic()
+            # Header blocks must reach the peer in the order they were
+            # compressed and with rising stream ids, so they are queued
+            # under the lock and written after it is released.
+            frames = self._header_frames(
+                stream.id, self._encoder.encode(headers), end)
+            stream._sent = sum(len(i) for i in frames)
+            self._outgoing.append(frames)
+
+        try:
+            self._flush(timeout)
+            if not end:
+                stream._sent += self._send_body(stream, body, timeout)
+        except BaseException:
+            self.close_stream(stream)
+            raise
+        return stream
+
+    def wait(self, predicate, stream: H2Stream):
+        with self._condition:
+            timeout = stream._timeout
+            if stream._deadline is not None:
+                timeout = stream._deadline.clamp(timeout)
+            if not self._condition.wait_for(predicate, timeout):
+                if stream._deadline is not None:
+                    stream._deadline.clamp()
+                raise ReadTimeoutException(self.link)
+
+    def close_stream(self, stream: H2Stream):
+        with self._condition:
+            if stream._closed:
+                return
+            stream._closed = True
+            self._streams.pop(stream.id, None)
+            self._condition.notify_all()
+            reset = not stream.ended and self._error is None
+            drained = self._retired and not self._streams
+        if reset:
+            # Tells the server to stop sending a body nobody will read.
+            try:
+                self._send([frame_header(RST_STREAM, 0, stream.id, 4),
+                            UINT32.pack(CANCEL)])
+            except HTTPSClientException:
+                pass
+        if drained:
+            self.close()
+
+    def retire(self):
+        # A replaced connection is closed once its last stream is done.
+        with self._condition:
+            self._retired = True
+            drained = not self._streams
+        if drained:
+            self.close()
+
+    def buffer(self, stream: H2Stream):
+        # The whole body is wanted at once, so the window is opened as
+        # data arrives instead of as it is read; otherwise a body bigger
+        # than the window would never finish.
+        with self._condition:
+            stream._buffered = True
+            increment = stream._credit(sum(len(i) for i in stream._data))
+        if increment:
+            self.update_window(stream.id, increment)
+
+    def consumed(self, stream: H2Stream, size: int):
+        with self._condition:
+            increment = stream._credit(size)
+        if increment:
+            self.update_window(stream.id, increment)
+
+    def update_window(self, stream_id: int, increment: int,
+                      wait: bool = True):
+        try:
+            self._send([self._window_update_frame(stream_id, increment)],
+                       wait=wait)
+        except HTTPSClientException:
+            pass
+
+    def touch(self):
+        self._last_used = time.monotonic()
+
+    def close(self):
+        with self._condition:
+            alive = self._error is None
+            self._fail('connection closed')
+        if alive:
+            try:
+                self._send([frame_header(GOAWAY, 0, 0, 8),
+                            UINT32.pack(0), UINT32.pack(NO_ERROR)])
+            except HTTPSClientException:
+                pass
+        try:
+            # Wakes the reader if it is blocked in recv.
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def _header_frames(self, stream_id: int, block: bytes, end: bool):
+        flags = END_STREAM if end else 0
+        fragments = [block[i:i + self._max_frame]
+                     for i in range(0, len(block), self._max_frame)] or [b'']
+        buffers = []
+        for number, fragment in enumerate(fragments):
+            kind = HEADERS if number == 0 else CONTINUATION
+            last = END_HEADERS if number == len(fragments) - 1 else 0
+            buffers += [frame_header(kind, (flags if number == 0 else 0) |
+                                     last, stream_id, len(fragment)),
+                        fragment]
+        return buffers
+
+    def _send_body(self, stream: H2Stream, body, timeout: float = None):
+        sent = 0
+        for chunk in body.chunks():
+            view = memoryview(chunk)
+            while view:
+                with self._condition:
+                    if not self._condition.wait_for(
+                            lambda: self._error or stream.failed or
+                            min(self._send_window,
+                                stream._send_window) > 0, timeout):
+                        raise WriteTimeoutException(self.link)
+                    if self._error or stream.failed:
+                        raise ConnectException(self.link)
+                    size = min(len(view), self._max_frame,
+                               self._send_window, stream._send_window)
+                    self._send_window -= size
+                    stream._send_window -= size
+                self._send([frame_header(DATA, 0, stream.id, size),
+                            view[:size]], timeout)
+                sent += 9 + size
+                view = view[size:]
+        self._send([frame_header(DATA, END_STREAM, stream.id, 0)], timeout)
+        return sent + 9
+
+    def _send(self, buffers: list, timeout: float = None,
+              wait: bool = True):
+        with self._condition:
+            self._outgoing.append(buffers)
+        self._flush(timeout, wait)
+
+    def _flush(self, timeout: float = None, wait: bool = True):
+        # Without `wait` (the reader thread) the frames are left to the
+        # thread that holds the write lock, which looks at the queue
+        # again after letting go of it.
+        if timeout is None:
+            timeout = self._timeout
+        while True:
+            if not wait:
+                if not self._write_lock.acquire(False):
+                    return
+            elif not self._write_lock.acquire(
+                    timeout=-1 if timeout is None else timeout):
+                raise WriteTimeoutException(self.link)
+            try:
+                while True:
+                    with self._condition:
+                        if not self._outgoing:
+                            break
+                        data = b''.join(i for frames in self._outgoing
+                                        for i in frames)
+                        self._outgoing.clear()
+                    self._write(data, timeout)
+            finally:
+                self._write_lock.release()
+            with self._condition:
+                if not self._outgoing:
+                    return
+            # Our frames are out; the rest are only helped along.
+            wait = False
+
+    def _write(self, data: bytes, timeout: float = None):
+        view = memoryview(data)
+        expires = None if timeout is None else time.monotonic() + timeout
+        try:
+            while view:
+                with self._io_lock:
+                    try:
+                        view = view[self._sock.send(view):]
+                        continue
+                    except (BlockingIOError, ssl.SSLWantReadError,
+                            ssl.SSLWantWriteError):
+                        pass
+                # The peer is not reading: wait for room without the I/O
+                # lock, so the reader can still drain the socket.
+                remaining = None if expires is None \
+                    else expires - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    with self._condition:
+                        self._fail('write timed out')
+                    raise WriteTimeoutException(self.link)
+                with selectors.DefaultSelector() as selector:
+                    selector.register(self._sock, selectors.EVENT_WRITE)
+                    selector.select(remaining)
+        except (OSError, ValueError):
+            with self._condition:
+                self._fail('connection lost')
+            raise ConnectException(self.link)
+
+    @staticmethod
+    def _window_update_frame(stream_id: int, increment: int):
+        return frame_header(WINDOW_UPDATE, 0, stream_id, 4) + \
+            UINT32.pack(increment)
+
+    def _read_frames(self):
+        buffer = bytearray()
+        # Not select.select, which can't take descriptors above 1023.
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(self._sock, selectors.EVENT_READ)
+            while True:
+                data = self._recv(selector)
+                if not data:
+                    raise ResponseException('connection closed')
+                buffer += data
+                position = 0
+                while len(buffer) - position >= 9:
+                    high, low, kind, flags, stream_id = \
+                        FRAME_HEADER.unpack_from(buffer, position)
+                    length = high << 16 | low
+                    if length > DEFAULT_FRAME_SIZE:
+                        raise ResponseException('HTTP/2 frame too big')
+                    end = position + 9 + length
+                    if end > len(buffer):
+                        break
+                    payload = bytes(buffer[position + 9:end])
+                    position = end
+                    self._on_frame(kind, flags, stream_id & MAX_WINDOW,
+                                   payload)
+                del buffer[:position]
+        except (OSError, ValueError, struct.error,
+                HTTPSClientException) as e:
+            reason = e.message if isinstance(e, HTTPSClientException) \
+                else str(e) or type(e).__name__
+            with self._condition:
+                self._fail(reason)
+        finally:
+            selector.close()
+
+    def _recv(self, selector):
+        while self._error is None:
+            if not (isinstance(self._sock, ssl.SSLSocket) and
+                    self._sock.pending()):
+                if not selector.select(0.5):
+                    continue
+            with self._io_lock:
+                try:
+                    return self._sock.recv(BUFFER_SIZE)
+                except (BlockingIOError, ssl.SSLWantReadError,
+                        ssl.SSLWantWriteError):
+                    # Only part of a TLS record is in; wait for the rest
+                    # without holding up writers.
+                    pass
+        return b''
+
+    def _on_frame(self, kind: int, flags: int, stream_id: int,
+                  payload: bytes):
+        if self._block is not None and kind != CONTINUATION:
+            raise ResponseException('HTTP/2 header block interrupted')
+
+        if kind == DATA:
+            self._on_data(flags, stream_id, payload)
+        elif kind in (HEADERS, CONTINUATION):
+            self._on_headers(kind, flags, stream_id, payload)
+        elif kind == RST_STREAM:
+            code = UINT32.unpack(payload)[0]
+            with self._condition:
+                stream = self._streams.get(stream_id)
+                if stream is not None:
+                    stream.on_error(f'stream reset, error {code}')
+                self._condition.notify_all()
+        elif kind == SETTINGS:
+            self._on_settings(flags, payload)
+        elif kind == PING and not flags & ACK:
+            self._send([frame_header(PING, ACK, 0, len(payload)),
+                        payload], wait=False)
+        elif kind == GOAWAY:
+            last = UINT32.unpack_from(payload)[0] & MAX_WINDOW
+            with self._condition:
+                # Streams above the last one were never processed and
+                # may be sent again on a new connection.
+                self._goaway = True
+                for stream in self._streams.values():
+                    if stream.id > last:
+                        stream.on_error('refused by GOAWAY')
+                self._condition.notify_all()
+        elif kind == WINDOW_UPDATE:
+            increment = UINT32.unpack(payload)[0] & MAX_WINDOW
+            with self._condition:
+                if not stream_id:
+                    self._send_window += increment
+                elif stream_id in self._streams:
+                    self._streams[stream_id]._send_window += increment
+                self._condition.notify_all()
+        elif kind == PUSH_PROMISE:
+            raise ResponseException('HTTP/2 push was disabled')
+
+    def _on_data(self, flags: int, stream_id: int, payload: bytes):
+        size = len(payload)
+        if flags & PADDED:
+            payload = payload[1:len(payload) - payload[0]]
+        with self._condition:
+            stream = self._streams.get(stream_id)
+            credit = 0
+            if stream is not None:
+                credit = stream.on_data(payload, size + 9,
+                                        bool(flags & END_STREAM))
+            self._unacked += size
+            update = self._unacked >= self._connection_window // 2
+            if update:
+                increment, self._unacked = self._unacked, 0
+            self._condition.notify_all()
+        if update:
+            self.update_window(0, increment, wait=False)
+        if credit:
+            self.update_window(stream_id, credit, wait=False)
+
+    def _on_headers(self, kind: int, flags: int, stream_id: int,
+                    payload: bytes):
+        size = len(payload) + 9
+        if kind == HEADERS:
+            if flags & PADDED:
+                payload = payload[1:len(payload) - payload[0]]
+            if flags & PRIORITY_FLAG:
+                payload = payload[5:]
+            self._block = [stream_id, flags, bytearray(payload), size]
+        elif self._block is None or self._block[0] != stream_id:
+            raise ResponseException('HTTP/2 unexpected CONTINUATION')
+        else:
+            self._block[2] += payload
+            self._block[3] += size
+        if not flags & END_HEADERS:
+            return
+
+        stream_id, first_flags, block, size = self._block
+        self._block = None
+        # Every block is decoded, even for streams we no longer want,
+        # to keep the compression table in step with the server.
+        headers = self._decoder.decode(block)
+        with self._condition:
+            stream = self._streams.get(stream_id)
+            if stream is not None:
+                stream.on_headers(headers, size,
+                                  bool(first_flags & END_STREAM))
+            self._condition.notify_all()
+
+    def _on_settings(self, flags: int, payload: bytes):
+        if flags & ACK:
+            return
+        with self._condition:
+            for offset in range(0, len(payload) - 5, 6):
+                key, value = SETTING.unpack_from(payload, offset)
+                if key == HEADER_TABLE_SIZE:
+                    self._encoder.set_max_size(value)
+                elif key == MAX_CONCURRENT_STREAMS:
+                    self._max_streams = value
+                elif key == INITIAL_WINDOW_SIZE:
+                    if value > MAX_WINDOW:
+                        raise ResponseException('HTTP/2 bad window size')
+                    for stream in self._streams.values():
+                        stream._send_window += value - self._peer_window
+                    self._peer_window = value
+                elif key == MAX_FRAME_SIZE:
+                    self._max_frame = value
+            self._condition.notify_all()
+        self._send([frame_header(SETTINGS, ACK, 0, 0)], wait=False)
+
+    def _fail(self, reason: str):
+        # Called with the lock held.
+        if self._error is None:
+            self._error = reason
+        for stream in self._streams.values():
+            stream.on_error(reason)
+        self._condition.notify_all()
+
+    @property
+    def sock(self):
+        return self._sock
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def handshake(self):
+        return self._handshake
+
+    @property
+    def requests(self):
+        return self._requests
+
+    @property
+    def reused(self):
+        return self._requests > 1
+
+    @property
+    def last_used(self):
+        return self._last_used
+
+    @property
+    def available(self):
+        return self._error is None and not self._goaway
+
+    @property
+    def in_flight(self):
+        return len(self._streams)
+
+    @property
+    def max_streams(self):
+        return self._max_streams
+
+    @property
+    def link(self):
+        return f'{self._key[1]}: {self._key[2]}'
+
+    @property
+    def origin(self):
+        scheme, host, port = self._key
+        return f'{scheme}://{host}:{port}'
@@ -14,6 +14,14 @@ class Method(Enum):
     CONNECT = 'CONNECT'
     TRACE = 'TRACE'
 
+    @property
+    def idempotent(self):
+        return self in IDEMPOTENT
+
+    @property
+    def safe(self):
+        return self in SAFE
+
     @classmethod
     def check_request_type(cls, method: str):
         method = method.upper()
@@ -21,3 +29,8 @@ class Method(Enum):
             return cls(method)
         except ValueError:
             raise ValueRequestTypeException(method)
+
+
+IDEMPOTENT = (Method.GET, Method.HEAD, Method.PUT, Method.DELETE,
+              Method.OPTIONS, Method.TRACE)
+SAFE = (Method.GET, Method.HEAD, Method.OPTIONS, Method.TRACE)
@@ -0,0 +1,299 @@
+import threading
+import weakref
+from bisect import bisect_left
+
+# 1 ms to about 65 s, doubling: fixed log-scale buckets keep observe()
+# to a bisect and one increment.
+LATENCY_BUCKETS = tuple(0.001 * 2 ** i for i in range(17))
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n') \
+        .replace('"', '\\"')
+
+
+def format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{escape(value)}"'
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self._name = name
+        self._help = help
+        self._labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self._name
+
+    def samples(self):
+        return []
+
+    def exposition(self) -> list:
+        lines = [f'# HELP {self._name} '
+                 f'{self._help.replace(chr(92), chr(92) * 2)}',
+                 f'# TYPE {self._name} {self.kind}']
+        for suffix, labels, extra, value in self.samples():
+            lines.append(f'{self._name}{suffix}'
+                         f'{format_labels(self._labels, labels, extra)} '
+                         f'{format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self._values = {}
+
+    def inc(self, labels: tuple = (), value: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def value(self, labels: tuple = ()):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            return [('', labels, '', value)
+                    for labels, value in sorted(self._values.items())]
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: value for labels, value in self._values.items()}
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: tuple = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self._buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket plus one for +Inf, sum]
+        self._values = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        index = bisect_left(self._buckets, value)
+        with self._lock:
+            item = self._values.get(labels)
+            if item is None:
+                item = self._values[labels] = [[0] * (len(self._buckets) + 1),
+                                               0.0]
+            item[0][index] += 1
+            item[1] += value
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            items = [(labels, list(counts), total)
+                     for labels, (counts, total) in
+                     sorted(self._values.items())]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self._buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('_bucket', labels,
+                                f'le="{format_value(bound)}"', cumulative))
+            samples.append(('_sum', labels, '', total))
+            samples.append(('_count', labels, '', cumulative))
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            items = {labels: (list(counts), total)
+                     for labels, (counts, total) in self._values.items()}
+        return {labels: {'count': sum(counts),
+                         'sum': total,
+                         'p50': self._quantile(counts, 0.5),
+                         'p90': self._quantile(counts, 0.9),
+                         'p99': self._quantile(counts, 0.99)}
+                for labels, (counts, total) in items.items()}
+
+    def _quantile(self, counts: list, quantile: float):
+        # Upper bound of the bucket holding the quantile.
+        rank = quantile * sum(counts)
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float('inf'),), counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return bound
+        return None
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: tuple = (),
+                 kind: str = 'gauge'):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self._callbacks = []
+
+    def add_callback(self, callback):
+        # callback() -> {label values: value}; values are read at export
+        # time, so nothing is paid on the request path.
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def samples(self):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        values = {}
+        for callback in callbacks:
+            for labels, value in callback().items():
+                values[labels] = values.get(labels, 0) + value
+        return [('', labels, '', value)
+                for labels, value in sorted(values.items())]
+
+    def snapshot(self):
+        return {labels: value for _, labels, _, value in self.samples()}
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labels, buckets=buckets)
+
+    def gauge(self, name: str, help: str, labels: tuple = (),
+              kind: str = 'gauge') -> Gauge:
+        return self._register(Gauge, name, help, labels, kind=kind)
+
+    def _register(self, cls, name: str, help: str, labels: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labels,
+                                                   **kwargs)
+            return metric
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.exposition()
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {','.join(map(str, labels)): value
+                              for labels, value in metric.snapshot().items()}
+                for metric in metrics}
+
+
+class ClientMetrics:
+    def __init__(self, registry: Registry = None):
+        self._registry = registry if registry is not None else Registry()
+        labels = ('host', 'method')
+        self._requests = self._registry.counter(
+            'http_client_requests_total',
+            'Responses received, by host, method and status code',
+            labels + ('code',))
+        self._errors = self._registry.counter(
+            'http_client_errors_total',
+            'Requests that failed without a response, by error type',
+            labels + ('error',))
+        self._duration = self._registry.histogram(
+            'http_client_request_duration_seconds',
+            'Time from sending a request to the end of its response', labels)
+        self._redirects = self._registry.counter(
+            'http_client_redirects_total', 'Redirects followed', ('host',))
+        self._connections = self._registry.gauge(
+            'http_client_pool_connections', 'Pooled connections by state',
+            ('state',))
+        self._cache = self._registry.gauge(
+            'http_client_cache_lookups_total', 'Response cache lookups',
+            ('result',), kind='counter')
+        self._retries = self._registry.gauge(
+            'http_client_retries_total', 'Retried attempts', kind='counter')
+        self._handshakes = self._registry.gauge(
+            'http_client_tls_handshakes_total', 'TLS handshakes',
+            ('resumed',), kind='counter')
+
+    def bind(self, client):
+        # Callbacks hold the client weakly so a shared registry doesn't
+        # keep closed clients alive.
+        reference = weakref.ref(client)
+
+        def read(function):
+            def callback():
+                client = reference()
+                return function(client) if client is not None else {}
+            return callback
+
+        self._connections.add_callback(read(self._pool_values))
+        self._cache.add_callback(read(self._cache_values))
+        self._retries.add_callback(read(
+            lambda c: {(): c.retry.stats['retries']} if c.retry else {}))
+        self._handshakes.add_callback(read(self._handshake_values))
+
+    def response_done(self, response):
+        request = response.request
+        labels = (request.host, request.request_method)
+        self._requests.inc(labels + (response.code,))
+        if response.elapsed is not None:
+            self._duration.observe(response.elapsed, labels)
+
+    def failed(self, request, error: BaseException):
+        self._errors.inc((request.host, request.request_method,
+                          type(error).__name__))
+
+    def redirect(self, request):
+        self._redirects.inc((request.host,))
+
+    def to_prometheus(self) -> str:
+        return self._registry.to_prometheus()
+
+    def snapshot(self) -> dict:
+        return self._registry.snapshot()
+
+    @property
+    def registry(self):
+        return self._registry
+
+    @staticmethod
+    def _pool_values(client):
+        if client.pool is None:
+            return {}
+        return {('idle',): client.pool.idle_count,
+                ('active',): client.pool.active_count}
+
+    @staticmethod
+    def _cache_values(client):
+        if client.cache is None:
+            return {}
+        stats = client.cache.stats
+        return {('hit',): stats['hits'],
+                ('miss',): stats['misses'],
+                ('revalidated',): stats['revalidations']}
+
+    @staticmethod
+    def _handshake_values(client):
+        stats = client.tls_metrics
+        return {('true',): stats['resumed'],
+                ('false',): stats['handshakes'] - stats['resumed']}
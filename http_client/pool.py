@@ -0,0 +1,191 @@
+import selectors
+import threading
+import time
+from collections import defaultdict, deque
+
+from http_client.exceptions import PoolTimeoutException
+from http_client.reader import ResponseReader
+
+
+class Connection:
+    def __init__(self, sock, key: tuple, handshake=None):
+        self._sock = sock
+        self._key = key
+        self._handshake = handshake
+        self._created = time.monotonic()
+        self._last_used = self._created
+        self._requests = 0
+        self._reader = None
+
+    @property
+    def sock(self):
+        return self._sock
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            _, host, port = self._key
+            self._reader = ResponseReader(self._sock, link=f'{host}: {port}')
+        return self._reader
+
+    @property
+    def key(self):
+        return self._key
+
+    @property
+    def handshake(self):
+        return self._handshake
+
+    @property
+    def requests(self):
+        return self._requests
+
+    @property
+    def reused(self):
+        return self._requests > 0
+
+    @property
+    def last_used(self):
+        return self._last_used
+
+    def touch(self):
+        self._requests += 1
+        self._last_used = time.monotonic()
+
+    def idle_time(self, now: float = None):
+        return (now or time.monotonic()) - self._last_used
+
+    def is_alive(self):
+        # An idle keep-alive socket must have nothing to read: readability
+        # means the peer closed it (EOF) or sent data we did not ask for.
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(self._sock, selectors.EVENT_READ)
+                readable = selector.select(0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def close(self):
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self,
+                 max_idle: int = 32,
+                 max_per_host: int = 8,
+                 idle_timeout: float = 60.0):
+        self._max_idle = max_idle
+        self._max_per_host = max_per_host
+        self._idle_timeout = idle_timeout
+        self._idle = defaultdict(deque)
+        self._total = defaultdict(int)
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def acquire(self, key: tuple, factory, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                connection = self._pop_idle(key)
+                if connection is not None:
+                    return connection
+
+                if self._total[key] < self._max_per_host:
+                    self._total[key] += 1
+                    break
+
+                remaining = None if deadline is None \
+                    else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeoutException(self._format_key(key))
+                self._condition.wait(remaining)
+
+        try:
+            return factory()
+        except BaseException:
+            self._forget(key)
+            raise
+
+    def release(self, connection: Connection, reusable: bool = True):
+        connection.touch()
+        if not reusable or self._closed:
+            connection.close()
+            self._forget(connection.key)
+            return
+
+        with self._condition:
+            self._idle[connection.key].append(connection)
+            self._evict_idle()
+            self._condition.notify_all()
+
+    def adopt(self, connection: Connection):
+        # Counts in a connection opened outside the pool, e.g. one whose
+        # ALPN negotiation settled on HTTP/1.1, so it can be released
+        # like an acquired one.
+        with self._condition:
+            self._total[connection.key] += 1
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            for key, connections in self._idle.items():
+                while connections:
+                    connections.pop().close()
+                    self._total[key] -= 1
+            self._condition.notify_all()
+
+    @property
+    def idle_count(self):
+        with self._condition:
+            return sum(len(i) for i in self._idle.values())
+
+    @property
+    def active_count(self):
+        with self._condition:
+            return sum(self._total.values()) - \
+                   sum(len(i) for i in self._idle.values())
+
+    @property
+    def max_per_host(self):
+        return self._max_per_host
+
+    def _pop_idle(self, key: tuple):
+        connections = self._idle[key]
+        now = time.monotonic()
+        while connections:
+            connection = connections.pop()
+            if (connection.idle_time(now) < self._idle_timeout and
+                    connection.is_alive()):
+                return connection
+            connection.close()
+            self._total[key] -= 1
+        return None
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        for key, connections in self._idle.items():
+            while (connections and connections[0].idle_time(now) >=
+                   self._idle_timeout):
+                connections.popleft().close()
+                self._total[key] -= 1
+
+        while sum(len(i) for i in self._idle.values()) > self._max_idle:
+            oldest = min((i for i in self._idle.values() if i),
+                         key=lambda i: i[0].last_used)
+            connection = oldest.popleft()
+            connection.close()
+            self._total[connection.key] -= 1
+
+    def _forget(self, key: tuple):
+        with self._condition:
+            self._total[key] -= 1
+            self._condition.notify_all()
+
+    @staticmethod
+    def _format_key(key: tuple):
+        scheme, host, port = key
+        return f'{scheme}://{host}:{port}'
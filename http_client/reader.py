@@ -0,0 +1,293 @@
+import io
+from socket import timeout as socket_timeout
+
+from http_client.exceptions import ResponseException, ReadTimeoutException
+from http_client.headers import Headers
+
+BUFFER_SIZE = 64 * 1024
+MAX_HEAD_SIZE = 1024 * 1024
+ENCODING = 'ISO-8859-1'
+
+NO_BODY, LENGTH, CHUNKED, UNTIL_CLOSE = range(4)
+
+
+def body_framing(method: str, code: int, headers: dict, protocol: str):
+    connection = headers.get('connection', '').lower()
+    if protocol == 'HTTP/1.0':
+        keep_alive = 'keep-alive' in connection
+    else:
+        keep_alive = 'close' not in connection
+
+    if method == 'HEAD' or code in (204, 304) or 100 <= code < 200:
+        return NO_BODY, 0, keep_alive
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        return CHUNKED, 0, keep_alive
+    if 'content-length' in headers:
+        return LENGTH, int(headers['content-length']), keep_alive
+    return UNTIL_CLOSE, 0, False
+
+
+class ResponseReader:
+    def __init__(self, sock, buffer_size: int = BUFFER_SIZE,
+                 link: str = None):
+        self._sock = sock
+        self._buffer = bytearray(buffer_size)
+        self._start = 0
+        self._end = 0
+        self._mode = NO_BODY
+        self._remaining = 0
+        self._chunk_left = 0
+        self._keep_alive = False
+        self._code = None
+        self._headers = Headers()
+        self._timeout = None
+        self._deadline = None
+        self._received = 0
+        self._link = link
+
+    @property
+    def link(self):
+        return self._link
+
+    def set_timeout(self, timeout: float = None, deadline=None):
+        # The timeout bounds each wait for data; with a deadline every
+        # wait is also cut to the time left for the whole request.
+        self._timeout = timeout
+        self._deadline = deadline
+        self._sock.settimeout(timeout)
+
+    def read_head(self, method: str = 'GET'):
+        self._received = 0
+        while True:
+            head = self._read_until_blank_line()
+            self._code, self._headers, protocol = self.parse_head(head)
+            if not 100 <= self._code < 200 or self._code == 101:
+                break
+
+        self._mode, self._remaining, self._keep_alive = body_framing(
+            method, self._code, self._headers, protocol)
+        self._chunk_left = 0
+        return head
+
+    def read_body(self):
+        if self._mode == LENGTH:
+            body = bytearray(self._remaining)
+            self._read_into(memoryview(body))
+            self._remaining = 0
+        elif self._mode == CHUNKED:
+            body = self._read_chunked()
+        elif self._mode == UNTIL_CLOSE:
+            body = self._read_until_close()
+        else:
+            body = b''
+
+        self._mode = NO_BODY
+        return bytes(body)
+
+    def readinto(self, view: memoryview):
+        if self._mode == LENGTH:
+            received = self._read_some(view[:self._remaining]) \
+                if self._remaining else 0
+            if self._remaining and not received:
+                raise ResponseException('connection closed mid-body')
+            self._remaining -= received
+            if not self._remaining:
+                self._mode = NO_BODY
+            return received
+
+        if self._mode == CHUNKED:
+            if not self._chunk_left:
+                self._chunk_left = self._read_chunk_size()
+                if not self._chunk_left:
+                    self._mode = NO_BODY
+                    return 0
+            received = self._read_some(view[:self._chunk_left])
+            if not received:
+                raise ResponseException('connection closed mid-body')
+            self._chunk_left -= received
+            if not self._chunk_left:
+                self._read_line()
+            return received
+
+        if self._mode == UNTIL_CLOSE:
+            received = self._read_some(view)
+            if not received:
+                self._mode = NO_BODY
+            return received
+
+        return 0
+
+    @property
+    def received(self):
+        return self._received
+
+    @property
+    def code(self):
+        return self._code
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def reusable(self):
+        return self._keep_alive and self._mode == NO_BODY
+
+    @staticmethod
+    def parse_head(head: bytes):
+        status_line, _, fields = head.partition(b'\r\n')
+        parts = status_line.split(b' ', 2)
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise ResponseException(f'bad status line {status_line!r}')
+        return int(parts[1]), Headers.parse(fields), \
+            parts[0].decode(ENCODING)
+
+    def _fill(self):
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._end == len(self._buffer):
+            if self._start:
+                size = self._end - self._start
+                self._buffer[:size] = self._buffer[self._start:self._end]
+                self._start, self._end = 0, size
+            else:
+                self._buffer.extend(bytes(len(self._buffer)))
+
+        with memoryview(self._buffer) as view:
+            received = self._recv_into(view[self._end:])
+        self._end += received
+        return received
+
+    def _read_until_blank_line(self):
+        searched = self._start
+        while True:
+            index = self._buffer.find(b'\r\n\r\n', searched, self._end)
+            if index >= 0:
+                head = bytes(self._buffer[self._start:index])
+                self._start = index + 4
+                return head
+
+            if self._end - self._start > MAX_HEAD_SIZE:
+                raise ResponseException('response head is too large')
+            searched = max(self._start, self._end - 3)
+            offset = self._start
+            if not self._fill():
+                raise ResponseException('connection closed by the server')
+            searched -= offset - self._start
+
+    def _read_line(self):
+        while True:
+            index = self._buffer.find(b'\r\n', self._start, self._end)
+            if index >= 0:
+                line = bytes(self._buffer[self._start:index])
+                self._start = index + 2
+                return line
+            if not self._fill():
+                raise ResponseException('connection closed mid-body')
+
+    def _read_into(self, view: memoryview):
+        size = min(len(view), self._end - self._start)
+        view[:size] = self._buffer[self._start:self._start + size]
+        self._start += size
+        while size < len(view):
+            received = self._recv_into(view[size:])
+            if not received:
+                raise ResponseException('connection closed mid-body')
+            size += received
+
+    def _read_some(self, view: memoryview):
+        if self._start < self._end:
+            size = min(len(view), self._end - self._start)
+            view[:size] = self._buffer[self._start:self._start + size]
+            self._start += size
+            return size
+        return self._recv_into(view)
+
+    def _recv_into(self, view: memoryview):
+        if self._deadline is not None:
+            self._sock.settimeout(self._deadline.clamp(self._timeout))
+        try:
+            received = self._sock.recv_into(view)
+        except socket_timeout:
+            if self._deadline is not None:
+                self._deadline.clamp()
+            raise ReadTimeoutException(self._link)
+        self._received += received
+        return received
+
+    def _read_chunk_size(self):
+        size = int(self._read_line().split(b';')[0].strip(), 16)
+        if size == 0:
+            while self._read_line():
+                pass
+        return size
+
+    def _read_chunked(self):
+        body = bytearray()
+        if self._chunk_left:
+            self._copy_to(body, self._chunk_left)
+            self._read_line()
+
+        while True:
+            size = self._read_chunk_size()
+            if size == 0:
+                break
+            self._copy_to(body, size)
+            self._read_line()
+
+        self._chunk_left = 0
+        return body
+
+    def _copy_to(self, body: bytearray, size: int):
+        while size:
+            if self._start == self._end and not self._fill():
+                raise ResponseException('connection closed mid-body')
+            count = min(size, self._end - self._start)
+            with memoryview(self._buffer) as view:
+                body += view[self._start:self._start + count]
+            self._start += count
+            size -= count
+
+    def _read_until_close(self):
+        body = bytearray()
+        while True:
+            if self._start < self._end:
+                with memoryview(self._buffer) as view:
+                    body += view[self._start:self._end]
+                self._start = self._end
+            if not self._fill():
+                return body
+
+
+class ResponseStream(io.RawIOBase):
+    def __init__(self, reader: ResponseReader, release):
+        self._reader = reader
+        self._release = release
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._release is None:
+            return 0
+        try:
+            with memoryview(buffer) as view:
+                received = self._reader.readinto(view.cast('B'))
+        except BaseException:
+            self._finish(False)
+            raise
+        if not received:
+            self._finish(self._reader.reusable)
+        return received
+
+    def close(self):
+        if self._release is not None:
+            # An unread body leaves the connection in an unknown state,
+            # so it can't go back to the pool.
+            self._finish(False)
+        super().close()
+
+    def _finish(self, reusable: bool):
+        release, self._release = self._release, None
+        if release is not None:
+            release(reusable)
@@ -1,9 +1,13 @@
+import copy
 from pathlib import Path
 
 from yarl import URL
 
+from http_client.body import Body, BytesBody, FileBody
+from http_client.encoding import accept_encoding
 from http_client.exceptions import (UnreadableFileException,
-                                    HTTPSClientException)
+                                    HTTPSClientException,
+                                    StreamedBodyRedirectException)
 from http_client.method import Method
 
 ENCODING = 'ISO-8859-1'
@@ -20,27 +24,38 @@ class Request:
                  agent: str = None,
                  cookie_file: str = None,
                  protocol: str = None,
-                 data: str = None):
-        self._data = self.prepare_data(data)
-        self._protocol = protocol
+                 data: str = None,
+                 keep_alive: bool = False,
+                 compress: bool = False):
+        self._body = Body.create(data)
+        self._protocol = protocol or 'HTTP/1.1'
+        self._template = None
         self._reference = reference
         self._agent = agent
         self._cookie = cookie
         self._cookie_file = cookie_file
         self._timeout = timeout
+        self._deadline = None
         self._url = URL(url)
         self._method = Method.check_request_type(method)
+        self._keep_alive = keep_alive
+        self._compress = compress
         self._headers = {}
         self._prepare_headers(headers)
 
     def _prepare_headers(self, headers: list):
+        self._template = None
         self.parse_console_headers(headers)
 
         self.set_value_in_headers('Reference', self._reference)
         self.set_value_in_headers('Cookie', self._cookie)
         self.set_value_in_headers('User-Agent', self._agent)
-        self.set_value_in_headers('Host', self.url.host)
-        self.set_value_in_headers('Connection', 'close')
+        self.set_value_in_headers('Host', self.host)
+        self.set_value_in_headers('Connection',
+                                  'keep-alive' if self._keep_alive
+                                  else 'close')
+        if self._compress and 'Accept-Encoding' not in self._headers:
+            self._headers['Accept-Encoding'] = accept_encoding()
 
         self.add_cookie_from_file()
 
@@ -65,21 +80,71 @@ class Request:
     def set_value_in_headers(self, headers: str, value):
         if value:
             self._headers[headers] = value
+            self._template = None
+
+    def remove_header(self, name: str):
+        if self._headers.pop(name, None) is not None:
+            self._template = None
+
+    def redirect(self, location: str) -> 'Request':
+        if not self._body.replayable:
+            # The iterator is spent; the hop would send an empty body.
+            raise StreamedBodyRedirectException(location)
+        hop = self.derive(url=self.url.join(URL(location)))
+        if hop.origin != self.origin:
+            # The Cookie header was meant for this origin only; a client
+            # with a cookie jar adds the new origin's own cookies.
+            hop.remove_header('Cookie')
+        return hop
+
+    def derive(self, url: URL = None, data=None,
+               template: 'RequestTemplate' = None) -> 'Request':
+        # A shallow copy skips URL parsing, header preparation and
+        # re-reading cookie and data files for every redirect hop.
+        request = copy.copy(self)
+        request._headers = dict(self._headers)
+        request._template = template
+        if url is not None:
+            request._url = url
+            if template is None:
+                request._headers['Host'] = request.host
+        if data is not None:
+            request._body = Body.create(data)
+        return request
+
+    def with_deadline(self, deadline) -> 'Request':
+        request = self.derive(template=self._template)
+        request._deadline = deadline
+        return request
+
+    @property
+    def origin(self):
+        return f'{self.url.scheme}://{self.host}'
+
+    @property
+    def host(self):
+        if self.url.port is None or self.url.is_default_port():
+            return self.url.host
+        return f'{self.url.host}:{self.url.port}'
+
+    @property
+    def target(self):
+        return self.url.raw_path_qs or '/'
+
+    @property
+    def body(self) -> Body:
+        return self._body
+
+    def buffers(self) -> list:
+        if self._template is None:
+            self._template = RequestTemplate(self)
+        return self._template.render(self)
 
     def __repr__(self) -> str:
         return bytes(self).decode(ENCODING)
 
     def __bytes__(self):
-        result = bytearray(f'{self._method.name} {self.url.path} '
-                           f'{self._protocol}\r\n', ENCODING)
-        for header, value in self.headers.items():
-            result += bytes(f'{header}: {value}\r\n', ENCODING)
-
-        result += bytes(f'Content-Length: {len(self._data)}\r\n',
-                        ENCODING)
-        result += bytes(f'\r\n{self._data}', ENCODING)
-
-        return bytes(result)
+        return b''.join(self.buffers())
 
     @staticmethod
     def prepare_data(data: str = None):
@@ -103,18 +168,25 @@ class Request:
     @request_method.setter
     def request_method(self, value: str):
         self._method = Method.check_request_type(value)
+        self._template = None
+
+    @property
+    def idempotent(self):
+        return self._method.idempotent
+
+    @property
+    def safe(self):
+        return self._method.safe
 
     @property
     def url(self) -> URL:
         return self._url
 
     @url.setter
-    def url(self, value: str):
-        self._url = URL(value)
-
-    @url.setter
-    def url(self, value: URL):
-        self._url = value
+    def url(self, value):
+        self._url = URL(value) if isinstance(value, str) else value
+        self._headers['Host'] = self.host
+        self._template = None
 
     @property
     def cookie(self):
@@ -137,6 +209,28 @@ class Request:
     def timeout(self, value: float):
         self._timeout = value
 
+    @property
+    def deadline(self):
+        return self._deadline
+
+    @deadline.setter
+    def deadline(self, value):
+        self._deadline = value
+
+    @property
+    def keep_alive(self):
+        return self._keep_alive
+
+    @keep_alive.setter
+    def keep_alive(self, value: bool):
+        if value != self._keep_alive:
+            self._keep_alive = value
+            self._prepare_headers([])
+
+    @property
+    def compress(self):
+        return self._compress
+
     @property
     def user_agent(self):
         return self._agent
@@ -155,9 +249,53 @@ class Request:
         return self._reference
 
     @property
-    def data(self):
-        return self._data
+    def data(self) -> str:
+        # Always text; a stream that can only be read once stays in body.
+        if isinstance(self._body, BytesBody):
+            return self._body.data.decode(ENCODING)
+        if isinstance(self._body, FileBody) and self._body.path:
+            try:
+                return Path(self._body.path).read_bytes().decode(ENCODING)
+            except OSError:
+                raise UnreadableFileException(self._body.path)
+        return ''
 
     @property
     def protocol(self):
         return self._protocol
+
+
+class RequestTemplate:
+    def __init__(self, request: Request):
+        self._request = request
+        self._method = f'{request.request_method} '.encode(ENCODING)
+        self._target = request.target.encode(ENCODING)
+        self._head = ''.join(
+            [f' {request.protocol}\r\n'] +
+            [f'{header}: {value}\r\n'
+             for header, value in request.headers.items()]
+        ).encode(ENCODING)
+        self._body = request.body
+        self._prefix = [self._method, self._target, self._head,
+                        self._body.framing()]
+        self._buffers = self._prefix + self._body.buffers()
+
+    def render(self, request: Request = None) -> list:
+        if request is None or request is self._request:
+            return list(self._buffers)
+
+        body = request.body
+        if body is self._body:
+            return [self._method, request.target.encode(ENCODING),
+                    self._head, self._prefix[3]] + body.buffers()
+        return [self._method, request.target.encode(ENCODING),
+                self._head, body.framing()] + body.buffers()
+
+    def request(self, path: str = None, query=None,
+                data: str = None) -> Request:
+        url = self._request.url
+        if path is not None:
+            url = url.with_path(path).with_query(url.query)
+        if query is not None:
+            url = url.with_query(query)
+        return self._request.derive(url=url, data=data, template=self)
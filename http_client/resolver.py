@@ -0,0 +1,182 @@
+import errno
+import ipaddress
+import selectors
+import threading
+import time
+from collections import OrderedDict
+from socket import (socket, getaddrinfo, AF_INET, AF_INET6, AF_UNSPEC,
+                    SOCK_STREAM, SOL_SOCKET, SO_ERROR)
+from socket import timeout as socket_timeout
+
+IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN)
+
+
+class Resolver:
+    def __init__(self, ttl: float = 60.0,
+                 hosts: dict = None,
+                 max_size: int = 1024,
+                 attempt_delay: float = 0.25,
+                 failure_timeout: float = 30.0):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._attempt_delay = attempt_delay
+        self._failure_timeout = failure_timeout
+        self._hosts = {}
+        # host -> (expiry, [(family, ip, extra sockaddr fields)])
+        self._cache = OrderedDict()
+        # ip -> monotonic time of the last failed connect
+        self._failures = {}
+        self._lookups = 0
+        self._hits = 0
+        self._lock = threading.Lock()
+        for host, addresses in (hosts or {}).items():
+            self.add_host(host, addresses)
+
+    def add_host(self, host: str, addresses):
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        self._hosts[host.lower()] = [self._literal(i) for i in addresses]
+
+    def resolve(self, host: str, port: int) -> list:
+        records = self._records(host)
+        return [(family, (ip, port) + extra)
+                for family, ip, extra in self._order(records)]
+
+    def connect(self, host: str, port: int, timeout: float = None):
+        return self.connect_to(self.resolve(host, port), timeout, host)
+
+    def connect_to(self, addresses: list, timeout: float = None,
+                   host: str = None):
+        addresses = list(addresses)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        selector = selectors.DefaultSelector()
+        error = None
+        try:
+            # Happy Eyeballs (RFC 8305): a new attempt starts whenever the
+            # previous one fails or has not finished after attempt_delay.
+            while addresses or selector.get_map():
+                if addresses:
+                    family, address = addresses.pop(0)
+                    sock = socket(family, SOCK_STREAM)
+                    sock.setblocking(False)
+                    code = sock.connect_ex(address)
+                    if code == 0:
+                        return self._connected(sock, address)
+                    if code in IN_PROGRESS:
+                        selector.register(sock, selectors.EVENT_WRITE,
+                                          address)
+                    else:
+                        error = OSError(code, f'connect to {address[0]} '
+                                              f'failed')
+                        self._failed(sock, address)
+                        continue
+
+                left = None if deadline is None \
+                    else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    raise socket_timeout(f'connect to {host} timed out')
+                wait = left
+                if addresses:
+                    wait = self._attempt_delay if left is None \
+                        else min(self._attempt_delay, left)
+
+                for key, _ in selector.select(wait):
+                    sock, address = key.fileobj, key.data
+                    selector.unregister(sock)
+                    code = sock.getsockopt(SOL_SOCKET, SO_ERROR)
+                    if code == 0:
+                        return self._connected(sock, address)
+                    error = OSError(code, f'connect to {address[0]} failed')
+                    self._failed(sock, address)
+            raise error or OSError(f'no addresses for {host}')
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+
+    def report_failure(self, ip: str):
+        with self._lock:
+            self._failures[ip] = time.monotonic()
+
+    def report_success(self, ip: str):
+        with self._lock:
+            self._failures.pop(ip, None)
+
+    def failed(self, ip: str):
+        with self._lock:
+            failed_at = self._failures.get(ip)
+        return failed_at is not None and \
+            time.monotonic() - failed_at < self._failure_timeout
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._failures.clear()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {'lookups': self._lookups,
+                    'hits': self._hits,
+                    'cached': len(self._cache),
+                    'failed': len(self._failures)}
+
+    def _records(self, host: str):
+        name = host.lower().strip('[]')
+        if name in self._hosts:
+            return self._hosts[name]
+        try:
+            return [self._literal(name)]
+        except ValueError:
+            pass
+
+        now = time.monotonic()
+        with self._lock:
+            self._lookups += 1
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] > now:
+                self._hits += 1
+                self._cache.move_to_end(name)
+                return cached[1]
+
+        records = []
+        for family, _, _, _, address in getaddrinfo(name, None, AF_UNSPEC,
+                                                    SOCK_STREAM):
+            record = (family, address[0], tuple(address[2:]))
+            if record not in records:
+                records.append(record)
+
+        with self._lock:
+            self._cache[name] = (now + self._ttl, records)
+            self._cache.move_to_end(name)
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+        return records
+
+    def _order(self, records: list):
+        if not records:
+            return []
+        # Alternate families starting with the first one the system
+        # prefers, then move addresses that failed recently to the end.
+        first = [i for i in records if i[0] == records[0][0]]
+        second = [i for i in records if i[0] != records[0][0]]
+        interleaved = []
+        for i in range(max(len(first), len(second))):
+            interleaved += first[i:i + 1] + second[i:i + 1]
+        return sorted(interleaved, key=lambda i: self.failed(i[1]))
+
+    def _connected(self, sock, address):
+        sock.setblocking(True)
+        self.report_success(address[0])
+        return sock
+
+    def _failed(self, sock, address):
+        sock.close()
+        self.report_failure(address[0])
+
+    @staticmethod
+    def _literal(address: str):
+        ip = ipaddress.ip_address(address.strip('[]'))
+        if ip.version == 6:
+            return AF_INET6, str(ip), (0, 0)
+        return AF_INET, str(ip), ()
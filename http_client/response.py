@@ -1,13 +1,13 @@
+import json
+import mmap
 import re
 
+from http_client.encoding import ContentDecoder, decode_content
+from http_client.headers import Headers
 from http_client.request import Request
+from http_client.trace import Timings
 
-re_start_line = r'(?P<protocol>[\d\.\d]*) ' \
-                r'(?P<code>[\d]*) (?P<message>[\w]*)'
-re_header = r'(?P<header>[a-zA-Z-]*): (?P<value>[0-9\s\w,.;=/:-]*)'
-re_charset = r'[a-zA-z/]*; charset=(?P<charset>[\w\d-]*)'
-for i in {re_start_line, re_header, re_charset}:
-    re.compile(i)
+re_charset = re.compile(r'charset="?(?P<charset>[\w\d.:-]*)', re.I)
 
 DECODING = 'ISO-8859-1'
 
@@ -19,64 +19,192 @@ class Response:
                  headers: dict,
                  request,
                  charset: str = '',
-                 raw_response: str = ''):
-        self._message = message
+                 raw_response: str = None,
+                 raw=None,
+                 handshake=None,
+                 body: bytes = None,
+                 head: bytes = None,
+                 timings: Timings = None):
+        self._text = message
+        self._content = None
+        self._body = body
+        self._head = head
+        self._raw = raw
+        self._handshake = handshake
         self._charset = charset
         self._code = code
         self._protocol = protocol
-        self._headers = headers
+        self._headers = headers if isinstance(headers, Headers) \
+            else Headers(headers)
         self._request = request
         self._raw_response = raw_response
+        self._timings = timings if timings is not None else Timings()
 
     @classmethod
     def from_bytes(cls, data: bytes,
                    req: Request) -> 'Response':
-        response = data.decode(DECODING)
-        parts = response.split('\r\n\r\n')
-        lines_headers = parts[0].split('\r\n')
+        index = data.find(b'\r\n\r\n')
+        if index < 0:
+            return cls.from_message(bytes(data), b'', req)
+        return cls.from_message(bytes(data[:index]),
+                                memoryview(data)[index + 4:], req)
 
+    @classmethod
+    def from_message(cls, head: bytes, body: bytes,
+                     req: Request, raw=None,
+                     handshake=None,
+                     headers: Headers = None,
+                     timings: Timings = None) -> 'Response':
+        status_line, _, fields = head.partition(b'\r\n')
         protocol, code, answer_message = cls.start_search(
-            lines_headers[0])
-        headers = cls.parse_headers(lines_headers[1:])
+            status_line.decode(DECODING))
+        if headers is None:
+            headers = Headers.parse(fields)
 
-        return cls(message=parts[1],
+        return cls(message=None,
                    code=int(code),
                    protocol=float(protocol),
                    headers=headers,
                    request=req,
-                   raw_response=response)
+                   raw=raw,
+                   handshake=handshake,
+                   body=None if raw else body,
+                   head=head,
+                   timings=timings)
 
     @staticmethod
     def start_search(line: str):
-        find_value = re.search(re_start_line, line)
-        return (find_value.group('protocol'),
-                find_value.group('code'),
-                find_value.group('message'))
+        protocol, code, message = (line.split(' ', 2) + ['', ''])[:3]
+        return protocol.partition('/')[2], code, message
 
     @classmethod
     def parse_headers(cls, lines):
-        headers = {}
-        for line in lines:
-            header = re.search(re_header, line)
-            if header:
-                headers[header.group('header')] = header.group('value')
-
-        return headers
+        return Headers.parse_lines(lines)
 
     @property
     def message(self):
-        return self._message
+        return self.text
+
+    @property
+    def text(self):
+        if self._text is None:
+            try:
+                self._text = self.content.decode(self.charset or 'utf-8',
+                                                 errors='replace')
+            except LookupError:
+                self._text = self.content.decode('utf-8', errors='replace')
+        return self._text
+
+    @property
+    def content(self):
+        if self._content is None:
+            if self._body is None and self._raw is None:
+                self._content = self._text.encode(self.charset or 'utf-8')
+            else:
+                self._content = decode_content(self._read_body(),
+                                               self.content_encoding)
+        return self._content
+
+    def json(self, **kwargs):
+        return json.loads(self.content, **kwargs)
+
+    def _read_body(self):
+        if self._body is None:
+            self._body = self._raw.readall()
+            self._raw.close()
+        return self._body
+
+    def read(self) -> bytes:
+        # Reads the whole body, which also lets a streamed response give
+        # its connection back.
+        return self.body
+
+    @property
+    def body(self):
+        if self._body is None and self._raw is None:
+            return self.content
+        return self._read_body()
+
+    @property
+    def head(self):
+        return self._head
+
+    @property
+    def timings(self):
+        return self._timings
+
+    @property
+    def elapsed(self):
+        return self._timings.total
+
+    @property
+    def raw(self):
+        return self._raw
+
+    @property
+    def handshake(self):
+        return self._handshake
+
+    def iter_content(self, chunk_size: int = 64 * 1024,
+                     decode_content: bool = True):
+        decoder = ContentDecoder(self.content_encoding) \
+            if decode_content else None
+        for chunk in self._iter_body(chunk_size):
+            if decoder is not None:
+                chunk = decoder.decompress(chunk)
+            if chunk:
+                yield chunk
+
+        if decoder is not None:
+            tail = decoder.flush()
+            if tail:
+                yield tail
+
+    def _iter_body(self, chunk_size: int):
+        if self._body is None and self._raw is None:
+            self._body = self.content
+
+        if self._body is not None:
+            for i in range(0, len(self._body), chunk_size):
+                yield bytes(self._body[i:i + chunk_size])
+            return
+
+        buffer = bytearray(chunk_size)
+        with memoryview(buffer) as view:
+            while True:
+                received = self._raw.readinto(view)
+                if not received:
+                    break
+                yield bytes(view[:received])
+        self._raw.close()
+
+    def close(self):
+        if self._raw is not None:
+            self._raw.close()
+        elif isinstance(self._body, mmap.mmap):
+            # A disk cache body, mapped from its file instead of read.
+            self._body.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     @property
     def charset(self):
         if self._charset == '':
             if 'Content-Type' in self._headers.keys():
-                f = re.search(re_charset, self._headers['Content-Type'])
+                f = re_charset.search(self._headers['Content-Type'])
                 self._charset = f.group('charset') \
                     if f is not None \
                     else 'utf-8'
         return self._charset
 
+    @property
+    def content_encoding(self):
+        return self._headers.get('Content-Encoding', '')
+
     @property
     def code(self):
         return self._code
@@ -101,4 +229,8 @@ class Response:
 
     @property
     def raw_response(self):
+        if self._raw_response is None:
+            body = self._read_body() if self._head is not None else b''
+            self._raw_response = (self._head or b'').decode(DECODING) + \
+                '\r\n\r\n' + bytes(body).decode(DECODING)
         return self._raw_response
@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+
+from http_client.cache import parse_date
+from http_client.exceptions import CertificateVerifyException, \
+    ConnectException, ConnectTimeoutException, TLSTimeoutException, \
+    WriteTimeoutException, ReadTimeoutException
+from http_client.request import Request
+from http_client.response import Response
+
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_EXCEPTIONS = (ConnectException, ConnectTimeoutException,
+                    TLSTimeoutException, WriteTimeoutException,
+                    ReadTimeoutException)
+# Retrying can't fix these: the same certificate comes back.
+NEVER_RETRY_EXCEPTIONS = (CertificateVerifyException,)
+# Failures that happen before any byte of the request is sent, so even
+# non-idempotent requests can be repeated.
+NOT_SENT_EXCEPTIONS = (ConnectTimeoutException, TLSTimeoutException)
+
+
+class RetryBudget:
+    def __init__(self, ratio: float = 0.2,
+                 reserve: float = 10,
+                 capacity: float = 100):
+        # Every request earns `ratio` of a retry and every retry spends
+        # one, so retries stay a fixed share of traffic when a backend
+        # degrades. The reserve lets a quiet client still retry.
+        self._ratio = ratio
+        self._capacity = max(capacity, reserve)
+        self._tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self._capacity, self._tokens + self._ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+
+class RetryPolicy:
+    def __init__(self, total: int = 3,
+                 backoff: float = 0.1,
+                 max_backoff: float = 10.0,
+                 statuses=RETRY_STATUSES,
+                 exceptions=RETRY_EXCEPTIONS,
+                 max_retry_after: float = 60.0,
+                 budget: RetryBudget = None,
+                 sleep=time.sleep,
+                 uniform=random.uniform):
+        self._total = total
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._statuses = tuple(statuses)
+        self._exceptions = tuple(exceptions)
+        self._max_retry_after = max_retry_after
+        self._budget = budget if budget is not None else RetryBudget()
+        self._sleep = sleep
+        self._uniform = uniform
+        self._retries = 0
+        self._exhausted = 0
+        self._lock = threading.Lock()
+
+    def call(self, request: Request, send) -> Response:
+        self._budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                response = send(request)
+            except self._exceptions as e:
+                if isinstance(e, NEVER_RETRY_EXCEPTIONS):
+                    raise
+                delay = self.delay(attempt)
+                if not self._can_retry(request, attempt, delay,
+                                       isinstance(e, NOT_SENT_EXCEPTIONS)):
+                    raise
+            else:
+                if response.code not in self._statuses:
+                    return response
+                delay = self.delay(attempt, response)
+                if delay is None or \
+                        not self._can_retry(request, attempt, delay, False):
+                    return response
+                # Reading the short error body lets the connection be
+                # reused for the next attempt.
+                response.read()
+
+            self._sleep(delay)
+            attempt += 1
+
+    def delay(self, attempt: int, response: Response = None):
+        if response is not None and 'Retry-After' in response.headers:
+            delay = self.retry_after(response.headers['Retry-After'])
+            if delay is not None:
+                return delay if delay <= self._max_retry_after else None
+        # Exponential backoff with full jitter.
+        return self._uniform(0, min(self._max_backoff,
+                                    self._backoff * 2 ** attempt))
+
+    @staticmethod
+    def retry_after(value: str):
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        date = parse_date(value)
+        if date is None:
+            return None
+        return max(0.0, date - time.time())
+
+    def _can_retry(self, request: Request, attempt: int, delay: float,
+                   not_sent: bool):
+        if attempt >= self._total or not request.body.replayable:
+            return False
+        if not request.idempotent and not not_sent:
+            return False
+        if request.deadline is not None and \
+                request.deadline.remaining() <= delay:
+            return False
+        if not self._budget.withdraw():
+            with self._lock:
+                self._exhausted += 1
+            return False
+        with self._lock:
+            self._retries += 1
+        return True
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @property
+    def total(self):
+        return self._total
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {'retries': self._retries,
+                    'budget_exhausted': self._exhausted,
+                    'budget_tokens': self._budget.tokens}
@@ -0,0 +1,60 @@
+import time
+
+from http_client.exceptions import DeadlineExceededException
+
+
+class Timeouts:
+    def __init__(self, connect: float = None,
+                 tls: float = None,
+                 write: float = None,
+                 read: float = None,
+                 pool: float = None,
+                 total: float = None):
+        self._connect = connect
+        self._tls = tls
+        self._write = write
+        self._read = read
+        self._pool = pool
+        self._total = total
+
+    @property
+    def connect(self):
+        return self._connect
+
+    @property
+    def tls(self):
+        return self._tls
+
+    @property
+    def write(self):
+        return self._write
+
+    @property
+    def read(self):
+        return self._read
+
+    @property
+    def pool(self):
+        return self._pool
+
+    @property
+    def total(self):
+        return self._total
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self._expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return self._expires - time.monotonic()
+
+    def clamp(self, timeout: float = None):
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededException()
+        return remaining if timeout is None else min(timeout, remaining)
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
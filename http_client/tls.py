@@ -0,0 +1,112 @@
+import ssl
+import threading
+import time
+from collections import OrderedDict
+
+TLS_VERSIONS = {'1.2': ssl.TLSVersion.TLSv1_2,
+                '1.3': ssl.TLSVersion.TLSv1_3}
+
+
+def create_ssl_context(ca_file: str = None,
+                       ca_path: str = None,
+                       cert_file: str = None,
+                       key_file: str = None,
+                       alpn: list = None,
+                       minimum_version: str = '1.2',
+                       verify: bool = True) -> ssl.SSLContext:
+    context = ssl.create_default_context(cafile=ca_file, capath=ca_path)
+    context.minimum_version = TLS_VERSIONS[minimum_version]
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if cert_file:
+        context.load_cert_chain(cert_file, key_file)
+    if alpn:
+        context.set_alpn_protocols(alpn)
+    return context
+
+
+class Handshake:
+    def __init__(self, sock: ssl.SSLSocket, duration: float, cpu: float):
+        self._duration = duration
+        self._cpu = cpu
+        self._resumed = sock.session_reused
+        self._version = sock.version()
+        self._alpn = sock.selected_alpn_protocol()
+
+    @classmethod
+    def perform(cls, sock: ssl.SSLSocket) -> 'Handshake':
+        started, started_cpu = time.perf_counter(), time.thread_time()
+        sock.do_handshake()
+        return cls(sock,
+                   time.perf_counter() - started,
+                   time.thread_time() - started_cpu)
+
+    @property
+    def duration(self):
+        return self._duration
+
+    @property
+    def cpu(self):
+        return self._cpu
+
+    @property
+    def resumed(self):
+        return self._resumed
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def alpn(self):
+        return self._alpn
+
+
+class SessionCache:
+    def __init__(self, max_size: int = 256):
+        self._max_size = max_size
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+            return session
+
+    def put(self, key: tuple, session: ssl.SSLSession):
+        if session is None:
+            return
+        with self._lock:
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self._max_size:
+                self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class TLSMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handshakes = 0
+        self._resumed = 0
+        self._duration = 0.0
+        self._cpu = 0.0
+
+    def record(self, handshake: Handshake):
+        with self._lock:
+            self._handshakes += 1
+            self._resumed += handshake.resumed
+            self._duration += handshake.duration
+            self._cpu += handshake.cpu
+
+    def snapshot(self):
+        with self._lock:
+            return {'handshakes': self._handshakes,
+                    'resumed': self._resumed,
+                    'handshake_seconds': self._duration,
+                    'handshake_cpu_seconds': self._cpu}
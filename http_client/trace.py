@@ -0,0 +1,83 @@
+import time
+
+from http_client.exceptions import HTTPSClientException
+
+EVENTS = ('on_dns_start', 'on_dns_end', 'on_connect', 'on_tls',
+          'on_request_sent', 'on_first_byte', 'on_response_done',
+          'on_redirect', 'on_pool_reuse')
+PHASES = ('dns', 'connect', 'tls', 'sent', 'first_byte', 'total')
+
+
+class Hooks:
+    def __init__(self, **handlers):
+        self._handlers = {}
+        for event, handler in handlers.items():
+            self.add(event, handler)
+
+    def add(self, event: str, handler):
+        if event not in EVENTS:
+            raise HTTPSClientException(f'unknown hook {event}')
+        self._handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event: str, request, **data):
+        for handler in self._handlers.get(event, ()):
+            handler(request, **data)
+
+
+class Timings:
+    def __init__(self):
+        self._started = time.perf_counter()
+        # phase -> seconds since the start, like curl's time_* values
+        self._marks = {}
+        self._sent = 0
+        self._received = 0
+        self._redirects = 0
+        self._redirect_time = 0.0
+
+    def mark(self, phase: str):
+        self._marks[phase] = time.perf_counter() - self._started
+        return self._marks[phase]
+
+    def add_sent(self, size: int):
+        self._sent += size
+
+    def add_received(self, size: int):
+        self._received += size
+
+    def add_redirect(self, seconds: float):
+        self._redirects += 1
+        self._redirect_time += seconds
+
+    def get(self, phase: str):
+        return self._marks.get(phase)
+
+    def as_dict(self):
+        timings = {phase: self._marks.get(phase) for phase in PHASES}
+        timings.update(redirect=self._redirect_time,
+                       redirects=self._redirects,
+                       bytes_sent=self._sent,
+                       bytes_received=self._received)
+        return timings
+
+    @property
+    def total(self):
+        return self._marks.get('total')
+
+    @property
+    def bytes_sent(self):
+        return self._sent
+
+    @property
+    def bytes_received(self):
+        return self._received
+
+    @property
+    def redirects(self):
+        return self._redirects
+
+    @property
+    def redirect_time(self):
+        return self._redirect_time
+
+    def __repr__(self):
+        return f'Timings({self.as_dict()!r})'
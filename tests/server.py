@@ -0,0 +1,364 @@
+import os
+import selectors
+import socket
+import ssl
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from http_client import http2
+from http_client.hpack import Encoder, Decoder
+from http_client.request import Request
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def use_high_descriptors(test, count: int = 1100):
+    # Fills the descriptor table so that sockets opened afterwards get
+    # numbers above 1023, which select.select() can't watch.
+    if resource is None:
+        test.skipTest('no resource module')
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = count + 256
+    if hard != resource.RLIM_INFINITY and hard < wanted:
+        test.skipTest('descriptor limit too low')
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+        test.addCleanup(resource.setrlimit, resource.RLIMIT_NOFILE,
+                        (soft, hard))
+    descriptors = [os.open(os.devnull, os.O_RDONLY) for _ in range(count)]
+    test.addCleanup(lambda: [os.close(i) for i in descriptors])
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch()
+
+    do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = do_GET
+
+    def dispatch(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            body = self.read_chunked()
+        else:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else b''
+        with self.server.lock:
+            self.server.requests.append(
+                (self.command, self.path, self.headers, body))
+
+        route = self.server.routes.get(self.path.split('?')[0])
+        if route is None:
+            status, headers, payload = 404, {}, b'not found'
+        else:
+            status, headers, payload = route(self, body) \
+                if callable(route) else route
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        if isinstance(payload, list):
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            if self.command != 'HEAD':
+                for chunk in payload:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                self.wfile.write(b'0\r\n\r\n')
+        else:
+            if 'Content-Length' not in headers:
+                self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(payload)
+
+        if headers.get('Connection') == 'close':
+            self.close_connection = True
+
+    def read_chunked(self):
+        body = bytearray()
+        while True:
+            size = int(self.rfile.readline().split(b';')[0], 16)
+            if not size:
+                break
+            body += self.rfile.read(size)
+            self.rfile.readline()
+        while self.rfile.readline() not in (b'\r\n', b''):
+            pass
+        return bytes(body)
+
+
+RESOURCES = Path(__file__).parent / 'resources'
+CERT_FILE = str(RESOURCES / 'cert.pem')
+KEY_FILE = str(RESOURCES / 'key.pem')
+
+
+class LocalServer:
+    def __init__(self, routes: dict = None, tls: bool = False):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._tls = tls
+        if tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(CERT_FILE, KEY_FILE)
+            self._server.socket = context.wrap_socket(
+                self._server.socket, server_side=True)
+        self._server.daemon_threads = True
+        self._server.routes = routes or {}
+        self._server.requests = []
+        self._server.connections = 0
+        self._server.lock = threading.Lock()
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def url(self, path: str = '/'):
+        host, port = self._server.server_address
+        scheme = 'https' if self._tls else 'http'
+        return f'{scheme}://{host}:{port}{path}'
+
+    @property
+    def routes(self):
+        return self._server.routes
+
+    @property
+    def requests(self):
+        return self._server.requests
+
+    @property
+    def connections(self):
+        return self._server.connections
+
+
+def request(url: str, method: str = 'GET', data: str = '', **kwargs):
+    kwargs.setdefault('timeout', 5)
+    return Request(url=url, method=method, protocol='HTTP/1.1', data=data,
+                   **kwargs)
+
+
+def get(url: str, **kwargs):
+    return request(url, **kwargs)
+
+
+class H2Server:
+    # A small HTTP/2 server over TLS for the client tests. A route is
+    # (status, headers, body) or handler(headers, body) returning one;
+    # handlers run in their own threads so streams really overlap.
+    def __init__(self, routes: dict = None, max_streams: int = 100):
+        self._context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self._context.load_cert_chain(CERT_FILE, KEY_FILE)
+        self._context.set_alpn_protocols(['h2'])
+        self._sock = socket.create_server(('127.0.0.1', 0))
+        self._max_streams = max_streams
+        self.routes = routes or {}
+        self.requests = []
+        self.connections = 0
+        self.closed = 0
+        self.max_active = 0
+        self._active = 0
+        self._outgoing = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._closed = True
+        self._sock.close()
+
+    def url(self, path: str = '/'):
+        host, port = self._sock.getsockname()
+        return f'https://{host}:{port}{path}'
+
+    def goaway(self):
+        # Asks the client to move on; streams already open still finish.
+        frame = http2.frame_header(http2.GOAWAY, 0, 0, 8) + \
+            http2.UINT32.pack(http2.MAX_WINDOW) + \
+            http2.UINT32.pack(http2.NO_ERROR)
+        with self._lock:
+            for outgoing in self._outgoing:
+                outgoing.append(lambda encoder, flow: frame)
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                sock, _ = self._sock.accept()
+                sock = self._context.wrap_socket(sock, server_side=True)
+            except OSError:
+                continue
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(sock,),
+                             daemon=True).start()
+
+    def _serve(self, sock):
+        outgoing = deque()
+        with self._lock:
+            self._outgoing.append(outgoing)
+        decoder, encoder = Decoder(), Encoder()
+        streams = {}
+        # The client's windows and the response bodies waiting on them.
+        flow = {'connection': http2.DEFAULT_WINDOW,
+                'initial': http2.DEFAULT_WINDOW,
+                'windows': {}, 'pending': {}}
+        buffer = bytearray()
+        selector = selectors.DefaultSelector()
+        try:
+            selector.register(sock, selectors.EVENT_READ)
+            while len(buffer) < len(http2.PREFACE):
+                buffer += sock.recv(65536)
+            del buffer[:len(http2.PREFACE)]
+            sock.sendall(http2.settings_frame(
+                {http2.MAX_CONCURRENT_STREAMS: self._max_streams}))
+            while not self._closed:
+                while outgoing:
+                    sock.sendall(outgoing.popleft()(encoder, flow))
+                self._send_data(sock, flow)
+                if not sock.pending() and not selector.select(0.01):
+                    continue
+                data = sock.recv(65536)
+                if not data:
+                    return
+                buffer += data
+                while len(buffer) >= 9:
+                    high, low, kind, flags, stream_id = \
+                        http2.FRAME_HEADER.unpack_from(buffer)
+                    end = 9 + (high << 16 | low)
+                    if len(buffer) < end:
+                        break
+                    payload = bytes(buffer[9:end])
+                    del buffer[:end]
+                    self._on_frame(sock, kind, flags, stream_id, payload,
+                                   decoder, streams, outgoing, flow)
+        except OSError:
+            pass
+        finally:
+            selector.close()
+            sock.close()
+            with self._lock:
+                self.closed += 1
+
+    def _on_frame(self, sock, kind, flags, stream_id, payload, decoder,
+                  streams, outgoing, flow):
+        if kind == http2.SETTINGS and not flags & http2.ACK:
+            for offset in range(0, len(payload), 6):
+                key, value = http2.SETTING.unpack_from(payload, offset)
+                if key == http2.INITIAL_WINDOW_SIZE:
+                    for i in flow['windows']:
+                        flow['windows'][i] += value - flow['initial']
+                    flow['initial'] = value
+            sock.sendall(http2.frame_header(http2.SETTINGS, http2.ACK, 0, 0))
+        elif kind == http2.WINDOW_UPDATE:
+            increment = http2.UINT32.unpack(payload)[0]
+            if not stream_id:
+                flow['connection'] += increment
+            elif stream_id in flow['windows']:
+                flow['windows'][stream_id] += increment
+        elif kind == http2.RST_STREAM:
+            flow['pending'].pop(stream_id, None)
+            flow['windows'].pop(stream_id, None)
+        elif kind == http2.PING and not flags & http2.ACK:
+            sock.sendall(http2.frame_header(http2.PING, http2.ACK, 0, 8) +
+                         payload)
+        elif kind in (http2.HEADERS, http2.CONTINUATION):
+            stream = streams.setdefault(stream_id, [bytearray(), None,
+                                                    bytearray()])
+            flow['windows'].setdefault(stream_id, flow['initial'])
+            stream[0] += payload
+            if flags & http2.END_HEADERS:
+                stream[1] = decoder.decode(stream[0])
+            if flags & http2.END_STREAM:
+                self._dispatch(stream_id, streams.pop(stream_id), outgoing)
+        elif kind == http2.DATA:
+            stream = streams[stream_id]
+            stream[2] += payload
+            if payload:
+                # Hand the window straight back so uploads keep flowing.
+                increment = http2.UINT32.pack(len(payload))
+                sock.sendall(
+                    http2.frame_header(http2.WINDOW_UPDATE, 0, 0, 4) +
+                    increment +
+                    http2.frame_header(http2.WINDOW_UPDATE, 0, stream_id, 4) +
+                    increment)
+            if flags & http2.END_STREAM:
+                self._dispatch(stream_id, streams.pop(stream_id), outgoing)
+
+    def _dispatch(self, stream_id, stream, outgoing):
+        headers = dict(stream[1])
+        body = bytes(stream[2])
+        with self._lock:
+            self.requests.append((headers, body))
+
+        def respond():
+            with self._lock:
+                self._active += 1
+                self.max_active = max(self.max_active, self._active)
+            route = self.routes.get(headers[':path'].split('?')[0])
+            if route is None:
+                status, fields, payload = 404, {}, b'not found'
+            else:
+                status, fields, payload = route(headers, body) \
+                    if callable(route) else route
+            with self._lock:
+                self._active -= 1
+            outgoing.append(lambda encoder, flow: self._response(
+                encoder, flow, stream_id, status, fields, payload,
+                headers[':method'] == 'HEAD'))
+
+        threading.Thread(target=respond, daemon=True).start()
+
+    @staticmethod
+    def _response(encoder, flow, stream_id, status, fields, payload, head):
+        block = encoder.encode(
+            [(':status', str(status))] +
+            [(name.lower(), value) for name, value in fields.items()] +
+            [('content-length', str(len(payload)))])
+        end = http2.END_STREAM if head or not payload else 0
+        if end:
+            flow['windows'].pop(stream_id, None)
+        elif stream_id in flow['windows']:
+            # The body goes out as the client's windows allow.
+            flow['pending'][stream_id] = memoryview(payload)
+        return http2.frame_header(http2.HEADERS, http2.END_HEADERS | end,
+                                  stream_id, len(block)) + block
+
+    @staticmethod
+    def _send_data(sock, flow):
+        windows, pending = flow['windows'], flow['pending']
+        for stream_id, body in list(pending.items()):
+            while body and min(flow['connection'], windows[stream_id]) > 0:
+                size = min(len(body), http2.DEFAULT_FRAME_SIZE,
+                           flow['connection'], windows[stream_id])
+                last = size == len(body)
+                sock.sendall(http2.frame_header(
+                    http2.DATA, http2.END_STREAM if last else 0, stream_id,
+                    size) + body[:size])
+                body = body[size:]
+                flow['connection'] -= size
+                windows[stream_id] -= size
+            if body:
+                pending[stream_id] = body
+            else:
+                del pending[stream_id], windows[stream_id]
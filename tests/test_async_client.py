@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from http_client.async_client import AsyncClient, AsyncConnectionPool
+from http_client.exceptions import ConnectException
+from tests.server import LocalServer, get
+
+
+class TestAsyncClient(unittest.TestCase):
+    def test_concurrent_requests_share_connections(self):
+        routes = {'/hello': (200, {}, b'Hello'),
+                  '/chunked': (200, {}, [b'Hel', b'lo'])}
+
+        async def run(server):
+            async with AsyncClient(10) as client:
+                responses = await asyncio.gather(
+                    *(client.do_request(get(server.url(path)))
+                      for path in ['/hello', '/chunked'] * 20))
+                return responses, client.pool.idle_count
+
+        with LocalServer(routes) as server:
+            responses, idle = asyncio.run(run(server))
+            assert all('Hello' == i.message for i in responses)
+            assert server.connections <= 8
+            assert server.connections == idle
+
+    def test_redirects(self):
+        routes = {'/new': (200, {}, b'moved')}
+
+        async def run(client, url):
+            async with client:
+                return await client.do_request(get(url))
+
+        with LocalServer(routes) as server:
+            routes['/old'] = (301, {'Location': '/new'}, b'')
+            response = asyncio.run(run(AsyncClient(10), server.url('/old')))
+            assert 'moved' == response.message
+            assert server.url('/new') == str(response.request.url)
+
+            self.assertRaises(ConnectException, asyncio.run,
+                              run(AsyncClient(0), server.url('/old')))
+
+    def test_evicts_least_recently_used(self):
+        async def run(old, new):
+            pool = AsyncConnectionPool(max_idle=1)
+            async with AsyncClient(10, pool=pool) as client:
+                for url in (old, new, new, old):
+                    await client.do_request(get(url))
+
+        routes = {'/': (200, {}, b'ok')}
+        with LocalServer(routes) as old, LocalServer(routes) as new:
+            asyncio.run(run(old.url('/'), new.url('/')))
+            # The idle connection to `new` was the one kept.
+            assert 1 == new.connections
+            assert 2 == old.connections
+
+    def test_cookie_not_sent_to_other_host(self):
+        async def run(url):
+            async with AsyncClient(10) as client:
+                return await client.do_request(get(url, cookie='secret=1'))
+
+        with LocalServer({'/': (200, {}, b'other')}) as other:
+            # Another host name for the same machine.
+            location = other.url('/').replace('127.0.0.1', 'localhost')
+            routes = {'/': (302, {'Location': location}, b'')}
+            with LocalServer(routes) as server:
+                assert 'other' == asyncio.run(run(server.url('/'))).text
+                assert 'secret=1' == server.requests[-1][2]['Cookie']
+                assert other.requests[-1][2]['Cookie'] is None
+
+    def test_max_in_flight_per_host(self):
+        in_flight = []
+        lock = threading.Lock()
+
+        def slow(handler, body):
+            with lock:
+                in_flight.append(1)
+                peak = len(in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight.pop()
+            return 200, {}, str(peak).encode()
+
+        async def run(server):
+            pool = AsyncConnectionPool(max_per_host=2)
+            async with AsyncClient(10, pool=pool) as client:
+                return await asyncio.gather(
+                    *(client.do_request(get(server.url('/slow')))
+                      for _ in range(6)))
+
+        with LocalServer({'/slow': slow}) as server:
+            responses = asyncio.run(run(server))
+            assert max(int(i.message) for i in responses) <= 2
+            assert 2 == server.connections
+
+
+if __name__ == '__main__':
+    unittest.main()
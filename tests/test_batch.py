@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from http_client.client import Client
+from http_client.exceptions import ConnectException
+from tests.server import LocalServer, get
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBatch(unittest.TestCase):
+    def test_do_requests(self):
+        routes = {'/a': (200, {}, b'a'), '/b': (200, {}, b'bb')}
+        with LocalServer(routes) as server, Client(10) as client:
+            requests = [get(server.url(path))
+                        for path in ['/a', '/b'] * 50]
+            requests.append(get('http://127.0.0.1:1/'))
+            requests.append(get('not a url'))
+            results = list(client.do_requests(iter(requests),
+                                              concurrency=4))
+
+            assert len(requests) == len(results)
+            assert {id(i) for i in requests} == \
+                   {id(i) for i, _ in results}
+            for request, result in results:
+                if request.url.port in (1, None):
+                    assert isinstance(result, ConnectException)
+                else:
+                    assert routes[request.url.path][2].decode() == \
+                           result.message
+            assert server.connections <= 4
+
+    def test_bad_lines_do_not_stop_the_batch(self):
+        with LocalServer({'/': (200, {}, b'ok')}) as server:
+            lines = ['{"url": "%s"' % server.url('/'),
+                     '{"url": "%s", "method": "FETCH"}' % server.url('/'),
+                     '{"method": "GET"}',
+                     '{"url": "%s", "colour": "red"}' % server.url('/'),
+                     'not a url',
+                     server.url('/')]
+            result = subprocess.run(
+                [sys.executable, '-m', 'http_client', '-i', '-', '-j', '1'],
+                input='\n'.join(lines).encode(), cwd=ROOT,
+                capture_output=True, timeout=30)
+
+        records = [json.loads(i) for i in result.stdout.splitlines()]
+        assert 0 == result.returncode
+        assert [1, 2, 3, 4] == [i['line'] for i in records[:4]]
+        assert all('error' in i for i in records[:4])
+        # A line without a host fails when it is sent, on its own.
+        assert 'not%20a%20url' == records[4]['url']
+        assert 'error' in records[4]
+        assert 200 == records[5]['code']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+from http_client.bench import Bench, BenchResult
+from http_client.client import Client
+from http_client.exceptions import HTTPSClientException
+from tests.server import LocalServer, get
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBench(unittest.TestCase):
+    def test_fixed_count(self):
+        routes = {'/': (200, {}, b'x' * 100)}
+        with LocalServer(routes) as server, Client(10) as client:
+            result = Bench(client, get(server.url('/')), requests=50,
+                           concurrency=4).run()
+
+            assert 50 == len(server.requests)
+            # Keep-alive connections are reused across the whole run.
+            assert server.connections <= 4
+        stats = result.as_dict()
+        assert (50, {'200': 50}, {}) == \
+               (stats['requests'], stats['codes'], stats['errors'])
+        latency = stats['latency']
+        assert latency['min'] <= latency['p50'] <= latency['p99.9'] == \
+               latency['max']
+        assert stats['bytes_received'] > 50 * 100
+
+    def test_open_loop_rate(self):
+        routes = {'/': (200, {}, b'')}
+        with LocalServer(routes) as server, Client(10) as client:
+            started = time.perf_counter()
+            result = Bench(client, get(server.url('/')), duration=0.5,
+                           concurrency=4, rate=40).run()
+            elapsed = time.perf_counter() - started
+
+        # Requests are spread over the duration rather than sent in a
+        # burst.
+        assert 20 == result.requests
+        assert elapsed >= 0.45
+
+    def test_percentiles(self):
+        result = BenchResult([0.01, 0.5, 0.49, 0.48], {200: 4}, {},
+                             0, 0, 1.0, 1)
+        assert 0.5 == result.percentile(99.9)
+        assert 0.48 == result.percentile(50)
+        assert 0.01 == result.percentile(0)
+
+    def test_errors_by_type(self):
+        with LocalServer({}) as server:
+            url = server.url('/')
+        with Client(10) as client:
+            result = Bench(client, get(url), requests=3,
+                           concurrency=2).run()
+        assert {'ConnectException': 3} == result.errors
+        assert None is result.percentile(50)
+
+    def test_needs_limit(self):
+        self.assertRaises(HTTPSClientException, Bench, Client(10),
+                          get('http://localhost/'))
+
+    def test_cli_json(self):
+        routes = {'/': (200, {}, b'hello')}
+        with LocalServer(routes) as server:
+            result = subprocess.run(
+                [sys.executable, '-m', 'http_client', '--bench', '-n', '10',
+                 '-j', '2', '--json', server.url('/')],
+                cwd=ROOT, capture_output=True, timeout=30)
+
+        stats = json.loads(result.stdout)
+        assert (10, {'200': 10}) == (stats['requests'], stats['codes'])
+        assert {'p50', 'p90', 'p99', 'p99.9'} <= set(stats['latency'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+
+from http_client.async_client import AsyncClient
+from http_client.body import Body, FileBody, IterableBody
+from http_client.client import Client
+from http_client.exceptions import StreamedBodyRedirectException
+from http_client.tls import create_ssl_context
+from tests.server import LocalServer, CERT_FILE, request
+
+PAYLOAD = os.urandom(300000)
+
+
+def echo(handler, body):
+    return 200, {}, body
+
+
+class TestRequestBody(unittest.TestCase):
+    def setUp(self):
+        descriptor, self.path = tempfile.mkstemp()
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(PAYLOAD)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_body_types(self):
+        assert isinstance(Body.create(self.path), FileBody)
+        assert PAYLOAD.__len__() == Body.create(self.path).length
+        assert 5 == Body.create(b'\x00\xff\x00\xff\x00').length
+        assert isinstance(Body.create(iter([b'a'])), IterableBody)
+        with open(self.path, 'rb') as f:
+            f.seek(1000)
+            assert len(PAYLOAD) - 1000 == Body.create(f).length
+
+    def test_data_is_text(self):
+        assert 'abc' == request('http://localhost/', 'POST', b'abc').data
+        assert PAYLOAD.decode('ISO-8859-1') == \
+            request('http://localhost/', 'POST', self.path).data
+        streamed = request('http://localhost/', 'POST', iter([b'a']))
+        assert '' == streamed.data
+        assert isinstance(streamed.body, IterableBody)
+        with open(self.path, 'rb') as f:
+            assert '' == request('http://localhost/', 'POST', f).data
+
+    def test_uploads(self):
+        for tls in (False, True):
+            context = create_ssl_context(ca_file=CERT_FILE)
+            with LocalServer({'/echo': echo}, tls=tls) as server, \
+                    Client(10, ssl_context=context) as client:
+                url = server.url('/echo')
+                with open(self.path, 'rb') as f:
+                    f.seek(10)
+                    bodies = [(self.path, PAYLOAD),
+                              (f, PAYLOAD[10:]),
+                              (io.BytesIO(PAYLOAD), PAYLOAD),
+                              (PAYLOAD, PAYLOAD),
+                              ((PAYLOAD[i:i + 7000]
+                                for i in range(0, len(PAYLOAD), 7000)),
+                               PAYLOAD)]
+                    for data, expected in bodies:
+                        response = client.do_request(
+                            request(url, 'POST', data))
+                        assert expected == response.content
+                _, _, headers, _ = server.requests[-1]
+                assert 'chunked' == headers['Transfer-Encoding']
+                assert 1 == server.connections
+
+    def test_async_uploads(self):
+        async def run(url):
+            async with AsyncClient(10) as client:
+                first = await client.do_request(
+                    request(url, 'POST', self.path))
+                second = await client.do_request(
+                    request(url, 'POST', iter([PAYLOAD[:5], PAYLOAD[5:]])))
+                return first.content, second.content
+
+        with LocalServer({'/echo': echo}) as server:
+            assert (PAYLOAD, PAYLOAD) == asyncio.run(run(server.url('/echo')))
+
+    def test_streamed_body_is_not_redirected(self):
+        routes = {'/old': (307, {'Location': '/echo'}, b''), '/echo': echo}
+        with LocalServer(routes) as server, Client(10) as client:
+            self.assertRaises(StreamedBodyRedirectException,
+                              client.do_request,
+                              request(server.url('/old'), 'POST',
+                                      iter([b'data'])))
+            assert PAYLOAD == client.do_request(
+                request(server.url('/old'), 'POST', PAYLOAD)).content
+            assert ['/old', '/old', '/echo'] == \
+                   [i[1] for i in server.requests]
+
+
+if __name__ == '__main__':
+    unittest.main()
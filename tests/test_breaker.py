@@ -0,0 +1,128 @@
+import unittest
+
+from http_client.breaker import HostGuard, CircuitBreaker, \
+    AdaptiveLimiter, CLOSED, OPEN, HALF_OPEN
+from http_client.client import Client
+from http_client.exceptions import CircuitOpenException, \
+    ConcurrencyLimitException
+from tests.server import LocalServer, get
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBreaker(unittest.TestCase):
+    def test_opens_and_recovers(self):
+        clock = Clock()
+        guard = HostGuard(
+            breaker=lambda origin: CircuitBreaker(
+                origin, min_calls=4, open_time=5, clock=clock),
+            limiter=None)
+        status = [500]
+        routes = {'/': lambda handler, body: (status[0], {}, b'')}
+        with LocalServer(routes) as server, \
+                Client(10, guard=guard) as client:
+            origin = server.url('/')[:-1]
+            for _ in range(4):
+                assert 500 == client.do_request(get(server.url('/'))).code
+            assert OPEN == guard.breaker(origin).state
+
+            with self.assertRaises(CircuitOpenException):
+                client.do_request(get(server.url('/')))
+            assert 4 == len(server.requests)
+
+            clock.now += 5
+            assert HALF_OPEN == guard.breaker(origin).state
+            status[0] = 200
+            assert 200 == client.do_request(get(server.url('/'))).code
+            assert CLOSED == guard.breaker(origin).state
+            assert 1 == guard.stats[origin]['rejected']
+
+    def test_failed_probe_reopens(self):
+        clock = Clock()
+        breaker = CircuitBreaker('o', min_calls=2, open_time=1, clock=clock)
+        breaker.record(False, 0.1)
+        breaker.record(False, 0.1)
+        clock.now += 1
+        probe = breaker.before_call()
+        # Only one probe may run while half-open.
+        self.assertRaises(CircuitOpenException, breaker.before_call)
+        breaker.record(False, 0.1, probe)
+        assert OPEN == breaker.state
+
+    def test_only_probes_settle_half_open(self):
+        clock = Clock()
+        breaker = CircuitBreaker('o', min_calls=2, open_time=1, clock=clock)
+        # Admitted while closed, finishing after the circuit opened.
+        late = breaker.before_call()
+        breaker.record(False, 0.1)
+        breaker.record(False, 0.1)
+        clock.now += 1
+        probe = breaker.before_call()
+        breaker.record(False, 0.1, late)
+        assert HALF_OPEN == breaker.state
+        self.assertRaises(CircuitOpenException, breaker.before_call)
+        breaker.record(True, 0.1, probe)
+        assert CLOSED == breaker.state
+
+    def test_slow_calls_open(self):
+        clock = Clock()
+        breaker = CircuitBreaker('o', min_calls=3, slow_call=1,
+                                 slow_rate=0.6, clock=clock)
+        for latency in (2, 0.1, 2):
+            breaker.record(True, latency)
+        assert OPEN == breaker.state
+
+    def test_window_forgets_old_calls(self):
+        clock = Clock()
+        breaker = CircuitBreaker('o', min_calls=4, window=10, clock=clock)
+        for _ in range(3):
+            breaker.record(False, 0.1)
+        clock.now += 11
+        breaker.record(False, 0.1)
+        assert CLOSED == breaker.state
+        assert 1 == breaker.stats['calls']
+
+    def test_stream_holds_slot_until_read(self):
+        guard = HostGuard(breaker=None)
+        routes = {'/': (200, {}, b'body')}
+        with LocalServer(routes) as server, \
+                Client(10, guard=guard) as client:
+            origin = server.url('/')[:-1]
+            response = client.do_request(get(server.url('/')), stream=True)
+            assert 1 == guard.limiter(origin).in_flight
+            assert b'body' == response.read()
+            assert 0 == guard.limiter(origin).in_flight
+
+    def test_limiter_aimd(self):
+        limiter = AdaptiveLimiter('o', initial=4, maximum=10)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(True, 0.01)
+        grown = limiter.limit
+        assert grown > 4
+
+        limiter.acquire()
+        limiter.release(True, 0.5)
+        assert limiter.limit < grown
+        limiter.acquire()
+        limiter.release(False, 0.01)
+        assert limiter.limit < grown
+
+    def test_limiter_rejects_over_limit(self):
+        limiter = AdaptiveLimiter('o', initial=2)
+        limiter.acquire()
+        limiter.acquire()
+        self.assertRaises(ConcurrencyLimitException, limiter.acquire, 0.05)
+        limiter.release(True, 0.01)
+        limiter.acquire(0.05)
+        assert 2 == limiter.in_flight
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+
+from http_client.cache import HTTPCache, MemoryCacheBackend, CacheEntry
+from http_client.client import Client
+from http_client.headers import Headers
+from tests.server import LocalServer, get, request
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def etag_route(handler, body):
+    if handler.headers.get('If-None-Match') == '"v1"':
+        return 304, {'ETag': '"v1"', 'Cache-Control': 'max-age=10'}, b''
+    return 200, {'ETag': '"v1"', 'Cache-Control': 'max-age=10'}, b'payload'
+
+
+def vary_route(handler, body):
+    language = handler.headers.get('Accept-Language', 'none')
+    return (200, {'Vary': 'Accept-Language', 'Cache-Control': 'max-age=60'},
+            language.encode())
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        self.cache = HTTPCache(clock=self.clock)
+
+    def test_fresh_hit(self):
+        routes = {'/': (200, {'Cache-Control': 'max-age=60'}, b'hello')}
+        with LocalServer(routes) as server, \
+                Client(10, cache=self.cache) as client:
+            first = client.do_request(get(server.url('/')))
+            self.clock.now += 30
+            second = client.do_request(get(server.url('/')))
+
+            assert 1 == len(server.requests)
+            assert b'hello' == first.content == second.content
+            assert '30' == second.headers['Age']
+            assert 1 == self.cache.stats['hits']
+            assert 1 == self.cache.stats['misses']
+
+    def test_revalidation(self):
+        with LocalServer({'/': etag_route}) as server, \
+                Client(10, cache=self.cache) as client:
+            client.do_request(get(server.url('/')))
+            self.clock.now += 11
+            response = client.do_request(get(server.url('/')))
+            self.clock.now += 5
+            client.do_request(get(server.url('/')))
+
+            assert 200 == response.code
+            assert b'payload' == response.content
+            assert 2 == len(server.requests)
+            assert '"v1"' == server.requests[1][2]['If-None-Match']
+            assert {'hits': 1, 'misses': 1, 'revalidations': 1,
+                    'stores': 1} == {k: v for k, v in self.cache.stats.items()
+                                     if k != 'hit_ratio'}
+
+    def test_no_store_and_unsafe_methods(self):
+        routes = {'/private': (200, {'Cache-Control': 'no-store'}, b'x'),
+                  '/': (200, {'Cache-Control': 'max-age=60'}, b'y')}
+        with LocalServer(routes) as server, \
+                Client(10, cache=self.cache) as client:
+            client.do_request(get(server.url('/private')))
+            client.do_request(get(server.url('/private')))
+            client.do_request(get(server.url('/')))
+            client.do_request(request(server.url('/'), 'POST'))
+            client.do_request(get(server.url('/')))
+
+            assert 5 == len(server.requests)
+            assert 0 == self.cache.stats['hits']
+
+    def test_vary(self):
+        with LocalServer({'/': vary_route}) as server, \
+                Client(10, cache=self.cache) as client:
+            for language in ('en', 'de', 'en', 'de'):
+                response = client.do_request(get(
+                    server.url('/'), headers=[f'Accept-Language: {language}']))
+                assert language.encode() == response.content
+
+            assert 2 == len(server.requests)
+            assert 2 == self.cache.stats['hits']
+
+    def test_expires_and_heuristic_freshness(self):
+        entry = CacheEntry(b'HTTP/1.1 200 OK', Headers({
+            'Date': 'Sun, 18 Oct 2026 08:00:00 GMT',
+            'Expires': 'Sun, 18 Oct 2026 08:05:00 GMT'}), b'', {}, 0, 0)
+        assert 300 == entry.freshness_lifetime()
+
+        entry = CacheEntry(b'HTTP/1.1 200 OK', Headers({
+            'Date': 'Sun, 18 Oct 2026 08:00:00 GMT',
+            'Last-Modified': 'Sun, 18 Oct 2026 07:00:00 GMT'}), b'', {}, 0, 0)
+        assert 360 == entry.freshness_lifetime()
+
+        entry = CacheEntry(b'HTTP/1.1 200 OK', Headers({
+            'Expires': '0', 'ETag': '"a"'}), b'', {}, 0, 0)
+        assert 0 == entry.freshness_lifetime()
+        assert {'If-None-Match': '"a"'} == entry.validators
+
+    def test_lru_eviction(self):
+        backend = MemoryCacheBackend(max_bytes=150)
+        entries = [CacheEntry(b'HTTP/1.1 200 OK', Headers(), b'x' * 30,
+                              {}, 0, 0) for _ in range(4)]
+        for i, entry in enumerate(entries[:3]):
+            backend.put(str(i), [entry])
+        backend.get('0')
+        backend.put('3', [entries[3]])
+
+        assert [] == backend.get('1')
+        assert [entries[0]] == backend.get('0')
+        assert 3 == len(backend)
+        assert 1 == backend.evictions
+        assert backend.size <= backend.max_bytes
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import tempfile
+import unittest
+
+from yarl import URL
+
+from http_client.cache import HTTPCache
+from http_client.client import Client
+from http_client.cookies import Cookie, CookieJar
+from http_client.response import Response
+from tests.server import LocalServer, get
+
+
+def set_cookies(url: str, *headers):
+    data = b'HTTP/1.1 200 OK\r\n' + b''.join(
+        b'Set-Cookie: %s\r\n' % i.encode() for i in headers) + b'\r\n'
+    return Response.from_bytes(data, get(url))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCookieJar(unittest.TestCase):
+    def test_domain_and_path(self):
+        jar = CookieJar()
+        jar.extract(set_cookies(
+            'http://www.example.com/shop/cart',
+            'host=1',
+            'site=2; Domain=example.com; Path=/',
+            'shop=3; Path=/shop',
+            'safe=4; Secure; Path=/',
+            'evil=5; Domain=other.com',
+            'tld=6; Domain=com'))
+
+        # host=1 gets the default path, /shop.
+        assert 'host=1; shop=3; site=2' == \
+               jar.header(URL('http://www.example.com/shop/list'))
+        assert 'site=2; safe=4' == \
+               jar.header(URL('https://www.example.com/'))
+        assert 'site=2' == jar.header(URL('http://api.example.com/shop'))
+        assert jar.header(URL('http://other.com/')) is None
+        assert 'site=2' == \
+               jar.header(URL('http://www.example.com/shopping'))
+        assert 4 == len(jar)
+
+    def test_domain_is_not_a_public_suffix_or_ip_parent(self):
+        jar = CookieJar()
+        jar.extract(set_cookies('http://www.example.co.uk/',
+                                'suffix=1; Domain=co.uk',
+                                'site=2; Domain=example.co.uk'))
+        jar.extract(set_cookies('http://127.0.0.1/',
+                                'parent=3; Domain=0.0.1',
+                                'same=4; Domain=127.0.0.1'))
+
+        assert 'site=2' == jar.header(URL('http://shop.example.co.uk/'))
+        assert jar.header(URL('http://other.co.uk/')) is None
+        assert 'same=4' == jar.header(URL('http://127.0.0.1/'))
+        assert 2 == len(jar)
+
+    def test_url_without_host(self):
+        jar = CookieJar()
+        jar.set_header('a=1', URL('/relative'))
+        assert 0 == len(jar)
+        assert jar.header(URL('not a url')) is None
+
+    def test_expiry(self):
+        clock = Clock()
+        jar = CookieJar(clock)
+        jar.extract(set_cookies('http://example.com/', 'a=1; Max-Age=10',
+                                'b=2; Expires=not a date',
+                                'c=3; Max-Age=100'))
+        assert 'a=1; b=2; c=3' == jar.header(URL('http://example.com/'))
+
+        clock.now += 50
+        assert 'b=2; c=3' == jar.header(URL('http://example.com/'))
+        # Expired cookies are dropped when their site is next looked at.
+        assert 2 == len(jar)
+
+        jar.extract(set_cookies('http://example.com/',
+                                'c=; Expires=Thu, 01 Jan 1970 00:00:00 GMT'))
+        assert 'b=2' == jar.header(URL('http://example.com/'))
+
+    def test_save_and_load(self):
+        jar = CookieJar()
+        jar.extract(set_cookies('https://www.example.com/',
+                                'a=1; Domain=example.com; HttpOnly',
+                                'b=2; Path=/x; Secure; Max-Age=3600'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cookies.txt')
+            jar.save(path)
+            with open(path) as f:
+                lines = f.read().splitlines()
+            loaded = CookieJar()
+            loaded.load(path)
+
+        assert '# Netscape HTTP Cookie File' == lines[0]
+        assert '#HttpOnly_.example.com\tTRUE\t/\tFALSE\t0\ta\t1' == lines[2]
+        assert lines[3].startswith('www.example.com\tFALSE\t/x\tTRUE\t')
+        assert [(i.key, i.value, i.secure, i.host_only, i.http_only)
+                for i in jar] == \
+               [(i.key, i.value, i.secure, i.host_only, i.http_only)
+                for i in loaded]
+
+    def test_replace_keeps_order(self):
+        jar = CookieJar()
+        jar.set(Cookie('a', '1', 'example.com'))
+        jar.set(Cookie('b', '2', 'example.com'))
+        jar.set(Cookie('a', '3', 'example.com'))
+        assert 'a=3; b=2' == jar.header(URL('http://example.com/'))
+
+
+class TestClientCookies(unittest.TestCase):
+    def test_session_across_redirects(self):
+        routes = {'/login': (302, {'Location': '/home',
+                                   'Set-Cookie': 'session=abc; Path=/'},
+                             b''),
+                  '/home': (200, {}, b'home')}
+        with LocalServer(routes) as server, \
+                Client(10, cookies=CookieJar()) as client:
+            response = client.do_request(get(server.url('/login'),
+                                              cookie='lang=en'))
+
+            assert 'home' == response.text
+            assert 'lang=en' == server.requests[0][2]['Cookie']
+            assert 'lang=en; session=abc' == server.requests[1][2]['Cookie']
+
+            client.do_request(get(server.url('/home')))
+            assert 'lang=en; session=abc' == server.requests[2][2]['Cookie']
+
+    def test_cookie_not_sent_to_other_host(self):
+        with LocalServer({'/': (200, {}, b'other')}) as other:
+            # Another host name for the same machine.
+            location = other.url('/').replace('127.0.0.1', 'localhost')
+            routes = {'/': (302, {'Location': location}, b'')}
+            with LocalServer(routes) as server:
+                for cookies in (CookieJar(), None):
+                    with Client(10, cookies=cookies) as client:
+                        response = client.do_request(
+                            get(server.url('/'), cookie='secret=1'))
+                    assert 'other' == response.text
+                    assert 'secret=1' == server.requests[-1][2]['Cookie']
+                    assert other.requests[-1][2]['Cookie'] is None
+
+    def test_cache_hit_does_not_set_cookies(self):
+        routes = {'/': (200, {'Cache-Control': 'max-age=60',
+                              'Set-Cookie': 'session=abc; Path=/'}, b'x'),
+                  '/logout': (200, {'Set-Cookie': 'session=; Max-Age=0'},
+                              b'')}
+        jar = CookieJar()
+        with LocalServer(routes) as server, \
+                Client(10, cache=HTTPCache(), cookies=jar) as client:
+            client.do_request(get(server.url('/')))
+            client.do_request(get(server.url('/logout')))
+            assert 'x' == client.do_request(get(server.url('/'))).text
+
+            assert 2 == len(server.requests)
+            assert jar.header(URL(server.url('/'))) is None
+
+
+if __name__ == '__main__':
+    unittest.main()
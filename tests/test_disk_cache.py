@@ -0,0 +1,112 @@
+import mmap
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from http_client.cache import HTTPCache, CacheEntry
+from http_client.client import Client
+from http_client.disk_cache import DiskCacheBackend
+from http_client.headers import Headers
+from tests.server import LocalServer, get
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def entry(body: bytes, **headers):
+    return CacheEntry(b'HTTP/1.1 200 OK', Headers(headers), body,
+                      {'accept': '*/*'}, 1.0, 2.0)
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        backend = DiskCacheBackend(self.path)
+        backend.put('GET /a', [entry(b'x' * 1000, ETag='"1"'),
+                               entry(b'')])
+
+        variants = DiskCacheBackend(self.path).get('GET /a')
+        assert 2 == len(variants)
+        # Bodies are mapped from their blob files, not read.
+        assert isinstance(variants[0].body, mmap.mmap)
+        assert b'x' * 1000 == variants[0].body[:]
+        assert '"1"' == variants[0].headers['etag']
+        assert {'accept': '*/*'} == variants[0].vary
+        assert (1.0, 2.0) == (variants[0].request_time,
+                              variants[0].response_time)
+        assert b'' == variants[1].body
+        assert [] == backend.get('GET /b')
+
+        backend.delete('GET /a')
+        assert [] == backend.get('GET /a')
+        assert [] == os.listdir(os.path.join(self.path, 'blobs'))
+
+    def test_eviction(self):
+        clock = iter(range(100)).__next__
+        backend = DiskCacheBackend(self.path, max_bytes=2500, clock=clock)
+        backend.put('a', [entry(b'a' * 1000)])
+        backend.put('b', [entry(b'b' * 1000)])
+        # Another process reading `a` makes `b` the least recently used.
+        DiskCacheBackend(self.path, clock=clock).get('a')
+        backend.put('c', [entry(b'c' * 1000)])
+
+        assert [] == backend.get('b')
+        assert backend.get('a') and backend.get('c')
+        assert 2 == len(backend)
+        assert backend.size <= backend.max_bytes
+
+    def test_journal(self):
+        first = DiskCacheBackend(self.path)
+        second = DiskCacheBackend(self.path)
+        for i in range(100):
+            first.put(str(i % 10), [entry(b'x' * i)])
+        second.delete('0')
+
+        # Each instance sees the other's changes, and the journal was
+        # compacted instead of growing a line per put.
+        assert 9 == len(first) == len(second)
+        assert first.size == second.size
+        with open(os.path.join(self.path, 'index.log')) as f:
+            assert len(f.readlines()) < 100
+        assert 9 == len(os.listdir(os.path.join(self.path, 'blobs')))
+
+    def test_shared_between_clients(self):
+        routes = {'/': (200, {'Cache-Control': 'max-age=60'}, b'cached')}
+        with LocalServer(routes) as server:
+            for _ in range(3):
+                cache = HTTPCache(DiskCacheBackend(self.path))
+                with Client(10, cache=cache) as client:
+                    with client.do_request(get(server.url('/'))) as response:
+                        assert b'cached' == response.content
+                    body = response.body
+
+            assert 1 == len(server.requests)
+            assert 1 == cache.stats['hits']
+            # The hit's mapping is released with the response.
+            assert body.closed
+
+    def test_cli(self):
+        routes = {'/': (200, {'ETag': '"v1"'}, b'file body')}
+        output = os.path.join(self.path, 'out.txt')
+        command = [sys.executable, '-m', 'http_client', '-O', output,
+                   '--cache-dir', os.path.join(self.path, 'cache')]
+        with LocalServer(routes) as server:
+            for _ in range(2):
+                subprocess.run(command + [server.url('/')], cwd=ROOT,
+                               check=True, timeout=30)
+                with open(output, 'rb') as f:
+                    assert b'file body' == f.read()
+
+            assert 2 == len(server.requests)
+            assert '"v1"' == server.requests[1][2]['If-None-Match']
+
+
+if __name__ == '__main__':
+    unittest.main()
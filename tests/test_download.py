@@ -0,0 +1,107 @@
+import os
+import re
+import tempfile
+import unittest
+
+from http_client.client import Client
+from http_client.download import SegmentedDownload
+from http_client.exceptions import HTTPSClientException, \
+    ResourceChangedException
+from http_client.pool import ConnectionPool
+from tests.server import LocalServer, get
+
+DATA = bytes(range(256)) * 1024
+
+
+def ranged(data: bytes = DATA, etag: str = '"v1"', fail: set = None):
+    def handler(handler, body):
+        headers = {'Accept-Ranges': 'bytes', 'ETag': etag}
+        match = re.match(r'bytes=(\d+)-(\d+)', handler.headers['Range'] or '')
+        if match is None or handler.headers['If-Range'] not in (None, etag):
+            return 200, headers, data
+        start, end = int(match.group(1)), int(match.group(2))
+        if fail and start in fail:
+            fail.remove(start)
+            return 500, {}, b'oops'
+        headers['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+        return 206, headers, data[start:end + 1]
+    return handler
+
+
+class TestSegmentedDownload(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'file')
+
+    def download(self, server, **kwargs):
+        with Client(10, pool=ConnectionPool()) as client:
+            return SegmentedDownload(client, get(server.url('/')),
+                                     self.path, min_size=1024,
+                                     **kwargs).run()
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def ranges(self, server):
+        return [i[2]['Range'] for i in server.requests if i[0] == 'GET']
+
+    def test_download_in_ranges(self):
+        with LocalServer({'/': ranged()}) as server:
+            assert len(DATA) == self.download(server, segments=4)
+
+            assert DATA == self.read()
+            assert 'HEAD' == server.requests[0][0]
+            assert ['bytes=0-65535', 'bytes=65536-131071',
+                    'bytes=131072-196607', 'bytes=196608-262143'] == \
+                   sorted(self.ranges(server),
+                          key=lambda i: int(i[6:].split('-')[0]))
+            assert not os.path.exists(self.path + '.progress')
+
+    def test_resume(self):
+        with LocalServer({'/': ranged(fail={65536})}) as server:
+            self.assertRaises(HTTPSClientException, self.download, server,
+                              segments=4)
+            assert os.path.exists(self.path + '.progress')
+
+            assert len(DATA) == self.download(server, segments=4)
+            assert DATA == self.read()
+            # Only the failed segment is fetched again.
+            assert ['bytes=65536-131071'] == self.ranges(server)[4:]
+
+    def test_changed_during_download(self):
+        changed = ranged(DATA[::-1], '"v2"')
+
+        def route(handler, body):
+            if handler.command == 'HEAD':
+                return ranged()(handler, body)
+            return changed(handler, body)
+
+        with LocalServer({'/': route}) as server:
+            self.assertRaises(ResourceChangedException, self.download,
+                              server, segments=4)
+            assert not os.path.exists(self.path + '.progress')
+
+    def test_changed_before_resume(self):
+        with LocalServer({'/': ranged(fail={0})}) as server:
+            self.assertRaises(HTTPSClientException, self.download, server,
+                              segments=4)
+            assert os.path.exists(self.path + '.progress')
+            sent = len(self.ranges(server))
+
+            # Same URL, new content: the saved progress is for another
+            # ETag, so the download starts over.
+            server.routes['/'] = ranged(DATA[::-1], '"v2"')
+            assert len(DATA) == self.download(server, segments=4)
+            assert DATA[::-1] == self.read()
+            assert 4 == len(self.ranges(server)[sent:])
+
+    def test_not_rangeable(self):
+        with LocalServer({'/': (200, {}, DATA)}) as server:
+            assert self.download(server) is None
+            assert not os.path.exists(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
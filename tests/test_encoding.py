@@ -0,0 +1,54 @@
+import gzip
+import unittest
+import zlib
+
+from http_client.client import Client
+from http_client.encoding import ContentDecoder, decode_content
+from http_client.request import Request
+from tests.server import LocalServer, get
+
+TEXT = b'{"answer": 42}' * 5000
+GZIPPED = gzip.compress(TEXT)
+
+
+class TestContentEncoding(unittest.TestCase):
+    def test_buffered_and_streamed(self):
+        routes = {'/gzip': (200, {'Content-Encoding': 'gzip'}, GZIPPED),
+                  '/chunked': (200, {'Content-Encoding': 'gzip'},
+                               [GZIPPED[:100], GZIPPED[100:]])}
+        with LocalServer(routes) as server, Client(10) as client:
+            for path in routes:
+                response = client.do_request(get(server.url(path),
+                                                 compress=True))
+                assert TEXT.decode() == response.message
+
+                response = client.do_request(
+                    get(server.url(path), compress=True), stream=True)
+                assert TEXT == b''.join(response.iter_content(1024))
+
+            response = client.do_request(
+                get(server.url('/gzip'), compress=True), stream=True)
+            assert GZIPPED == b''.join(
+                response.iter_content(decode_content=False))
+            assert 'gzip' in server.requests[0][2]['Accept-Encoding']
+
+    def test_deflate_variants(self):
+        raw = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        raw_deflate = raw.compress(TEXT) + raw.flush()
+        assert TEXT == decode_content(zlib.compress(TEXT), 'deflate')
+        assert TEXT == decode_content(raw_deflate, 'deflate')
+
+    def test_stacked_and_unknown_codings(self):
+        data = gzip.compress(zlib.compress(TEXT))
+        assert TEXT == decode_content(data, 'deflate, gzip')
+        assert data == decode_content(data, 'deflate, compress')
+        assert not ContentDecoder('identity').active
+
+    def test_header_can_be_overridden(self):
+        req = Request(url='http://localhost/', method='GET',
+                      headers=['Accept-Encoding: gzip'], compress=True)
+        assert 'gzip' == req.headers['Accept-Encoding']
+
+
+if __name__ == '__main__':
+    unittest.main()
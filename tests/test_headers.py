@@ -0,0 +1,49 @@
+import unittest
+
+from http_client.headers import Headers
+from http_client.response import Response
+
+
+class TestHeaders(unittest.TestCase):
+    def test_parse(self):
+        headers = Headers.parse(b'Set-Cookie: a=1; Path=/\r\n'
+                                b'content-type: text/html\r\n'
+                                b'Set-Cookie: b=2; Expires=Wed, 21 Oct '
+                                b'2015 07:28:00 GMT\r\n'
+                                b'X-Folded: first\r\n second\r\n'
+                                b'X-Odd: {"quoted": [1, 2]} @ 100%\r\n'
+                                b'garbage line\r\n')
+        assert ['a=1; Path=/',
+                'b=2; Expires=Wed, 21 Oct 2015 07:28:00 GMT'] == \
+               headers.getall('set-cookie')
+        assert 'text/html' == headers['Content-Type']
+        assert 'first second' == headers['x-folded']
+        assert '{"quoted": [1, 2]} @ 100%' == headers['X-Odd']
+        assert ['Set-Cookie', 'content-type', 'X-Folded', 'X-Odd'] == \
+               list(headers)
+        assert [] == headers.getall('Missing')
+
+    def test_mapping(self):
+        headers = Headers({'Accept': '*/*'})
+        headers.add('accept', 'text/html')
+        assert '*/*, text/html' == headers['ACCEPT']
+        assert 2 == len(headers.multi_items())
+        copy = headers.copy()
+        headers['Accept'] = 'none'
+        del headers['accept']
+        assert 'accept' not in headers
+        assert 2 == len(copy.getall('Accept'))
+        assert {'Accept': '*/*, text/html'} == copy
+
+    def test_response_keeps_duplicates(self):
+        response = Response.from_bytes(b'HTTP/1.1 302 Found\r\n'
+                                       b'Set-Cookie: a=1\r\n'
+                                       b'Set-Cookie: b=2\r\n'
+                                       b'location: /next\r\n\r\n', None)
+        assert ['a=1', 'b=2'] == response.headers.getall('Set-Cookie')
+        assert '/next' == response.location
+        assert 1.1 == response.protocol
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client.client import Client
+from http_client.exceptions import ResponseException
+from http_client.hpack import Encoder, Decoder, encode_integer, \
+    huffman_encode, huffman_decode
+from http_client.http2 import ALPN
+from http_client.tls import create_ssl_context
+from tests.server import H2Server, LocalServer, CERT_FILE, \
+    request, use_high_descriptors
+
+
+def h2_client(**kwargs):
+    return Client(10, http2=True,
+                  ssl_context=create_ssl_context(ca_file=CERT_FILE,
+                                                 alpn=ALPN),
+                  **kwargs)
+
+
+class TestHPACK(unittest.TestCase):
+    def test_integers(self):
+        # RFC 7541, C.1
+        assert b'\x0a' == encode_integer(10, 5)
+        assert b'\x1f\x9a\x0a' == encode_integer(1337, 5)
+
+    def test_huffman(self):
+        assert bytes.fromhex('f1e3c2e5f23a6ba0ab90f4ff') == \
+               huffman_encode(b'www.example.com')
+        assert b'no-cache' == huffman_decode(bytes.fromhex('a8eb10649cbf'))
+        # Padding must be shorter than a byte and all ones.
+        self.assertRaises(ResponseException, huffman_decode, b'\xff')
+
+    def test_requests_with_dynamic_table(self):
+        # RFC 7541, C.4: three requests on one connection.
+        encoder, decoder = Encoder(), Decoder()
+        first = [(':method', 'GET'), (':scheme', 'http'), (':path', '/'),
+                 (':authority', 'www.example.com')]
+        second = first + [('cache-control', 'no-cache')]
+        third = [(':method', 'GET'), (':scheme', 'https'),
+                 (':path', '/index.html'),
+                 (':authority', 'www.example.com'),
+                 ('custom-key', 'custom-value')]
+        blocks = ['828684418cf1e3c2e5f23a6ba0ab90f4ff',
+                  '828684be5886a8eb10649cbf',
+                  '828785bf408825a849e95ba97d7f8925a849e95bb8e8b4bf']
+        for headers, block in zip((first, second, third), blocks):
+            assert block == encoder.encode(headers).hex()
+            assert headers == decoder.decode(bytes.fromhex(block))
+        assert 164 == decoder.table.size == encoder.table.size
+
+
+class TestHTTP2(unittest.TestCase):
+    def test_get(self):
+        routes = {'/': (200, {'Content-Type': 'text/plain'}, b'hello')}
+        with H2Server(routes) as server, h2_client() as client:
+            response = client.do_request(request(server.url('/')))
+
+            assert (200, 2.0, 'hello') == \
+                   (response.code, response.protocol, response.text)
+            assert 'text/plain' == response.headers['content-type']
+            assert 'h2' == response.handshake.alpn
+            headers = server.requests[0][0]
+            assert server.url('/')[len('https://'):-1] == \
+                   headers[':authority']
+            assert 'connection' not in headers and 'host' not in headers
+
+    def test_multiplexing(self):
+        def slow(headers, body):
+            time.sleep(0.3)
+            return 200, {}, headers[':path'].encode()
+
+        routes = {'/slow': slow}
+        with H2Server(routes) as server, h2_client() as client:
+            url = server.url('/slow')
+            started = time.perf_counter()
+            with ThreadPoolExecutor(10) as executor:
+                responses = list(executor.map(
+                    lambda i: client.do_request(request(f'{url}?{i}')),
+                    range(10)))
+            elapsed = time.perf_counter() - started
+
+            assert [f'/slow?{i}' for i in range(10)] == \
+                   [i.text for i in responses]
+            # Ten overlapping streams on one connection, not ten
+            # connections or ten sequential requests.
+            assert 1 == server.connections
+            assert server.max_active > 1
+            assert elapsed < 2
+
+    def test_upload_beyond_initial_window(self):
+        data = 'x' * 200000
+        routes = {'/': lambda headers, body: (200, {}, b'%d' % len(body))}
+        with H2Server(routes) as server, h2_client() as client:
+            response = client.do_request(
+                request(server.url('/'), 'POST', data))
+
+            assert '200000' == response.text
+            assert '200000' == server.requests[0][0]['content-length']
+
+    def test_stream_large_body(self):
+        body = bytes(range(256)) * 4096
+        routes = {'/': (200, {}, body)}
+        with H2Server(routes) as server, h2_client() as client:
+            with client.do_request(request(server.url('/')),
+                                   stream=True) as response:
+                assert body == b''.join(response.iter_content(10000))
+            assert response.timings.bytes_received > len(body)
+
+            # The stream was closed cleanly and the connection is reused.
+            assert 200 == client.do_request(request(server.url('/'))).code
+            assert 1 == server.connections
+
+    def test_read_body_beyond_window(self):
+        # Bigger than the 4 MiB stream window; the server waits for
+        # window updates before sending more.
+        body = bytes(range(256)) * 24576
+        routes = {'/': (200, {}, body)}
+        with H2Server(routes) as server, h2_client() as client:
+            assert body == client.do_request(request(server.url('/'))).content
+            with client.do_request(request(server.url('/')),
+                                   stream=True) as response:
+                assert body == response.read()
+
+    def test_goaway_retires_connection(self):
+        routes = {'/': (200, {}, b'x' * 100000)}
+        with H2Server(routes) as server, h2_client() as client:
+            held = client.do_request(request(server.url('/')), stream=True)
+            server.goaway()
+            time.sleep(0.2)
+
+            assert 200 == client.do_request(request(server.url('/'))).code
+            assert 2 == server.connections
+            # The old connection stays open for the stream still on it.
+            assert 0 == server.closed
+            assert 100000 == len(held.read())
+            held.close()
+            time.sleep(0.2)
+            assert 1 == server.closed
+
+    def test_high_descriptors(self):
+        use_high_descriptors(self)
+        routes = {'/': (200, {}, b'ok')}
+        with H2Server(routes) as server, h2_client() as client:
+            response = client.do_request(request(server.url('/')))
+            assert (200, 2.0, 'ok') == (response.code, response.protocol,
+                                        response.text)
+
+    def test_falls_back_to_http1(self):
+        routes = {'/': (200, {}, b'old')}
+        with LocalServer(routes, tls=True) as server, \
+                h2_client() as client:
+            for _ in range(2):
+                response = client.do_request(request(server.url('/')))
+                assert (1.1, 'old') == (response.protocol, response.text)
+            assert 1 == server.connections
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ from unittest.mock import patch
 from http_client.client import Client
 from http_client.exceptions import ValueRequestTypeException, \
     HTTPSClientException, ConnectException, UnreadableFileException
-from http_client.request import Request
+from http_client.request import Request, RequestTemplate
 from http_client.response import Response
 
 
@@ -44,6 +44,39 @@ class TestHttpClient(unittest.TestCase):
         b = bytes(req).decode('ISO-8859-1')
         assert b == e
 
+    def test_request_template(self):
+        req = Request(protocol='HTTP/1.1',
+                      method='POST',
+                      data='Hello',
+                      url='http://localhost:8080/items?page=1',
+                      agent='Mozilla/5.0')
+        template = RequestTemplate(req)
+        assert bytes(req) == b''.join(template.render())
+
+        patched = template.request(path='/other', query={'page': '2'},
+                                   data='Hi')
+        expected = Request(protocol='HTTP/1.1',
+                           method='POST',
+                           data='Hi',
+                           url='http://localhost:8080/other?page=2',
+                           agent='Mozilla/5.0')
+        assert bytes(expected) == bytes(patched)
+        assert 'localhost:8080' == patched.headers['Host']
+        assert b'Content-Length: 2\r\n\r\n' in patched.buffers()
+
+    def test_redirect_request(self):
+        req = Request(protocol='HTTP/1.1',
+                      method='GET',
+                      headers=['Accept: */*'],
+                      url='http://ptsv2.com/t/a/post')
+        hop = req.redirect('../b?x=1')
+        assert 'http://ptsv2.com/t/b?x=1' == str(hop.url)
+        assert str(hop).startswith('GET /t/b?x=1 HTTP/1.1\r\n')
+        assert '*/*' == hop.headers['Accept']
+        other = req.redirect('https://example.com:8443/')
+        assert 'example.com:8443' == other.headers['Host']
+        assert 'ptsv2.com' == req.headers['Host']
+
     def test_check_post_request_from_file(self):
         path = Path.cwd() / 'tests' / 'resources' / 'test_text.txt'
         with path.open('w+') as f:
@@ -65,6 +98,17 @@ class TestHttpClient(unittest.TestCase):
         assert 'UTF-8' == new_response.charset
         assert 'Hello' == new_response.message
 
+    def test_response_bytes_first(self):
+        data = 'HTTP/1.1 200 OK\r\n' \
+               'Content-Type: application/json; charset=utf-8\r\n\r\n' \
+               '{"city": "Екатеринбург"}'.encode('utf-8')
+        new_response = Response.from_bytes(data, None)
+        assert data[data.index(b'{'):] == new_response.content
+        assert '{"city": "Екатеринбург"}' == new_response.text
+        assert new_response.text is new_response.message
+        assert {'city': 'Екатеринбург'} == new_response.json()
+        assert new_response.raw_response.startswith('HTTP/1.1 200 OK')
+
     def test_prepare_headers(self):
         path = Path.cwd() / 'tests' / 'resources' / 'cookie.txt'
         with path.open('w') as f:
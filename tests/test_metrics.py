@@ -0,0 +1,66 @@
+import unittest
+
+from http_client.cache import HTTPCache
+from http_client.client import Client
+from http_client.exceptions import ConnectException
+from http_client.metrics import Registry, ClientMetrics
+from tests.server import LocalServer, get
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_exposition(self):
+        registry = Registry()
+        histogram = registry.histogram('latency_seconds', 'Latency',
+                                       ('host',), buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, ('a"b',))
+
+        assert '# HELP latency_seconds Latency\n' \
+               '# TYPE latency_seconds histogram\n' \
+               'latency_seconds_bucket{host="a\\"b",le="0.1"} 1\n' \
+               'latency_seconds_bucket{host="a\\"b",le="1"} 2\n' \
+               'latency_seconds_bucket{host="a\\"b",le="+Inf"} 3\n' \
+               'latency_seconds_sum{host="a\\"b"} 5.55\n' \
+               'latency_seconds_count{host="a\\"b"} 3\n' \
+               == registry.to_prometheus()
+        snapshot = registry.snapshot()['latency_seconds']['a"b']
+        assert (3, 1) == (snapshot['count'], snapshot['p50'])
+
+    def test_client_metrics(self):
+        routes = {'/old': (302, {'Location': '/new'}, b''),
+                  '/new': (200, {'Cache-Control': 'max-age=60'}, b'body')}
+        with LocalServer(routes) as server, \
+                Client(10, cache=HTTPCache()) as client:
+            host = server.url('/')[len('http://'):-1]
+            client.do_request(get(server.url('/old')))
+            client.do_request(get(server.url('/new')))
+            snapshot = client.metrics.snapshot()
+
+            requests = snapshot['http_client_requests_total']
+            assert 1 == requests[f'{host},GET,302']
+            assert 1 == requests[f'{host},GET,200']
+            assert 1 == snapshot['http_client_redirects_total'][host]
+            assert 2 == snapshot['http_client_request_duration_seconds'][
+                f'{host},GET']['count']
+            assert 1 == snapshot['http_client_cache_lookups_total']['hit']
+            assert 1 == snapshot['http_client_pool_connections']['idle']
+            text = client.metrics.to_prometheus()
+            assert f'http_client_requests_total{{host="{host}",' \
+                   f'method="GET",code="200"}} 1' in text
+
+    def test_errors_and_shared_registry(self):
+        registry = Registry()
+        with LocalServer({}) as server:
+            url = server.url('/')
+        with Client(10, metrics=ClientMetrics(registry)) as first, \
+                Client(10, metrics=ClientMetrics(registry)) as second:
+            self.assertRaises(ConnectException, first.do_request, get(url))
+            self.assertRaises(ConnectException, second.do_request, get(url))
+
+            errors = registry.snapshot()['http_client_errors_total']
+            host = url[len('http://'):-1]
+            assert 2 == errors[f'{host},GET,ConnectException']
+
+
+if __name__ == '__main__':
+    unittest.main()
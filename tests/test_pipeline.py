@@ -0,0 +1,84 @@
+import unittest
+
+from http_client.cache import HTTPCache
+from http_client.client import Client
+from http_client.exceptions import HTTPSClientException
+from http_client.pool import ConnectionPool
+from tests.server import LocalServer, request
+
+
+def echo(handler, body):
+    return 200, {}, handler.path.encode()
+
+
+class TestPipeline(unittest.TestCase):
+    def test_batch_on_one_connection(self):
+        with LocalServer({'/': echo}) as server, \
+                Client(10, pool=ConnectionPool()) as client:
+            urls = [server.url(f'/?{i}') for i in range(10)]
+            results = list(client.pipeline(request(i) for i in urls))
+
+            assert urls == [str(i.url) for i, _ in results]
+            assert [f'/?{i}' for i in range(10)] == \
+                   [i.text for _, i in results]
+            assert [f'/?{i}' for i in range(10)] == \
+                   [i[1] for i in server.requests]
+            assert 1 == server.connections
+
+    def test_unsafe_request_is_sent_alone(self):
+        with LocalServer({'/': echo}) as server, \
+                Client(10, pool=ConnectionPool()) as client:
+            requests = [request(server.url('/?0')),
+                        request(server.url('/?1'), 'HEAD'),
+                        request(server.url('/?2'), 'POST', 'data'),
+                        request(server.url('/?3'))]
+            results = list(client.pipeline(requests, depth=4))
+
+            assert requests == [i for i, _ in results]
+            assert [200] * 4 == [i.code for _, i in results]
+            assert ['GET', 'HEAD', 'POST', 'GET'] == \
+                   [i[0] for i in server.requests]
+            assert b'data' == server.requests[2][3]
+
+    def test_resends_after_server_closes(self):
+        def close(handler, body):
+            return 200, {'Connection': 'close'}, b'last'
+
+        routes = {'/': echo, '/close': close}
+        with LocalServer(routes) as server, \
+                Client(10, pool=ConnectionPool()) as client:
+            paths = ['/?0', '/close', '/?2', '/?3']
+            results = list(client.pipeline(
+                request(server.url(i)) for i in paths))
+
+            assert ['/?0', 'last', '/?2', '/?3'] == \
+                   [i.text for _, i in results]
+            # The requests behind the close were answered on a new
+            # connection.
+            assert server.connections >= 2
+            assert ['/?2', '/?3'] == [i[1] for i in server.requests[-2:]]
+
+    def test_errors_are_yielded(self):
+        with Client(10, pool=ConnectionPool()) as client:
+            results = list(client.pipeline(
+                [request('http://127.0.0.1:1/')] * 2))
+
+            assert 2 == len(results)
+            assert all(isinstance(i, HTTPSClientException)
+                       for _, i in results)
+
+    def test_cache_is_not_bypassed(self):
+        routes = {'/': (200, {'Cache-Control': 'max-age=60'}, b'cached')}
+        with LocalServer(routes) as server, \
+                Client(10, pool=ConnectionPool(),
+                       cache=HTTPCache()) as client:
+            results = list(client.pipeline(
+                request(server.url('/')) for _ in range(4)))
+
+            assert ['cached'] * 4 == [i.text for _, i in results]
+            assert 1 == len(server.requests)
+            assert 3 == client.cache.stats['hits']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import socket
+import threading
+import unittest
+
+from http_client.client import Client
+from http_client.exceptions import ConnectException, \
+    PoolTimeoutException
+from http_client.pool import ConnectionPool, Connection
+from tests.server import LocalServer, use_high_descriptors, get, request
+
+
+class TestConnectionPool(unittest.TestCase):
+    def test_connection_is_reused(self):
+        routes = {'/hello': (200, {}, b'Hello'),
+                  '/chunked': (200, {}, [b'Hel', b'lo'])}
+        with LocalServer(routes) as server, Client(10) as client:
+            for path in ('/hello', '/chunked', '/hello'):
+                response = client.do_request(get(server.url(path)))
+                assert 200 == response.code
+            assert 1 == server.connections
+            assert 'keep-alive' == server.requests[0][2]['Connection']
+            assert 1 == client.pool.idle_count
+
+    def test_reused_with_high_descriptors(self):
+        use_high_descriptors(self)
+        with LocalServer({'/': (200, {}, b'ok')}) as server, \
+                Client(10) as client:
+            for _ in range(3):
+                assert 200 == client.do_request(get(server.url('/'))).code
+            assert 1 == server.connections
+
+    def test_redirect_reuses_connection(self):
+        routes = {'/old': (301, {'Location': '/new'}, b''),
+                  '/new': (200, {}, b'moved')}
+        with LocalServer(routes) as server, Client(10) as client:
+            routes['/old'] = (301, {'Location': server.url('/new')}, b'')
+            response = client.do_request(get(server.url('/old')))
+            assert 'moved' == response.message
+            assert 1 == server.connections
+
+    def test_disabled_pool_sends_close(self):
+        with LocalServer({'/': (200, {}, b'ok')}) as server:
+            client = Client(10, keep_alive=False)
+            client.do_request(get(server.url()))
+            client.do_request(get(server.url()))
+            assert client.pool is None
+            assert 2 == server.connections
+            assert 'close' == server.requests[0][2]['Connection']
+
+    def test_server_closed_connection_is_replaced(self):
+        routes = {'/': (200, {'Connection': 'close'}, b'bye'),
+                  '/stay': (200, {}, b'hi')}
+        with LocalServer(routes) as server, Client(10) as client:
+            client.do_request(get(server.url()))
+            assert 0 == client.pool.idle_count
+            client.do_request(get(server.url('/stay')))
+            client.do_request(get(server.url('/stay')))
+            assert 2 == server.connections
+
+    def test_stale_connection_is_discarded(self):
+        pool = ConnectionPool()
+        left, right = socket.socketpair()
+        key = ('http', 'a', 80)
+        connection = pool.acquire(key, lambda: Connection(left, key))
+        pool.release(connection)
+        right.close()
+        fresh, _ = socket.socketpair()
+        assert fresh is pool.acquire(
+            key, lambda: Connection(fresh, key)).sock
+
+    def test_per_host_limit(self):
+        pool = ConnectionPool(max_per_host=1)
+        key = ('http', 'a', 80)
+
+        def factory():
+            return Connection(socket.socket(), key)
+
+        connection = pool.acquire(key, factory)
+        self.assertRaises(PoolTimeoutException,
+                          pool.acquire, key, factory, 0.05)
+        pool.release(connection, False)
+        pool.acquire(key, factory, 0.05).close()
+
+    def test_max_idle_and_idle_timeout(self):
+        def factory(key):
+            return lambda: Connection(socket.socketpair()[0], key)
+
+        pool = ConnectionPool(max_idle=1, idle_timeout=60)
+        first = pool.acquire(('http', 'a', 80), factory(('http', 'a', 80)))
+        second = pool.acquire(('http', 'b', 80), factory(('http', 'b', 80)))
+        pool.release(first)
+        pool.release(second)
+        assert 1 == pool.idle_count
+
+        expiring = ConnectionPool(idle_timeout=0)
+        connection = expiring.acquire(('http', 'a', 80),
+                                      factory(('http', 'a', 80)))
+        expiring.release(connection)
+        assert 0 == expiring.idle_count
+
+    def test_only_idempotent_requests_are_resent(self):
+        # Answers the first request on each connection, then drops the
+        # connection after reading the second one, like a server closing
+        # an idle keep-alive connection just as it is reused.
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen()
+        received = []
+
+        def serve():
+            while True:
+                try:
+                    sock, _ = listener.accept()
+                except OSError:
+                    return
+                with sock:
+                    for answer in (True, False):
+                        data = sock.recv(65536)
+                        if not data:
+                            break
+                        received.append(data.split(b' ', 1)[0])
+                        if answer:
+                            sock.sendall(b'HTTP/1.1 200 OK\r\n'
+                                         b'Content-Length: 2\r\n\r\nok')
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        url = 'http://127.0.0.1:%d/' % listener.getsockname()[1]
+        try:
+            with Client(10) as client:
+                client.do_request(get(url))
+                assert 'ok' == client.do_request(get(url)).text
+                assert [b'GET'] * 3 == received
+
+                self.assertRaises(ConnectException, client.do_request,
+                                  request(url, 'POST'))
+                assert [b'GET'] * 3 + [b'POST'] == received
+        finally:
+            listener.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
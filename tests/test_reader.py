@@ -0,0 +1,79 @@
+import socket
+import threading
+import unittest
+
+from http_client.exceptions import ResponseException
+from http_client.reader import ResponseReader
+
+
+def serve(data: bytes, close: bool = True, pieces: int = 1):
+    left, right = socket.socketpair()
+
+    def send():
+        step = max(1, len(data) // pieces)
+        for i in range(0, len(data), step):
+            right.sendall(data[i:i + step])
+        if close:
+            right.close()
+
+    threading.Thread(target=send, daemon=True).start()
+    return left, right
+
+
+class TestResponseReader(unittest.TestCase):
+    def test_content_length(self):
+        body = bytes(range(256)) * 4096
+        sock, _ = serve(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n'
+                        % len(body) + body, close=False, pieces=50)
+        reader = ResponseReader(sock, buffer_size=128)
+        assert b'HTTP/1.1 200 OK\r\nContent-Length: 1048576' == \
+               reader.read_head()
+        assert body == reader.read_body()
+        assert reader.reusable
+
+    def test_chunked_with_trailers(self):
+        sock, _ = serve(b'HTTP/1.1 200 OK\r\n'
+                        b'Transfer-Encoding: chunked\r\n\r\n'
+                        b'5;ext=1\r\nHello\r\n7\r\n, World\r\n0\r\n'
+                        b'Expires: never\r\n\r\n', close=False, pieces=9)
+        reader = ResponseReader(sock, buffer_size=16)
+        reader.read_head()
+        assert b'Hello, World' == reader.read_body()
+        assert reader.reusable
+
+    def test_interim_and_pipelined_responses(self):
+        sock, _ = serve(b'HTTP/1.1 100 Continue\r\n\r\n'
+                        b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok'
+                        b'HTTP/1.1 204 No Content\r\n\r\n'
+                        b'HTTP/1.0 200 OK\r\n\r\nuntil close')
+        reader = ResponseReader(sock)
+        reader.read_head()
+        assert 200 == reader.code
+        assert b'ok' == reader.read_body()
+        reader.read_head()
+        assert 204 == reader.code
+        assert b'' == reader.read_body()
+        reader.read_head()
+        assert b'until close' == reader.read_body()
+        assert not reader.reusable
+
+    def test_head_request_has_no_body(self):
+        sock, _ = serve(b'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\n',
+                        close=False)
+        reader = ResponseReader(sock)
+        reader.read_head('HEAD')
+        assert b'' == reader.read_body()
+        assert reader.reusable
+
+    def test_truncated_response(self):
+        sock, _ = serve(b'HTTP/1.1 200 OK\r\nContent-Length: 10\r\n\r\nab')
+        reader = ResponseReader(sock)
+        reader.read_head()
+        self.assertRaises(ResponseException, reader.read_body)
+
+        sock, _ = serve(b'')
+        self.assertRaises(ResponseException, ResponseReader(sock).read_head)
+
+
+if __name__ == '__main__':
+    unittest.main()
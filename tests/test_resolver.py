@@ -0,0 +1,77 @@
+import socket
+import time
+import unittest
+from unittest import mock
+
+from http_client.client import Client
+from http_client.resolver import Resolver
+from tests.server import LocalServer, get
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestResolver(unittest.TestCase):
+    def test_static_hosts(self):
+        resolver = Resolver(hosts={'service.test': '127.0.0.1'})
+        routes = {'/': (200, {}, b'offline')}
+        with LocalServer(routes) as server, \
+                Client(10, resolver=resolver) as client:
+            port = server.url().rsplit(':', 1)[1].rstrip('/')
+            response = client.do_request(
+                get(f'http://service.test:{port}/'))
+
+            assert b'offline' == response.content
+            assert f'service.test:{port}' == server.requests[0][2]['Host']
+
+    def test_cache_ttl(self):
+        answer = [(socket.AF_INET, socket.SOCK_STREAM, 6, '',
+                   ('10.0.0.1', 0))]
+        resolver = Resolver(ttl=60)
+        with mock.patch('http_client.resolver.getaddrinfo',
+                        return_value=answer) as lookup:
+            assert [(socket.AF_INET, ('10.0.0.1', 80))] == \
+                   resolver.resolve('example.test', 80)
+            resolver.resolve('EXAMPLE.test', 443)
+            assert 1 == lookup.call_count
+
+            with mock.patch('http_client.resolver.time.monotonic',
+                            return_value=time.monotonic() + 61):
+                resolver.resolve('example.test', 80)
+            assert 2 == lookup.call_count
+            assert 1 == resolver.stats['hits']
+
+    def test_families_are_interleaved(self):
+        resolver = Resolver(hosts={'dual.test': [
+            '::1', '::2', '127.0.0.1', '127.0.0.2']})
+        addresses = [i[1][0] for i in resolver.resolve('dual.test', 80)]
+        assert ['::1', '127.0.0.1', '::2', '127.0.0.2'] == addresses
+
+        resolver.report_failure('::1')
+        addresses = [i[1][0] for i in resolver.resolve('dual.test', 80)]
+        assert ['127.0.0.1', '::2', '127.0.0.2', '::1'] == addresses
+
+    def test_failed_address_falls_back(self):
+        with LocalServer() as server:
+            port = int(server.url().rsplit(':', 1)[1].rstrip('/'))
+            resolver = Resolver(hosts={'flaky.test': [
+                '127.0.0.2', '127.0.0.1']})
+            # 127.0.0.2 refuses since the server only listens on .1.
+            sock = resolver.connect('flaky.test', port, timeout=5)
+            sock.close()
+
+            assert resolver.failed('127.0.0.2')
+            assert not resolver.failed('127.0.0.1')
+
+    def test_all_addresses_fail(self):
+        resolver = Resolver(hosts={'down.test': '127.0.0.1'})
+        with self.assertRaises(OSError):
+            resolver.connect('down.test', closed_port(), timeout=1)
+        assert resolver.failed('127.0.0.1')
+
+
+if __name__ == '__main__':
+    unittest.main()
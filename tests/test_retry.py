@@ -0,0 +1,101 @@
+import unittest
+
+from http_client.client import Client
+from http_client.exceptions import CertificateVerifyException, \
+    ConnectException
+from http_client.retry import RetryPolicy, RetryBudget
+from http_client.timeouts import Timeouts
+from tests.server import LocalServer, request
+
+
+def flaky(failures: int, status: int = 503, headers: dict = None):
+    calls = []
+
+    def handle(handler, body):
+        calls.append(handler.path)
+        if len(calls) <= failures:
+            return status, headers or {}, b'try later'
+        return 200, {}, b'ok'
+    return handle
+
+
+class TestRetry(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+
+    def policy(self, **kwargs):
+        return RetryPolicy(sleep=self.sleeps.append,
+                           uniform=lambda low, high: high, **kwargs)
+
+    def test_retries_status_with_backoff(self):
+        with LocalServer({'/': flaky(2)}) as server, \
+                Client(10, retry=self.policy(backoff=0.1)) as client:
+            response = client.do_request(request(server.url('/')))
+
+            assert 200 == response.code
+            assert 3 == len(server.requests)
+            assert [0.1, 0.2] == self.sleeps
+            assert 1 == server.connections
+
+    def test_gives_up_and_returns_last_response(self):
+        with LocalServer({'/': flaky(5)}) as server, \
+                Client(10, retry=self.policy(total=2)) as client:
+            response = client.do_request(request(server.url('/')))
+
+            assert 503 == response.code
+            assert 3 == len(server.requests)
+
+    def test_retry_after(self):
+        routes = {'/': flaky(1, 429, {'Retry-After': '2'}),
+                  '/far': flaky(1, 503, {'Retry-After': '3600'})}
+        with LocalServer(routes) as server, \
+                Client(10, retry=self.policy()) as client:
+            assert 200 == client.do_request(request(server.url('/'))).code
+            assert [2.0] == self.sleeps
+            assert 503 == client.do_request(request(server.url('/far'))).code
+
+    def test_non_idempotent_is_not_retried(self):
+        with LocalServer({'/': flaky(1)}) as server, \
+                Client(10, retry=self.policy()) as client:
+            response = client.do_request(request(server.url('/'), 'POST'))
+
+            assert 503 == response.code
+            assert 1 == len(server.requests)
+
+    def test_exceptions(self):
+        policy = self.policy(total=2)
+        with Client(10, retry=policy) as client:
+            with self.assertRaises(ConnectException):
+                client.do_request(request('http://127.0.0.1:1/'))
+            assert 2 == policy.stats['retries']
+
+    def test_certificate_errors_are_not_retried(self):
+        policy = self.policy()
+        with LocalServer({'/': (200, {}, b'')}, tls=True) as server, \
+                Client(10, retry=policy) as client:
+            with self.assertRaises(CertificateVerifyException):
+                client.do_request(request(server.url('/')))
+            assert 0 == policy.stats['retries']
+            assert 0 == len(server.requests)
+
+    def test_budget_caps_retries(self):
+        policy = self.policy(budget=RetryBudget(ratio=0.5, reserve=1))
+        with LocalServer({'/': flaky(100)}) as server, \
+                Client(10, retry=policy) as client:
+            for _ in range(4):
+                client.do_request(request(server.url('/')))
+
+            # One reserved retry plus half a token per request.
+            assert 4 + 3 == len(server.requests)
+            assert policy.stats['budget_exhausted'] > 0
+
+    def test_deadline_stops_retries(self):
+        with LocalServer({'/': flaky(5, 503, {'Retry-After': '5'})}) \
+                as server, Client(10, retry=self.policy(),
+                                  timeouts=Timeouts(total=1)) as client:
+            assert 503 == client.do_request(request(server.url('/'))).code
+            assert [] == self.sleeps
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from http_client.client import Client
+from tests.server import LocalServer, get
+
+BODY = bytes(range(256)) * 4096
+
+
+class TestStreaming(unittest.TestCase):
+    def test_iter_content(self):
+        routes = {'/big': (200, {}, BODY),
+                  '/chunked': (200, {}, [BODY[:1000], BODY[1000:]])}
+        with LocalServer(routes) as server, Client(10) as client:
+            for path in ('/big', '/chunked'):
+                with client.do_request(get(server.url(path)),
+                                       stream=True) as response:
+                    assert 200 == response.code
+                    chunks = list(response.iter_content(4096))
+                assert all(len(i) <= 4096 for i in chunks)
+                assert BODY == b''.join(chunks)
+            assert 1 == server.connections
+
+    def test_raw_file_object(self):
+        with LocalServer({'/big': (200, {}, BODY)}) as server, \
+                Client(10) as client:
+            response = client.do_request(get(server.url('/big')),
+                                         stream=True)
+            assert BODY[:10] == response.raw.read(10)
+            assert BODY[10:] == response.raw.read()
+
+    def test_unread_stream_is_not_reused(self):
+        with LocalServer({'/big': (200, {}, BODY)}) as server, \
+                Client(10) as client:
+            response = client.do_request(get(server.url('/big')),
+                                         stream=True)
+            response.close()
+            assert 0 == client.pool.idle_count
+            client.do_request(get(server.url('/big')))
+            assert 2 == server.connections
+
+    def test_message_reads_stream(self):
+        routes = {'/old': (302, {}, b'redirect body'),
+                  '/new': (200, {}, b'Hello')}
+        with LocalServer(routes) as server, Client(10) as client:
+            routes['/old'] = (302, {'Location': server.url('/new')},
+                              b'redirect body')
+            response = client.do_request(get(server.url('/old')),
+                                         stream=True)
+            assert 'Hello' == response.message
+            assert 1 == server.connections
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import socket
+import threading
+import time
+import unittest
+
+from yarl import URL
+
+from http_client.client import Client
+from http_client.exceptions import ReadTimeoutException, \
+    DeadlineExceededException, PoolTimeoutException, TimeoutException
+from http_client.pool import ConnectionPool
+from http_client.timeouts import Timeouts
+from tests.server import LocalServer, get
+
+
+def slow(delay: float, route: tuple):
+    def handle(handler, body):
+        time.sleep(delay)
+        return route
+    return handle
+
+
+class DripServer:
+    def __init__(self, delay: float):
+        self._delay = delay
+        self._sock = socket.socket()
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._sock.close()
+
+    def url(self):
+        return 'http://127.0.0.1:%d/' % self._sock.getsockname()[1]
+
+    def _serve(self):
+        conn, _ = self._sock.accept()
+        with conn:
+            conn.recv(65536)
+            conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 100\r\n\r\n')
+            try:
+                for _ in range(100):
+                    time.sleep(self._delay)
+                    conn.sendall(b'x')
+            except OSError:
+                pass
+
+
+class TestTimeouts(unittest.TestCase):
+    def test_read_timeout(self):
+        routes = {'/': slow(1, (200, {}, b'late'))}
+        with LocalServer(routes) as server, \
+                Client(10, timeouts=Timeouts(read=0.2)) as client:
+            started = time.monotonic()
+            with self.assertRaises(ReadTimeoutException) as raised:
+                client.do_request(get(server.url('/')))
+            assert time.monotonic() - started < 0.9
+            assert raised.exception.message.endswith(
+                f'check URL 127.0.0.1: {URL(server.url()).port}')
+
+    def test_deadline_is_per_call(self):
+        routes = {'/': slow(0.3, (200, {}, b'ok'))}
+        with LocalServer(routes) as server, \
+                Client(10, timeouts=Timeouts(total=0.5)) as client:
+            request = get(server.url('/'))
+            for _ in range(3):
+                assert 'ok' == client.do_request(request).text
+            assert request.deadline is None
+
+    def test_deadline_spans_redirects(self):
+        routes = {'/a': slow(0.3, (302, {'Location': '/b'}, b'')),
+                  '/b': slow(0.3, (302, {'Location': '/c'}, b'')),
+                  '/c': slow(0.3, (200, {}, b'done'))}
+        with LocalServer(routes) as server, \
+                Client(10, timeouts=Timeouts(total=0.5)) as client:
+            started = time.monotonic()
+            with self.assertRaises(DeadlineExceededException):
+                client.do_request(get(server.url('/a')))
+            assert time.monotonic() - started < 0.9
+
+    def test_deadline_cuts_slow_drip_body(self):
+        timeouts = Timeouts(read=1, total=0.5)
+        with DripServer(0.05) as server, \
+                Client(10, timeouts=timeouts) as client:
+            started = time.monotonic()
+            with self.assertRaises(DeadlineExceededException):
+                client.do_request(get(server.url()))
+            assert time.monotonic() - started < 0.9
+
+    def test_pool_timeout(self):
+        routes = {'/': (200, {}, b'body')}
+        pool = ConnectionPool(max_per_host=1)
+        with LocalServer(routes) as server, \
+                Client(10, pool=pool,
+                       timeouts=Timeouts(pool=0.1)) as client:
+            held = client.do_request(get(server.url('/')), stream=True)
+            with self.assertRaises(PoolTimeoutException) as error:
+                client.do_request(get(server.url('/')))
+            assert isinstance(error.exception, TimeoutException)
+            held.close()
+            assert b'body' == client.do_request(get(server.url('/'))).content
+
+
+if __name__ == '__main__':
+    unittest.main()
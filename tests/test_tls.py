@@ -0,0 +1,43 @@
+import unittest
+
+from http_client.client import Client
+from http_client.exceptions import ConnectException
+from http_client.tls import create_ssl_context
+from tests.server import LocalServer, CERT_FILE, get
+
+
+class TestTLS(unittest.TestCase):
+    def test_session_resumption(self):
+        context = create_ssl_context(ca_file=CERT_FILE)
+        with LocalServer({'/': (200, {}, b'secure')}, tls=True) as server:
+            client = Client(10, keep_alive=False, ssl_context=context)
+            first = client.do_request(get(server.url()))
+            second = client.do_request(get(server.url()))
+
+            assert 'secure' == second.message
+            assert not first.handshake.resumed
+            assert second.handshake.resumed
+            assert first.handshake.duration > 0
+            metrics = client.tls_metrics
+            assert 2 == metrics['handshakes']
+            assert 1 == metrics['resumed']
+
+    def test_reused_connection_has_no_handshake(self):
+        context = create_ssl_context(ca_file=CERT_FILE)
+        with LocalServer({'/': (200, {}, b'secure')}, tls=True) as server, \
+                Client(10, ssl_context=context) as client:
+            assert client.do_request(get(server.url())).handshake
+            assert client.do_request(get(server.url())).handshake is None
+
+    def test_certificate_is_verified(self):
+        with LocalServer({'/': (200, {}, b'secure')}, tls=True) as server:
+            self.assertRaises(ConnectException,
+                              Client(10).do_request, get(server.url()))
+            insecure = create_ssl_context(verify=False)
+            response = Client(10, ssl_context=insecure).do_request(
+                get(server.url()))
+            assert 'secure' == response.message
+
+
+if __name__ == '__main__':
+    unittest.main()
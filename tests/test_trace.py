@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from http_client.client import Client
+from http_client.exceptions import HTTPSClientException
+from http_client.trace import Hooks, EVENTS
+from tests.server import LocalServer, request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.hooks = Hooks(**{
+            event: (lambda name: lambda request, **data:
+                    self.events.append(name))(event)
+            for event in EVENTS})
+
+    def test_events(self):
+        routes = {'/old': (302, {'Location': '/new'}, b''),
+                  '/new': (200, {}, b'body')}
+        with LocalServer(routes) as server, \
+                Client(10, hooks=self.hooks) as client:
+            client.do_request(request(server.url('/old')))
+
+        assert ['on_dns_start', 'on_dns_end', 'on_connect',
+                'on_request_sent', 'on_first_byte', 'on_response_done',
+                'on_redirect',
+                'on_pool_reuse', 'on_request_sent', 'on_first_byte',
+                'on_response_done'] == self.events
+
+    def test_timings(self):
+        routes = {'/old': (302, {'Location': '/new'}, b''),
+                  '/new': (200, {}, b'x' * 1000)}
+        with LocalServer(routes) as server, Client(10) as client:
+            response = client.do_request(
+                request(server.url('/old'), 'POST', 'abc'))
+            timings = response.timings.as_dict()
+
+            assert timings['sent'] <= timings['first_byte'] <= \
+                   timings['total'] == response.elapsed
+            # The final hop reuses the connection, so it had no lookup.
+            assert None is timings['dns']
+            assert 1 == timings['redirects']
+            assert timings['redirect'] > 0
+            assert len(bytes(response.request)) == timings['bytes_sent']
+            assert len(response.head) + 4 + 1000 == timings['bytes_received']
+
+    def test_stream_timings(self):
+        routes = {'/': (200, {}, [b'a' * 10, b'b' * 10])}
+        with LocalServer(routes) as server, \
+                Client(10, hooks=self.hooks) as client:
+            response = client.do_request(request(server.url('/')),
+                                         stream=True)
+            assert response.elapsed is None
+            assert 'on_response_done' not in self.events
+            assert b'a' * 10 + b'b' * 10 == response.content
+            assert response.elapsed >= response.timings.get('first_byte')
+            assert 'on_response_done' == self.events[-1]
+
+    def test_unknown_hook(self):
+        self.assertRaises(HTTPSClientException, Hooks, on_nothing=print)
+
+    def test_write_out(self):
+        routes = {'/': (200, {}, b'hello')}
+        with LocalServer(routes) as server:
+            result = subprocess.run(
+                [sys.executable, '-m', 'http_client', '-1', '-w',
+                 r'\n%{http_code} %{size_download} %{num_redirects} '
+                 r'%{time_total}', server.url('/')],
+                cwd=ROOT, capture_output=True, timeout=30)
+
+        body, _, line = result.stdout.decode().partition('\n')
+        code, size, redirects, total = line.split()
+        assert ('hello', '200', '5', '0') == (body, code, size, redirects)
+        assert float(total) > 0
+
+
+if __name__ == '__main__':
+    unittest.main()